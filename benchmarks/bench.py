@@ -0,0 +1,421 @@
+"""Performance benchmarks for nbautoexport: post-save hook latency per export format, export
+throughput for directories of notebooks, and the time and memory of finding files to clean in deep
+directory trees. Results are written to a JSON file that can be compared across versions with the
+'compare' command.
+
+    python -m benchmarks.bench run --output results.json
+    python -m benchmarks.bench compare baseline.json results.json
+"""
+
+from contextlib import contextmanager
+import datetime
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import nbconvert
+import nbformat
+import typer
+
+from benchmarks.notebooks import KERNEL_LANGUAGES, make_notebook, write_notebook
+from nbautoexport import __version__
+from nbautoexport.clean import find_files_to_clean
+from nbautoexport.export import export_notebooks, post_save
+from nbautoexport.sentinel import (
+    CleanConfig,
+    CleanMode,
+    ExportFormat,
+    NbAutoexportConfig,
+    SAVE_PROGRESS_INDICATOR_FILE,
+)
+
+SCHEMA_VERSION = 1
+
+app = typer.Typer(help=__doc__)
+
+
+class BenchmarkResult:
+    """Timings of one benchmark with one set of parameters.
+
+    Args:
+        name (str): benchmark name
+        params (Dict[str, Any]): benchmark parameters
+        samples (List[float]): measured times in seconds
+        extra (Optional[Dict[str, Any]]): other measurements, e.g., peak memory
+    """
+
+    def __init__(
+        self,
+        name: str,
+        params: Dict[str, Any],
+        samples: List[float],
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.params = params
+        self.samples = samples
+        self.extra = extra or {}
+
+    @property
+    def key(self) -> str:
+        return benchmark_key(self.name, self.params)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "params": self.params,
+            "unit": "seconds",
+            "samples": self.samples,
+            "stats": {
+                "min": min(self.samples),
+                "median": statistics.median(self.samples),
+                "mean": statistics.mean(self.samples),
+                "max": max(self.samples),
+                "stdev": statistics.stdev(self.samples) if len(self.samples) > 1 else 0.0,
+            },
+            **self.extra,
+        }
+
+
+def benchmark_key(name: str, params: Dict[str, Any]) -> str:
+    """Identifier of a benchmark and its parameters, used to match results across runs."""
+    return name + json.dumps(params, sort_keys=True)
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "nbautoexport": __version__,
+        "nbconvert": nbconvert.__version__,
+        "nbformat": nbformat.__version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+@contextmanager
+def configured_directory(config: NbAutoexportConfig) -> Iterator[Path]:
+    """Temporary directory with an .nbautoexport configuration file."""
+    with tempfile.TemporaryDirectory(prefix="nbautoexport-bench-") as tmp:
+        directory = Path(tmp)
+        (directory / SAVE_PROGRESS_INDICATOR_FILE).write_text(config.json(), encoding="utf-8")
+        yield directory
+
+
+def bench_post_save(
+    notebook: nbformat.NotebookNode, export_format: ExportFormat, repeat: int
+) -> Tuple[float, List[float], List[float]]:
+    """Measure post-save hook latency for one export format.
+
+    Returns:
+        Tuple[float, List[float], List[float]]: latency of the first save in the process, which
+            includes building the exporter, latencies of later saves of changed content, and
+            latencies of saves of unchanged content, which are skipped
+    """
+    config = NbAutoexportConfig(export_formats=[export_format])
+    with configured_directory(config) as directory:
+        notebook_path = directory / "notebook.ipynb"
+
+        def save():
+            post_save(
+                model={"type": "notebook"}, os_path=str(notebook_path), contents_manager=None
+            )
+
+        write_notebook(notebook, notebook_path, revision=0)
+        first = timed(save)
+        changed = []
+        for revision in range(1, repeat + 1):
+            write_notebook(notebook, notebook_path, revision=revision)
+            changed.append(timed(save))
+        unchanged = [timed(save) for _ in range(repeat)]
+    return first, changed, unchanged
+
+
+def bench_export_directory(
+    notebook: nbformat.NotebookNode,
+    notebooks: int,
+    export_formats: List[ExportFormat],
+    jobs: int,
+    repeat: int,
+) -> List[float]:
+    """Measure time to export a directory of notebooks, as with the export command's --force."""
+    config = NbAutoexportConfig(export_formats=export_formats)
+    with configured_directory(config) as directory:
+        paths = [
+            write_notebook(notebook, directory / f"notebook_{index}.ipynb", revision=index)
+            for index in range(notebooks)
+        ]
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = export_notebooks(
+                paths, config=config, jobs=jobs, use_manifest=True, force=True
+            )
+            samples.append(time.perf_counter() - start)
+            failures = [result for result in results if result.failed]
+            if failures:
+                raise RuntimeError(f"Export failed: {failures[0].error}")
+    return samples
+
+
+def make_tree(root: Path, depth: int, breadth: int, files: int):
+    """Create a directory tree with `breadth` subdirectories per directory, `depth` levels deep,
+    and `files` small files in each directory."""
+    root.mkdir(exist_ok=True)
+    directories = [root]
+    for level in range(depth + 1):
+        next_directories = []
+        for directory in directories:
+            for index in range(files):
+                (directory / f"file_{index}.txt").write_bytes(b"x")
+            if level < depth:
+                for index in range(breadth):
+                    subdirectory = directory / f"dir_{index}"
+                    subdirectory.mkdir()
+                    next_directories.append(subdirectory)
+        directories = next_directories
+
+
+def bench_clean(
+    notebook: nbformat.NotebookNode,
+    notebooks: int,
+    depth: int,
+    breadth: int,
+    files: int,
+    mode: CleanMode,
+    repeat: int,
+) -> Tuple[List[float], int, int]:
+    """Measure time and peak traced memory of find_files_to_clean on a deep tree.
+
+    Returns:
+        Tuple[List[float], int, int]: times, peak memory in bytes, number of files to clean
+    """
+    config = NbAutoexportConfig(export_formats=[ExportFormat.script], clean=CleanConfig(mode=mode))
+    with configured_directory(config) as directory:
+        for index in range(notebooks):
+            write_notebook(notebook, directory / f"notebook_{index}.ipynb", revision=index)
+        make_tree(directory / "data", depth=depth, breadth=breadth, files=files)
+        make_tree(directory / "script", depth=depth, breadth=breadth, files=files)
+
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            to_clean = find_files_to_clean(directory, config)
+            samples.append(time.perf_counter() - start)
+
+        # Memory is measured separately, since tracing slows down allocation
+        tracemalloc.start()
+        try:
+            find_files_to_clean(directory, config)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return samples, peak, len(to_clean)
+
+
+def run_benchmarks(
+    formats: List[ExportFormat],
+    cells: int = 20,
+    output_bytes: int = 1024,
+    images: int = 0,
+    image_bytes: int = 32 * 1024,
+    language: str = "python",
+    notebooks: int = 10,
+    jobs: int = 1,
+    depth: int = 3,
+    breadth: int = 4,
+    files: int = 10,
+    repeat: int = 5,
+    progress: Callable[[str], None] = lambda message: None,
+) -> Dict[str, Any]:
+    """Run all benchmarks.
+
+    Returns:
+        Dict[str, Any]: machine-readable results, with environment, notebook parameters, and
+            benchmark results
+    """
+    notebook_params = dict(
+        cells=cells,
+        output_bytes=output_bytes,
+        images=images,
+        image_bytes=image_bytes,
+        language=language,
+    )
+    notebook = make_notebook(**notebook_params)
+    results: List[BenchmarkResult] = []
+
+    for export_format in formats:
+        progress(f"post_save [{export_format.value}]")
+        first, changed, unchanged = bench_post_save(notebook, export_format, repeat)
+        params = {"format": export_format.value, **notebook_params}
+        results.append(
+            BenchmarkResult("post_save", params, changed, extra={"first_seconds": first})
+        )
+        results.append(BenchmarkResult("post_save_unchanged", params, unchanged))
+
+    progress(f"export [{notebooks} notebooks]")
+    samples = bench_export_directory(notebook, notebooks, formats, jobs, repeat)
+    params = {
+        "notebooks": notebooks,
+        "formats": [fmt.value for fmt in formats],
+        "jobs": jobs,
+        **notebook_params,
+    }
+    results.append(
+        BenchmarkResult(
+            "export",
+            params,
+            samples,
+            extra={"notebooks_per_second": notebooks / statistics.median(samples)},
+        )
+    )
+
+    for mode in CleanMode:
+        progress(f"find_files_to_clean [{mode.value}]")
+        samples, peak, found = bench_clean(
+            notebook, notebooks, depth, breadth, files, mode, repeat
+        )
+        params = {
+            "mode": mode.value,
+            "notebooks": notebooks,
+            "depth": depth,
+            "breadth": breadth,
+            "files": files,
+        }
+        results.append(
+            BenchmarkResult(
+                "find_files_to_clean",
+                params,
+                samples,
+                extra={"peak_memory_bytes": peak, "files_to_clean": found},
+            )
+        )
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "environment": environment(),
+        "benchmarks": [result.to_dict() for result in results],
+    }
+
+
+def compare_results(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> Tuple[List[Tuple[str, float, float, float]], List[str]]:
+    """Compare median times of benchmarks present in both result files.
+
+    Returns:
+        Tuple[List[Tuple[str, float, float, float]], List[str]]: rows of benchmark key, baseline
+            median, current median, and ratio of current to baseline; and keys of benchmarks that
+            are slower than the baseline by more than threshold
+    """
+    baseline_medians = {
+        benchmark_key(b["name"], b["params"]): b["stats"]["median"] for b in baseline["benchmarks"]
+    }
+    rows = []
+    regressions = []
+    for benchmark in current["benchmarks"]:
+        key = benchmark_key(benchmark["name"], benchmark["params"])
+        if key not in baseline_medians:
+            continue
+        old = baseline_medians[key]
+        new = benchmark["stats"]["median"]
+        ratio = new / old if old > 0 else float("inf")
+        rows.append((key, old, new, ratio))
+        if ratio > 1 + threshold:
+            regressions.append(key)
+    return rows, regressions
+
+
+@app.command()
+def run(
+    output: Path = typer.Option(
+        Path("benchmark-results.json"), "--output", "-o", help="File to write results to."
+    ),
+    formats: List[ExportFormat] = typer.Option(
+        [ExportFormat.script, ExportFormat.html, ExportFormat.markdown, ExportFormat.notebook],
+        "--format",
+        "-f",
+        help="Export formats to benchmark.",
+    ),
+    cells: int = typer.Option(20, min=1, help="Cells per synthetic notebook."),
+    output_bytes: int = typer.Option(1024, min=0, help="Bytes of text output per code cell."),
+    images: int = typer.Option(0, min=0, help="Code cells with an embedded PNG output."),
+    image_bytes: int = typer.Option(32 * 1024, min=1, help="Bytes per embedded image."),
+    language: str = typer.Option(
+        "python", help=f"Kernel language, one of: {', '.join(KERNEL_LANGUAGES)}."
+    ),
+    notebooks: int = typer.Option(
+        10, min=1, help="Notebooks in exported and cleaned directories."
+    ),
+    jobs: int = typer.Option(1, min=1, help="Worker processes for directory exports."),
+    depth: int = typer.Option(3, min=0, help="Depth of directory trees for cleaning."),
+    breadth: int = typer.Option(4, min=1, help="Subdirectories per directory for cleaning."),
+    files: int = typer.Option(10, min=0, help="Files per directory for cleaning."),
+    repeat: int = typer.Option(5, min=1, help="Measurements per benchmark."),
+):
+    """Run benchmarks and write results to a JSON file."""
+    if language not in KERNEL_LANGUAGES:
+        typer.echo(f"Error: unknown language [{language}].")
+        raise typer.Exit(code=1)
+    results = run_benchmarks(
+        formats=formats,
+        cells=cells,
+        output_bytes=output_bytes,
+        images=images,
+        image_bytes=image_bytes,
+        language=language,
+        notebooks=notebooks,
+        jobs=jobs,
+        depth=depth,
+        breadth=breadth,
+        files=files,
+        repeat=repeat,
+        progress=lambda message: typer.echo(f"Running {message} ...", err=True),
+    )
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    for benchmark in results["benchmarks"]:
+        key = benchmark_key(benchmark["name"], benchmark["params"])
+        typer.echo(f"{benchmark['stats']['median'] * 1000:10.2f} ms  {key}")
+    typer.echo(f"Results written to {output}.")
+
+
+@app.command()
+def compare(
+    baseline: Path = typer.Argument(..., exists=True, dir_okay=False, help="Baseline results."),
+    current: Path = typer.Argument(..., exists=True, dir_okay=False, help="Results to compare."),
+    threshold: float = typer.Option(
+        0.1, min=0, help="Relative slowdown of median time that counts as a regression."
+    ),
+):
+    """Compare median times of two result files. Exits with code 1 if any benchmark regressed."""
+    rows, regressions = compare_results(
+        json.loads(baseline.read_text(encoding="utf-8")),
+        json.loads(current.read_text(encoding="utf-8")),
+        threshold=threshold,
+    )
+    for key, old, new, ratio in rows:
+        marker = "  REGRESSION" if key in regressions else ""
+        typer.echo(
+            f"{old * 1000:10.2f} ms -> {new * 1000:10.2f} ms ({ratio:5.2f}x)  {key}{marker}"
+        )
+    if regressions:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,113 @@
+import base64
+import random
+from pathlib import Path
+from typing import Dict, Optional
+
+import nbformat
+from nbformat.v4 import new_code_cell, new_markdown_cell, new_notebook, new_output
+
+# language_info and kernelspec metadata of common kernels
+KERNEL_LANGUAGES: Dict[str, Dict] = {
+    "python": {
+        "kernelspec": {"display_name": "Python 3", "language": "python", "name": "python3"},
+        "language_info": {
+            "codemirror_mode": {"name": "ipython", "version": 3},
+            "file_extension": ".py",
+            "mimetype": "text/x-python",
+            "name": "python",
+            "nbconvert_exporter": "python",
+            "pygments_lexer": "ipython3",
+            "version": "3.10.0",
+        },
+    },
+    "r": {
+        "kernelspec": {"display_name": "R", "language": "R", "name": "ir"},
+        "language_info": {
+            "codemirror_mode": "r",
+            "file_extension": ".r",
+            "mimetype": "text/x-r-source",
+            "name": "R",
+            "pygments_lexer": "r",
+            "version": "4.2.0",
+        },
+    },
+    "julia": {
+        "kernelspec": {"display_name": "Julia 1.9", "language": "julia", "name": "julia-1.9"},
+        "language_info": {
+            "file_extension": ".jl",
+            "mimetype": "application/julia",
+            "name": "julia",
+            "version": "1.9.0",
+        },
+    },
+}
+
+
+def make_notebook(
+    cells: int = 20,
+    output_bytes: int = 1024,
+    images: int = 0,
+    image_bytes: int = 32 * 1024,
+    language: str = "python",
+    seed: Optional[int] = 0,
+) -> nbformat.NotebookNode:
+    """Generate a synthetic notebook. Cells alternate between markdown and code cells, and each
+    code cell has a stream output.
+
+    Args:
+        cells (int): number of cells
+        output_bytes (int): size of each code cell's text output in bytes
+        images (int): number of code cells that also have an embedded PNG output
+        image_bytes (int): size of each embedded image in bytes, before base64 encoding
+        language (str): kernel language, one of KERNEL_LANGUAGES
+        seed (Optional[int]): random seed for image data
+
+    Returns:
+        nbformat.NotebookNode: notebook
+    """
+    rng = random.Random(seed)
+    line = "0123456789abcdef" * 4 + "\n"
+    output_text = (line * (output_bytes // len(line) + 1))[:output_bytes]
+
+    notebook_cells = []
+    code_cells = 0
+    for index in range(cells):
+        if index % 2 == 0:
+            notebook_cells.append(new_markdown_cell(f"## Section {index}\n\nSome explanation."))
+            continue
+        outputs = [new_output("stream", name="stdout", text=output_text)]
+        if code_cells < images:
+            data = rng.getrandbits(8 * image_bytes).to_bytes(image_bytes, "little")
+            image = base64.b64encode(data).decode("ascii")
+            outputs.append(
+                new_output("display_data", data={"image/png": image, "text/plain": "<Figure>"})
+            )
+        code_cells += 1
+        notebook_cells.append(
+            new_code_cell(
+                f"x_{index} = compute({index})\nprint(x_{index})",
+                execution_count=code_cells,
+                outputs=outputs,
+            )
+        )
+
+    return new_notebook(cells=notebook_cells, metadata=KERNEL_LANGUAGES[language])
+
+
+def write_notebook(notebook: nbformat.NotebookNode, path: Path, revision: int = 0) -> Path:
+    """Write a notebook file. Different revisions have different content, so that nbautoexport
+    does not skip exporting them as unchanged.
+
+    Args:
+        notebook (nbformat.NotebookNode): notebook to write
+        path (Path): path to write to
+        revision (int): revision number, written into the notebook's first cell
+
+    Returns:
+        Path: path written
+    """
+    notebook = nbformat.from_dict(notebook)
+    if notebook.cells:
+        notebook.cells[0].source = f"# Revision {revision}\n\n{notebook.cells[0].source}"
+    nbformat.write(notebook, str(path))
+    return Path(path)
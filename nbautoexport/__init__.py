@@ -1,4 +1,3 @@
-from nbautoexport.export import post_save
 from nbautoexport.utils import __version__, get_logger
 
 __all__ = [
@@ -6,3 +5,20 @@ __all__ = [
     "get_logger",
 ]
 __version__
+
+
+def __getattr__(name):
+    # post_save is imported on first use, since importing nbconvert is slow and most CLI commands
+    # never export
+    if name == "post_save":
+        from nbautoexport.export import post_save
+
+        return post_save
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _jupyter_server_extension_points():
+    # Imported here, so that importing nbautoexport does not import jupyter_server
+    from nbautoexport.extension import NbAutoexportExtension
+
+    return [{"module": "nbautoexport.extension", "app": NbAutoexportExtension}]
@@ -0,0 +1,241 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+import threading
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from nbautoexport.utils import get_logger
+
+logger = get_logger()
+
+
+class ExportJob:
+    """A single requested export of a notebook, as queued by BackgroundExporter."""
+
+    def __init__(self, notebook_path: Path, export_fn: Callable[..., Any], args, kwargs):
+        self.notebook_path = notebook_path
+        self.export_fn = export_fn
+        self.args = args
+        self.kwargs = kwargs
+        self.generation = 0
+        self.future: Future = Future()
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            self.future.set_result(self.export_fn(*self.args, **self.kwargs))
+        except BaseException as e:  # nbconvert calls sys.exit on conversion errors
+            self.future.set_exception(e)
+
+
+class BackgroundExporter:
+    """Pool of worker threads owned by nbautoexport that runs exports in the background, so that
+    the post-save hook can return without waiting for nbconvert.
+
+    Repeated saves of the same notebook are coalesced. A save starts a debounce window, and each
+    further save of that notebook within the window restarts it, so a burst of saves results in a
+    single export once the notebook has been quiet for `debounce` seconds. Exports that are
+    superseded by a newer save before they start are dropped, and at most one export per notebook
+    runs at a time. An export that is already running is allowed to finish, since interrupting
+    nbconvert could leave partial output; the latest save is exported right after it.
+
+    Args:
+        max_workers (int): maximum number of exports to run at the same time
+        debounce (float): seconds to wait for further saves of a notebook before exporting it
+    """
+
+    def __init__(self, max_workers: int = 1, debounce: float = 0.0):
+        self.max_workers = max_workers
+        self.debounce = debounce
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="nbautoexport"
+        )
+        self._lock = threading.Lock()
+        self._generations: Dict[Path, int] = {}
+        self._timers: Dict[Path, Tuple[threading.Timer, ExportJob]] = {}
+        self._running: Set[Path] = set()
+        self._pending: Dict[Path, ExportJob] = {}
+        # Separate lock, since futures are cancelled while holding _lock, which runs callbacks
+        self._outstanding_lock = threading.Lock()
+        self._outstanding = 0
+
+    def submit(
+        self, notebook_path: Path, export_fn: Callable[..., Any], *args, **kwargs
+    ) -> Future:
+        """Queue an export to run on a worker thread. Completion and failure are reported through
+        the nbautoexport logger.
+
+        Args:
+            notebook_path (Path): notebook being exported, used to coalesce repeated saves
+            export_fn (Callable): function that performs the export
+            *args: positional arguments for export_fn
+            **kwargs: keyword arguments for export_fn
+
+        Returns:
+            Future: future for the queued export. It is cancelled if the export is superseded by
+                a newer save of the same notebook.
+        """
+        logger.debug(f"nbautoexport | Queuing background export of {notebook_path} ...")
+        job = ExportJob(notebook_path, export_fn, args, kwargs)
+        job.future.add_done_callback(partial(self._log_result, notebook_path))
+        with self._outstanding_lock:
+            self._outstanding += 1
+        job.future.add_done_callback(self._job_done)
+
+        with self._lock:
+            job.generation = self._generations.get(notebook_path, 0) + 1
+            self._generations[notebook_path] = job.generation
+            superseded = self._timers.pop(notebook_path, None)
+            if self.debounce > 0:
+                timer = threading.Timer(self.debounce, self._debounce_elapsed, args=(job,))
+                timer.daemon = True
+                self._timers[notebook_path] = (timer, job)
+                timer.start()
+
+        if superseded is not None:
+            superseded_timer, superseded_job = superseded
+            superseded_timer.cancel()
+            superseded_job.future.cancel()
+        if self.debounce <= 0:
+            self._enqueue(job)
+        return job.future
+
+    def _is_stale(self, job: ExportJob) -> bool:
+        return job.generation != self._generations.get(job.notebook_path)
+
+    def _debounce_elapsed(self, job: ExportJob):
+        with self._lock:
+            timer_and_job = self._timers.get(job.notebook_path)
+            if timer_and_job is None or timer_and_job[1] is not job:
+                return
+            del self._timers[job.notebook_path]
+        self._enqueue(job)
+
+    def _enqueue(self, job: ExportJob):
+        try:
+            self._executor.submit(self._run, job)
+        except RuntimeError:
+            # Executor has been shut down
+            job.future.cancel()
+
+    def _run(self, job: ExportJob):
+        notebook_path = job.notebook_path
+        with self._lock:
+            if self._is_stale(job):
+                job.future.cancel()
+                return
+            if notebook_path in self._running:
+                # Run after the in-flight export of this notebook, replacing any older pending job
+                superseded = self._pending.get(notebook_path)
+                self._pending[notebook_path] = job
+                if superseded is not None:
+                    superseded.future.cancel()
+                return
+            self._running.add(notebook_path)
+
+        next_job: Optional[ExportJob] = job
+        while next_job is not None:
+            next_job.run()
+            with self._lock:
+                next_job = self._pending.pop(notebook_path, None)
+                if next_job is not None and self._is_stale(next_job):
+                    # A newer save is queued or debouncing and will run on its own
+                    next_job.future.cancel()
+                    next_job = None
+                if next_job is None:
+                    self._running.discard(notebook_path)
+
+    def _job_done(self, future: Future):
+        with self._outstanding_lock:
+            self._outstanding -= 1
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of exports submitted that have not finished or been superseded, including
+        exports that are debouncing or running."""
+        with self._outstanding_lock:
+            return self._outstanding
+
+    @staticmethod
+    def _log_result(notebook_path: Path, future: Future):
+        if future.cancelled():
+            logger.debug(
+                f"nbautoexport | Background export of {notebook_path} was superseded or cancelled."
+            )
+            return
+        exc = future.exception()
+        if exc is None:
+            logger.info(f"nbautoexport | Background export of {notebook_path} completed.")
+        else:
+            logger.error(
+                f"nbautoexport | Background export of {notebook_path} failed due to "
+                f"{type(exc).__name__}: {exc}"
+            )
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting new exports and release the worker threads.
+
+        Args:
+            wait (bool): whether to block until queued exports have finished. Exports still in
+                their debounce window are run immediately if True, or dropped if False.
+        """
+        with self._lock:
+            debouncing = list(self._timers.values())
+            self._timers.clear()
+        for timer, job in debouncing:
+            timer.cancel()
+            if wait:
+                self._enqueue(job)
+            else:
+                job.future.cancel()
+        self._executor.shutdown(wait=wait)
+
+
+_background_exporter: Optional[BackgroundExporter] = None
+_background_exporter_lock = threading.Lock()
+
+
+def enable_background_exports(max_workers: int = 1, debounce: float = 0.0) -> BackgroundExporter:
+    """Run post-save exports in the background. Replaces any existing background exporter, which
+    is allowed to finish its queued exports.
+
+    Args:
+        max_workers (int): maximum number of exports to run at the same time
+        debounce (float): seconds to wait for further saves of a notebook before exporting it
+
+    Returns:
+        BackgroundExporter: the active background exporter
+    """
+    global _background_exporter
+    background_exporter = BackgroundExporter(max_workers=max_workers, debounce=debounce)
+    with _background_exporter_lock:
+        previous = _background_exporter
+        _background_exporter = background_exporter
+    if previous is not None:
+        previous.shutdown(wait=False)
+    logger.info(
+        "nbautoexport | Background exports enabled with "
+        f"max_workers={max_workers}, debounce={debounce}."
+    )
+    return background_exporter
+
+
+def disable_background_exports(wait: bool = True):
+    """Run post-save exports synchronously again, shutting down any active background exporter.
+
+    Args:
+        wait (bool): whether to block until queued exports have finished
+    """
+    global _background_exporter
+    with _background_exporter_lock:
+        previous = _background_exporter
+        _background_exporter = None
+    if previous is not None:
+        previous.shutdown(wait=wait)
+        logger.info("nbautoexport | Background exports disabled.")
+
+
+def get_background_exporter() -> Optional[BackgroundExporter]:
+    """Return the active background exporter, or None if exports run synchronously."""
+    return _background_exporter
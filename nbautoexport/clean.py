@@ -1,10 +1,15 @@
-from typing import Iterable, List, Set
+import itertools
+import os
+from typing import Iterable, Iterator, List, Optional, Pattern, Set, Tuple, Union
 from pathlib import Path
+import re
 
-from nbconvert.exporters import get_exporter
-
-from nbautoexport.utils import find_notebooks, JupyterNotebook
+from nbautoexport.manifest import load_manifest
+from nbautoexport.notebook import JupyterNotebook
+from nbautoexport.utils import exporter_extension, find_notebook_descriptors, NotebookDescriptor
 from nbautoexport.sentinel import (
+    CleanMode,
+    EXPORT_MANIFEST_FILE,
     ExportFormat,
     NbAutoexportConfig,
     OrganizeBy,
@@ -19,11 +24,14 @@ FORMATS_WITH_IMAGE_DIR = [
 ]
 
 
-def get_extension(notebook: JupyterNotebook, export_format: ExportFormat) -> str:
+def get_extension(
+    notebook: Union[JupyterNotebook, NotebookDescriptor], export_format: ExportFormat
+) -> str:
     """Given a notebook and export format, return expected export file extension.
 
     Args:
-        notebook (JupyterNotebook): notebook to determine extension for
+        notebook (Union[JupyterNotebook, NotebookDescriptor]): notebook to determine extension
+            for
         export_format (str): export format name
 
     Returns:
@@ -33,21 +41,23 @@ def get_extension(notebook: JupyterNotebook, export_format: ExportFormat) -> str
     if ExportFormat(export_format) == ExportFormat.script:
         return notebook.get_script_extension()
 
-    exporter = get_exporter(ExportFormat(export_format).value)
+    extension = exporter_extension(ExportFormat(export_format).value)
 
     if ExportFormat(export_format) == ExportFormat.notebook:
-        return f".nbconvert{exporter().file_extension}"
-    return exporter().file_extension
+        return f".nbconvert{extension}"
+    return extension
 
 
 def notebook_exports_generator(
-    notebook: JupyterNotebook, export_format: ExportFormat, organize_by: OrganizeBy
+    notebook: Union[JupyterNotebook, NotebookDescriptor],
+    export_format: ExportFormat,
+    organize_by: OrganizeBy,
 ) -> Iterable[Path]:
     """Generator that yields paths of expected exports for a notebook given an export_format and
     an organize_by setting.
 
     Args:
-        notebook (JupyterNotebook): notebook to get export paths for
+        notebook (Union[JupyterNotebook, NotebookDescriptor]): notebook to get export paths for
         export_format (ExportFormat): export format
         organize_by (OrganizeBy): type of subfolder approach
 
@@ -68,13 +78,13 @@ def notebook_exports_generator(
 
 
 def get_expected_exports(
-    notebooks: Iterable[JupyterNotebook], config: NbAutoexportConfig
+    notebooks: Iterable[Union[JupyterNotebook, NotebookDescriptor]], config: NbAutoexportConfig
 ) -> List[Path]:
     """Given an iterable of Jupyter notebooks, return list of paths of files that nbautoexport
     would be expected to export to given this configuration.
 
     Args:
-        notebooks (Iterable[JupyterNotebooks]): iterable of notebooks
+        notebooks (Iterable[Union[JupyterNotebook, NotebookDescriptor]]): iterable of notebooks
 
     Returns:
         List[Path]: list of expected nbautoexport output files, relative to notebook files
@@ -89,18 +99,153 @@ def get_expected_exports(
     return sorted(export_paths)
 
 
-def globs(directory: Path, patterns: Iterable[str]) -> Iterable[Path]:
-    """Generator that yields paths matching glob-style patterns relative to directory.
+def translate_glob(pattern: str) -> str:
+    """Translate a glob-style pattern relative to a directory into a regular expression matching
+    '/'-separated relative paths, with the same semantics as pathlib's Path.glob: '*' and '?' don't
+    match across '/', '[...]' matches a character set, and a '**' path segment matches zero or
+    more directories. As in Python 3.13's pathlib, a trailing '**' segment matches everything
+    beneath a directory.
 
     Args:
-        directory (Path): a directory
-        patterns (Iterable[str]): glob-style patterns relative to directory
+        pattern (str): glob-style pattern
 
-    Yields:
-        Path: paths matching provided patterns relative to directory
+    Returns:
+        str: regular expression pattern
+    """
+    segments = [segment for segment in pattern.replace(os.sep, "/").split("/") if segment != ""]
+    parts = []
+    for i, segment in enumerate(segments):
+        is_last = i == len(segments) - 1
+        if segment == "**":
+            parts.append(".*" if is_last else "(?:[^/]+/)*")
+            continue
+        parts.append(_translate_glob_segment(segment) + ("" if is_last else "/"))
+    return "".join(parts)
+
+
+def _translate_glob_segment(segment: str) -> str:
+    parts = []
+    i = 0
+    while i < len(segment):
+        char = segment[i]
+        i += 1
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            # As in fnmatch, a ']' right after '[' or '[!' is part of the set
+            start = i + 1 if segment[i : i + 1] == "!" else i
+            start = start + 1 if segment[start : start + 1] == "]" else start
+            end = segment.find("]", start)
+            if end == -1:
+                parts.append(re.escape(char))
+                continue
+            char_set = segment[i:end]
+            negate = char_set.startswith("!")
+            if negate:
+                char_set = char_set[1:]
+            char_set = "".join(f"\\{c}" if c in "\\[]^&~|" else c for c in char_set)
+            if negate:
+                char_set = "^" + char_set
+            parts.append(f"[{char_set}]")
+            i = end + 1
+        else:
+            parts.append(re.escape(char))
+    return "".join(parts)
+
+
+class ExcludeMatcher:
+    """Matcher for glob-style exclude patterns compiled into regular expressions, so that each
+    path is tested against all patterns at once and in memory, without walking the directory tree
+    once per pattern.
+
+    Patterns follow .gitignore-like semantics: a pattern starting with '!' is a negation that
+    re-includes paths matched by earlier patterns, and the last matching pattern wins. A directory
+    that is excluded, by matching a pattern itself (e.g., 'data' or '**/data') or by a pattern
+    ending in a '**' segment beneath it (e.g., 'data/**'), is excluded with all of its contents,
+    which can't be re-included by a negation. Other patterns matching a directory's contents
+    (e.g., 'data/*') only exclude the files they match.
+
+    Args:
+        patterns (Iterable[str]): glob-style patterns relative to a directory
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+        flags = re.IGNORECASE if os.name == "nt" else 0
+        # Consecutive patterns with the same polarity are combined into one regular expression,
+        # together with one matching the directories that a run's trailing '**' patterns exclude
+        self._runs: List[Tuple[bool, Pattern, Optional[Pattern]]] = []
+        for negated, run in itertools.groupby(self.patterns, key=lambda p: p.startswith("!")):
+            run_patterns = [pattern[1:] if negated else pattern for pattern in run]
+            regex = "|".join(f"(?:{translate_glob(pattern)})" for pattern in run_patterns)
+            dir_regex = "|".join(
+                f"(?:{translate_glob(prefix)})"
+                for prefix in map(_subtree_prefix, run_patterns)
+                if prefix is not None
+            )
+            self._runs.append(
+                (
+                    negated,
+                    re.compile(f"(?s:{regex})", flags),
+                    re.compile(f"(?s:{dir_regex})", flags) if dir_regex else None,
+                )
+            )
+
+    def matches(self, relative_path: str) -> bool:
+        """Whether a '/'-separated file path relative to the directory is excluded."""
+        for negated, regex, _ in reversed(self._runs):
+            if regex.fullmatch(relative_path) is not None:
+                return not negated
+        return False
+
+    def matches_dir(self, relative_path: str) -> bool:
+        """Whether a '/'-separated directory path relative to the directory is excluded together
+        with all of its contents, so that walking it can be skipped."""
+        for negated, regex, dir_regex in reversed(self._runs):
+            if regex.fullmatch(relative_path) is not None or (
+                dir_regex is not None and dir_regex.fullmatch(relative_path) is not None
+            ):
+                return not negated
+        return False
+
+
+def _subtree_prefix(pattern: str) -> Optional[str]:
+    # The directory part of a pattern ending in a '**' segment, e.g., 'data' for 'data/**'
+    segments = [segment for segment in pattern.replace(os.sep, "/").split("/") if segment != ""]
+    if len(segments) < 2 or segments[-1] != "**":
+        return None
+    return "/".join(segments[:-1])
+
+
+def managed_subfolders(
+    directory: Path,
+    notebooks: Iterable[Union[JupyterNotebook, NotebookDescriptor]],
+    config: NbAutoexportConfig,
+) -> Set[Path]:
+    """Given path to a notebooks directory watched by nbautoexport, return the subfolders that
+    nbautoexport exports to under the current configuration: a subfolder for every configured
+    export format if organizing by extension, or a subfolder for every notebook if organizing by
+    notebook. Subfolders of exports recorded in the export manifest by earlier exports, e.g., of
+    since renamed notebooks or with other settings, are included too. Subfolders may not exist.
+
+    Args:
+        directory (Path): notebooks directory
+        notebooks (Iterable[Union[JupyterNotebook, NotebookDescriptor]]): notebooks in
+            directory
+        config (NbAutoexportConfig): configuration
+
+    Returns:
+        Set[Path]: subfolders that nbautoexport may have written exports to
     """
-    for pattern in patterns:
-        yield from directory.glob(pattern)
+    if config.organize_by == OrganizeBy.extension:
+        names = {export_format.value for export_format in config.export_formats}
+    else:
+        names = {notebook.name for notebook in notebooks}
+    for entry in load_manifest(directory).notebooks.values():
+        names.update(export.split("/", 1)[0] for export in entry.exports if "/" in export)
+    return {directory / name for name in names}
 
 
 def find_files_to_clean(directory: Path, config: NbAutoexportConfig) -> List[Path]:
@@ -108,25 +253,68 @@ def find_files_to_clean(directory: Path, config: NbAutoexportConfig) -> List[Pat
     expected exports by current nbautoexport configuration and existing notebooks, or other
     expected Jupyter or nbautoexport files.
 
+    If the clean mode is 'managed', only files in subfolders that nbautoexport could have exported
+    to are considered, see managed_subfolders. Other files are never cleaned.
+
     Args:
         directory (Path): notebooks directory to find files to clean up
 
     Returns:
         List[Path]: list of files to clean up
     """
-    notebooks: List[JupyterNotebook] = find_notebooks(directory)
-    expected_exports: List[Path] = get_expected_exports(notebooks, config)
-    checkpoints = (f for f in directory.glob(".ipynb_checkpoints/*") if f.is_file())
-    sentinel_path = directory / SAVE_PROGRESS_INDICATOR_FILE
-
-    subfiles = (f for f in directory.glob("**/*") if f.is_file())
-
-    to_clean = (
-        set(subfiles)
-        .difference(nb.path for nb in notebooks)
-        .difference(expected_exports)
-        .difference(globs(directory=directory, patterns=config.clean.exclude))
-        .difference(checkpoints)
-        .difference([sentinel_path])
-    )
-    return sorted(to_clean)
+    return sorted(iter_files_to_clean(directory, config))
+
+
+def iter_files_to_clean(directory: Path, config: NbAutoexportConfig) -> Iterator[Path]:
+    """Generator that yields files to clean up in a notebooks directory watched by nbautoexport.
+    See find_files_to_clean. The directory tree is walked once with os.scandir, and each file is
+    classified as it is found against an index of expected files and an ExcludeMatcher of exclude
+    patterns, so the full tree is never held in memory. Excluded directories are pruned, so their
+    contents are never listed. Symbolic links to directories are not followed. In 'managed' clean
+    mode, only subfolders that nbautoexport could have exported to are walked.
+
+    Args:
+        directory (Path): notebooks directory to find files to clean up
+
+    Yields:
+        Path: files to clean up, in walk order
+    """
+    notebooks = find_notebook_descriptors(directory, validation=config.validation)
+    expected: Set[Path] = {nb.path for nb in notebooks}
+    for notebook in notebooks:
+        for export_format in config.export_formats:
+            expected.update(
+                notebook_exports_generator(notebook, export_format, config.organize_by)
+            )
+    expected.update([directory / SAVE_PROGRESS_INDICATOR_FILE, directory / EXPORT_MANIFEST_FILE])
+    exclude = ExcludeMatcher(config.clean.exclude)
+    checkpoints_dir = directory / ".ipynb_checkpoints"
+
+    if config.clean.mode == CleanMode.managed:
+        stack = [
+            (subfolder, f"{subfolder.name}/")
+            for subfolder in sorted(
+                managed_subfolders(directory, notebooks, config), reverse=True
+            )
+            if subfolder.is_dir()
+            and not subfolder.is_symlink()
+            and not exclude.matches_dir(subfolder.name)
+        ]
+    else:
+        stack = [(directory, "")]
+    while stack:
+        current, relative_prefix = stack.pop()
+        with os.scandir(current) as entries:
+            for entry in entries:
+                path = current / entry.name
+                relative_path = relative_prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if not exclude.matches_dir(relative_path):
+                        stack.append((path, relative_path + "/"))
+                elif (
+                    entry.is_file()
+                    and path not in expected
+                    and current != checkpoints_dir
+                    and not exclude.matches(relative_path)
+                ):
+                    yield path
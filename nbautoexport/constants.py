@@ -0,0 +1,50 @@
+from enum import Enum
+
+# Configuration options and file names, kept free of slow imports such as pydantic, so that the
+# command line interface can define its options without them. Also available from
+# nbautoexport.sentinel.
+
+SAVE_PROGRESS_INDICATOR_FILE = ".nbautoexport"
+EXPORT_MANIFEST_FILE = ".nbautoexport-manifest"
+
+
+class ExportFormat(str, Enum):
+    asciidoc = "asciidoc"
+    html = "html"
+    latex = "latex"
+    markdown = "markdown"
+    notebook = "notebook"
+    pdf = "pdf"
+    rst = "rst"
+    script = "script"
+    slides = "slides"
+
+    @classmethod
+    def has_value(cls, value: str) -> bool:
+        return any(level for level in cls if level.value == value)
+
+
+class OrganizeBy(str, Enum):
+    notebook = "notebook"
+    extension = "extension"
+
+
+class CleanMode(str, Enum):
+    all = "all"
+    managed = "managed"
+
+
+class ValidationMode(str, Enum):
+    """How thoroughly files are checked when finding notebooks. 'full' validates notebooks against
+    the nbformat schema, 'fast' checks only their top-level structure, and 'off' only requires a
+    JSON object."""
+
+    full = "full"
+    fast = "fast"
+    off = "off"
+
+
+DEFAULT_EXPORT_FORMATS = [ExportFormat.script]
+DEFAULT_ORGANIZE_BY = OrganizeBy.extension
+DEFAULT_VALIDATION = ValidationMode.fast
+DEFAULT_CLEAN_MODE = CleanMode.all
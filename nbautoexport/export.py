@@ -1,65 +1,234 @@
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import logging
+import os
 from pathlib import Path
 import re
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
 
+from nbconvert.exporters import Exporter, get_exporter
+from nbconvert.exporters.exporter import ResourcesDict
 from nbconvert.nbconvertapp import NbConvertApp
-from nbconvert.postprocessors.base import PostProcessorBase
+from nbconvert.utils.exceptions import ConversionException
 from jupyter_server.services.contents.filemanager import FileContentsManager
+import nbformat
 
-from nbautoexport.clean import FORMATS_WITH_IMAGE_DIR
+from nbautoexport.background import get_background_exporter
+from nbautoexport.manifest import (
+    hash_config,
+    hash_notebook,
+    is_export_current,
+    make_manifest_entry,
+    ManifestEntry,
+    record_exports,
+)
+from nbautoexport.metrics import get_export_metrics
 from nbautoexport.sentinel import (
     ExportFormat,
     NbAutoexportConfig,
+    read_sentinel,
     SAVE_PROGRESS_INDICATOR_FILE,
 )
-from nbautoexport.utils import cleared_argv, get_logger
+from nbautoexport.timing import timing_span
+from nbautoexport.utils import get_logger, write_if_changed
+from nbautoexport.worker import get_export_worker
 
 logger = get_logger()
 
+# Attribute of a contents manager holding the ExportService of the nbautoexport server extension,
+# if the extension registered its post-save hook with it
+SERVICE_ATTRIBUTE = "nbautoexport_service"
 
-class CopyToSubfolderPostProcessor(PostProcessorBase):
-    def __init__(self, subfolder: str, export_format: ExportFormat):
-        self.subfolder = subfolder
-        self.export_format = export_format
-        super(CopyToSubfolderPostProcessor, self).__init__()
+CELL_NUMBER_REGEX = re.compile(r"\n#\sIn\[(([0-9]+)|(\s))\]:\n{2}")
 
-    def postprocess(self, input: str):
-        """Save converted file to a separate directory, removing cell numbers."""
-        if self.subfolder is None:
-            return
 
-        input: Path = Path(input)
+def strip_cell_numbers(text: str) -> str:
+    """Remove cell number comments, e.g., '# In[1]:', from exported text."""
+    return CELL_NUMBER_REGEX.sub("", text)
 
-        new_dir = input.parent / self.subfolder
-        new_dir.mkdir(exist_ok=True)
-        new_path = new_dir / input.name
 
-        if self.export_format == ExportFormat.pdf:
-            # Can't read pdf file as unicode, skip rest of postprocessing and just copy
-            input.replace(new_path)
-            return
+class ExportedFiles(NamedTuple):
+    """Files of an export, split by whether they were written or already had the exported
+    content and were left unchanged."""
+
+    written: List[Path]
+    unchanged: List[Path]
+
+    @property
+    def paths(self) -> List[Path]:
+        return self.written + self.unchanged
+
+
+def write_export(
+    output: Union[str, bytes],
+    resources: ResourcesDict,
+    notebook_path: Path,
+    subfolder: str,
+    export_format: ExportFormat,
+    output_name: str,
+) -> ExportedFiles:
+    """Write an export rendered in memory straight into its subfolder next to the notebook,
+    removing cell numbers. Any extracted resources, such as images, are written into the
+    subfolder as well. Each file is written once, atomically, and files whose existing content
+    is identical to the export are left untouched.
+
+    Args:
+        output (Union[str, bytes]): rendered export from an nbconvert exporter
+        resources (ResourcesDict): resources from the nbconvert exporter
+        notebook_path (Path): path to notebook file that was exported
+        subfolder (str): name of subfolder to save export in
+        export_format (ExportFormat): export format
+        output_name (str): file name of export without extension
+
+    Returns:
+        ExportedFiles: paths of files written and of files left unchanged
+    """
+    new_dir = Path(notebook_path).parent / subfolder
+    new_dir.mkdir(exist_ok=True)
+
+    files = ExportedFiles(written=[], unchanged=[])
+    for filename, data in resources.get("outputs", {}).items():
+        resource_path = new_dir / filename
+        resource_path.parent.mkdir(parents=True, exist_ok=True)
+        if write_if_changed(resource_path, data):
+            files.written.append(resource_path)
+        else:
+            files.unchanged.append(resource_path)
+
+    export_path = new_dir / f"{output_name}{resources.get('output_extension', '')}"
+    if export_format != ExportFormat.pdf and isinstance(output, str):
+        # Can't treat pdf as unicode, so only text formats have cell numbers removed
+        output = strip_cell_numbers(output)
+    if write_if_changed(export_path, output):
+        files.written.append(export_path)
+    else:
+        files.unchanged.append(export_path)
+    return files
+
+
+class ExporterRegistry:
+    """Long-lived, thread-safe registry of configured nbconvert exporters. Loading nbconvert's
+    configuration and building an exporter (with its templates and preprocessors) is done once
+    per export format, and reused for all later exports in the same process.
+
+    Configuration is loaded from Jupyter's config files without parsing sys.argv, so that
+    arguments of the outer program are never passed to nbconvert. Use `clear` to reload
+    configuration, e.g., after changing nbconvert config files.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._app: Optional[NbConvertApp] = None
+        self._exporters: Dict[ExportFormat, Tuple[Exporter, threading.Lock]] = {}
+
+    @property
+    def app(self) -> NbConvertApp:
+        """Initialized NbConvertApp holding nbconvert configuration."""
+        with self._lock:
+            if self._app is None:
+                app = NbConvertApp()
+                # A copy, so handlers nbconvert adds to its log don't leak into nbautoexport's
+                app.log.handlers = list(logger.handlers)
+                app.log.setLevel(logger.level)
+                app.initialize(argv=[])
+                self._app = app
+            return self._app
+
+    def get(self, export_format: ExportFormat) -> Tuple[Exporter, threading.Lock]:
+        """Return the exporter for an export format, building it on first use. Exporters don't
+        depend on the organize_by setting, so one exporter per format serves every directory.
 
-        # Rewrite converted file to new path, removing cell numbers
-        with input.open("r", encoding="utf-8") as f:
-            text = f.read()
-        with new_path.open("w", encoding="utf-8") as f:
-            f.write(re.sub(r"\n#\sIn\[(([0-9]+)|(\s))\]:\n{2}", "", text))
+        Args:
+            export_format (ExportFormat): export format
 
-        # For some formats, we also need to move the assets directory, for stuff like images
-        if self.export_format in FORMATS_WITH_IMAGE_DIR:
-            assets_dir = input.parent / f"{input.stem}_files"
-            if assets_dir.exists() and assets_dir.is_dir():
-                new_assets_dir = new_dir / f"{input.stem}_files"
-                new_assets_dir.mkdir(exist_ok=True)
-                for asset in assets_dir.iterdir():
-                    asset.replace(new_assets_dir / asset.name)
-                assets_dir.rmdir()
+        Returns:
+            Tuple[Exporter, threading.Lock]: exporter, and lock to hold while using it
+        """
+        app = self.app
+        with self._lock:
+            if export_format not in self._exporters:
+                logger.debug(f"nbautoexport | Building exporter for {export_format.value}")
+                exporter = get_exporter(export_format.value)(config=app.config)
+                self._exporters[export_format] = (exporter, threading.Lock())
+            return self._exporters[export_format]
 
-        input.unlink()
+    def export(
+        self,
+        notebook: nbformat.NotebookNode,
+        notebook_path: Path,
+        export_format: ExportFormat,
+        subfolder: str,
+    ) -> ExportedFiles:
+        """Convert an already-parsed notebook to an export format, then write the output into a
+        subfolder next to the notebook. Mirrors NbConvertApp.convert_single_notebook, except that
+        the exporter is given the parsed notebook instead of rereading it from disk, and that the
+        output is written directly into the subfolder with write_export.
+
+        Args:
+            notebook (nbformat.NotebookNode): parsed notebook
+            notebook_path (Path): path to notebook file that notebook was read from
+            export_format (ExportFormat): export format
+            subfolder (str): name of subfolder to save export in
+
+        Returns:
+            ExportedFiles: paths of files written and of files left unchanged
+        """
+        app = self.app
+        exporter, exporter_lock = self.get(export_format)
+        app.log.info(f"Converting notebook {notebook_path} to {export_format.value}")
+
+        resources = app.init_single_notebook_resources(str(notebook_path))
+        resources.update(notebook_resources(notebook_path))
+        with exporter_lock, timing_span(
+            "render", notebook=notebook_path, format=export_format.value
+        ):
+            try:
+                output, resources = exporter.from_notebook_node(notebook, resources=resources)
+            except ConversionException:
+                app.log.error(f"Error while converting '{notebook_path}'", exc_info=True)
+                app.exit(1)
+
+        output_name = resources["unique_key"]
+        if app.use_output_suffix and app.output_base in ("", "{notebook_name}"):
+            output_name += resources.get("output_suffix", "")
+        with timing_span("write_export", notebook=notebook_path, format=export_format.value):
+            return write_export(
+                output,
+                resources,
+                notebook_path=notebook_path,
+                subfolder=subfolder,
+                export_format=export_format,
+                output_name=output_name,
+            )
+
+    def clear(self):
+        """Discard loaded configuration and exporters, so they are rebuilt on next use."""
+        with self._lock:
+            self._app = None
+            self._exporters = {}
+
+
+_exporter_registry = ExporterRegistry()
+
+
+def get_exporter_registry() -> ExporterRegistry:
+    """Return the process-wide exporter registry."""
+    return _exporter_registry
 
 
 def post_save(model: dict, os_path: str, contents_manager: FileContentsManager):
     """Post-save hook for converting notebooks to other formats using Jupyter nbconvert and saving
-    in a subfolder.
+    in a subfolder. If background exports have been enabled with
+    `nbautoexport.background.enable_background_exports`, the export is queued to a worker thread
+    and this hook returns without waiting for it. If an export worker process has been enabled with
+    `nbautoexport.worker.enable_worker_exports`, the export runs in that process, and is always
+    queued. The export is skipped if the notebook content and configuration are unchanged since
+    the last export recorded in the directory's manifest. If the
+    nbautoexport server extension has registered its own hook with the contents manager, this hook
+    does nothing, so that notebooks are not exported twice.
 
     The following arguments are standard for Jupyter post-save hooks. See [Jupyter Documentation](
     https://jupyter-notebook.readthedocs.io/en/stable/extending/savehooks.html).
@@ -70,7 +239,31 @@ def post_save(model: dict, os_path: str, contents_manager: FileContentsManager):
         os_path (str): the filesystem path to the file just written
         contents_manager (FileContentsManager): FileContentsManager instance that hook is bound to
     """
+    if getattr(contents_manager, SERVICE_ATTRIBUTE, None) is not None:
+        logger.debug(
+            "nbautoexport | Post-save hook is registered by the nbautoexport server extension. "
+            "Nothing to do."
+        )
+        return
+    handle_save(model, os_path)
+
+
+def handle_save(model: dict, os_path: str):
+    """Export a file that was just saved, if it is a notebook in a directory configured with an
+    .nbautoexport file. This is the body of the post-save hook, shared by post_save and the
+    nbautoexport server extension.
+
+    Args:
+        model (dict): the model representing the file
+        os_path (str): the filesystem path to the file just written
+    """
     logger.debug("nbautoexport | Executing nbautoexport.export.post_save ...")
+    with timing_span("post_save", notebook=os_path):
+        _post_save(model, os_path)
+
+
+def _post_save(model: dict, os_path: str):
+    """Body of post_save, timed as one span."""
     try:
         # only do this for notebooks
         if model["type"] != "notebook":
@@ -81,14 +274,25 @@ def post_save(model: dict, os_path: str, contents_manager: FileContentsManager):
         notebook_path = Path(os_path)
         cwd = notebook_path.parent
         save_progress_indicator = cwd / SAVE_PROGRESS_INDICATOR_FILE
-        should_convert = save_progress_indicator.exists()
+        try:
+            with timing_span("read_sentinel", path=save_progress_indicator):
+                config = read_sentinel(save_progress_indicator)
+        except FileNotFoundError:
+            config = None
 
-        if should_convert:
+        if config is not None:
             logger.info(f"nbautoexport | {save_progress_indicator} found. Exporting notebook ...")
-            config = NbAutoexportConfig.parse_file(
-                path=save_progress_indicator, content_type="application/json", encoding="utf-8"
-            )
-            export_notebook(notebook_path, config=config)
+            export_fn = export_notebook
+            export_worker = get_export_worker()
+            if export_worker is not None:
+                export_fn = export_worker.export_notebook
+            background_exporter = get_background_exporter()
+            if background_exporter is not None:
+                background_exporter.submit(
+                    notebook_path, export_fn, notebook_path, config=config, use_manifest=True
+                )
+            else:
+                export_fn(notebook_path, config=config, use_manifest=True)
 
         else:
             logger.debug(f"nbautoexport | {save_progress_indicator} not found. Nothing to do.")
@@ -97,30 +301,263 @@ def post_save(model: dict, os_path: str, contents_manager: FileContentsManager):
         logger.error(f"nbautoexport | post_save failed due to {type(e).__name__}: {e}")
 
 
-def export_notebook(notebook_path: Path, config: NbAutoexportConfig):
-    """Export a given notebook file given configuration.
+def read_notebook(notebook_path: Path) -> nbformat.NotebookNode:
+    """Read a notebook file into a NotebookNode that can be passed to each exporter.
+
+    Args:
+        notebook_path (Path): path to notebook file
+
+    Returns:
+        nbformat.NotebookNode: parsed notebook, converted to nbformat version 4
+    """
+    with Path(notebook_path).open("r", encoding="utf-8") as fp:
+        return nbformat.read(fp, as_version=4)
+
+
+def notebook_resources(notebook_path: Path) -> ResourcesDict:
+    """Build the filesystem metadata resources that nbconvert exporters expect. This matches what
+    an exporter's from_filename method would set up before converting.
+
+    Args:
+        notebook_path (Path): path to notebook file
+
+    Returns:
+        ResourcesDict: resources with notebook name, path, and modified date
+    """
+    notebook_path = Path(notebook_path)
+    modified_date = datetime.datetime.fromtimestamp(
+        os.path.getmtime(notebook_path), tz=datetime.timezone.utc
+    )
+    # datetime.strftime date format for ipython
+    date_format = "%B %d, %Y" if sys.platform == "win32" else "%B %-d, %Y"
+
+    resources = ResourcesDict()
+    resources["metadata"] = ResourcesDict()
+    resources["metadata"]["name"] = notebook_path.stem
+    resources["metadata"]["path"] = str(notebook_path.parent)
+    resources["metadata"]["modified_date"] = modified_date.strftime(date_format)
+    return resources
+
+
+def export_notebook(
+    notebook_path: Path,
+    config: NbAutoexportConfig,
+    use_manifest: bool = False,
+    force: bool = False,
+) -> bool:
+    """Export a given notebook file given configuration. The notebook file is read and parsed
+    once, and the parsed notebook is passed to the exporter for each export format.
 
     Args:
         notebook_path (Path): path to notebook to export with nbconvert
         config (NbAutoexportConfig): configuration
+        use_manifest (bool): whether to record the export in the directory's export manifest and
+            skip the export if the manifest shows that the notebook content and configuration are
+            unchanged since the last export and its exports still exist
+        force (bool): export even if the manifest shows that exports are up to date
+
+    Returns:
+        bool: whether the notebook was exported. False if skipped as unchanged.
     """
+    notebook_path = Path(notebook_path)
+    with timing_span("export_notebook", notebook=notebook_path):
+        files, entry = _export_notebook(notebook_path, config, use_manifest, force)
+        if entry is not None:
+            with timing_span("record_manifest", notebook=notebook_path):
+                record_exports(notebook_path.parent, {notebook_path.name: entry})
+    return files is not None
+
+
+_ExportOutcome = Tuple[Optional[ExportedFiles], Optional[ManifestEntry]]
+
+
+def _export_notebook(
+    notebook_path: Path, config: NbAutoexportConfig, use_manifest: bool, force: bool
+) -> _ExportOutcome:
+    """Export a notebook without writing to the export manifest. Returns the exported files, or
+    None if the export was skipped, and, if using the manifest, the record to add to it. The
+    outcome and duration are recorded in the export metrics."""
+    metrics = get_export_metrics()
+    start = time.perf_counter()
+    try:
+        files, entry = _convert_notebook(notebook_path, config, use_manifest, force)
+    except BaseException:  # nbconvert calls sys.exit on conversion errors
+        metrics.notebook_failures.inc()
+        raise
+    if files is None:
+        metrics.notebooks_skipped.inc()
+    else:
+        metrics.notebooks_exported.inc()
+        metrics.notebook_duration.observe(time.perf_counter() - start)
+    return files, entry
+
+
+def _convert_notebook(
+    notebook_path: Path, config: NbAutoexportConfig, use_manifest: bool, force: bool
+) -> _ExportOutcome:
+    """Body of _export_notebook, without recording metrics."""
+    notebook_path = Path(notebook_path)
+    with timing_span("read_notebook", notebook=notebook_path):
+        notebook = read_notebook(notebook_path)
+    if use_manifest:
+        with timing_span("check_manifest", notebook=notebook_path):
+            notebook_hash = hash_notebook(notebook)
+            config_hash = hash_config(config)
+            current = not force and is_export_current(notebook_path, notebook_hash, config_hash)
+        if current:
+            logger.info(f"nbautoexport | {notebook_path} is unchanged. Skipping export.")
+            return None, None
+
     logger.info(f"nbautoexport | Exporting {notebook_path} ...")
-    logger.debug(f"nbautoexport | Using export configuration:\n{config.json(indent=2)}")
-    with cleared_argv():
-        converter = NbConvertApp()
-        converter.log.handlers = logger.handlers
-        converter.log.setLevel(logger.level)
-
-        for export_format in config.export_formats:
-            if config.organize_by == "notebook":
-                subfolder = notebook_path.stem
-            elif config.organize_by == "extension":
-                subfolder = export_format.value
-
-            converter.postprocessor = CopyToSubfolderPostProcessor(
-                subfolder=subfolder, export_format=export_format
+    if logger.isEnabledFor(logging.DEBUG):
+        # Only serialize the configuration if it will be logged
+        logger.debug(f"nbautoexport | Using export configuration:\n{config.json(indent=2)}")
+    registry = get_exporter_registry()
+    metrics = get_export_metrics()
+    files = ExportedFiles(written=[], unchanged=[])
+    for export_format in config.export_formats:
+        if config.organize_by == "notebook":
+            subfolder = notebook_path.stem
+        elif config.organize_by == "extension":
+            subfolder = export_format.value
+        start = time.perf_counter()
+        try:
+            with timing_span("export_format", notebook=notebook_path, format=export_format.value):
+                format_files = registry.export(notebook, notebook_path, export_format, subfolder)
+        except BaseException:  # nbconvert calls sys.exit on conversion errors
+            metrics.export_failures.inc(format=export_format.value)
+            raise
+        metrics.exports.inc(format=export_format.value)
+        metrics.export_duration.observe(time.perf_counter() - start, format=export_format.value)
+        files.written.extend(format_files.written)
+        files.unchanged.extend(format_files.unchanged)
+    logger.info(
+        f"nbautoexport | Exported {notebook_path}: {len(files.written)} file(s) written, "
+        f"{len(files.unchanged)} unchanged."
+    )
+
+    if not use_manifest:
+        return files, None
+    entry = make_manifest_entry(
+        notebook_path,
+        notebook_hash=notebook_hash,
+        config_hash=config_hash,
+        exports=files.paths,
+    )
+    return files, entry
+
+
+class NotebookExportResult(NamedTuple):
+    """Outcome of exporting one notebook with export_notebooks. Counts of files written and left
+    unchanged are zero if the notebook was skipped or failed."""
+
+    notebook_path: Path
+    exported: bool
+    error: Optional[str] = None
+    written: int = 0
+    unchanged: int = 0
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+
+def export_notebooks(
+    notebook_paths: Iterable[Path],
+    config: NbAutoexportConfig,
+    jobs: int = 1,
+    use_manifest: bool = False,
+    force: bool = False,
+) -> List[NotebookExportResult]:
+    """Export multiple notebook files given configuration. With more than one job, notebooks are
+    spread across a pool of worker processes. A failure to export one notebook does not stop the
+    others from being exported. Export manifests are updated once per directory by the calling
+    process, after all exports have finished.
+
+    Args:
+        notebook_paths (Iterable[Path]): paths to notebooks to export with nbconvert
+        config (NbAutoexportConfig): configuration
+        jobs (int): number of worker processes to use. If 1, notebooks are exported one after
+            another in the current process.
+        use_manifest (bool): whether to use the export manifests. See export_notebook.
+        force (bool): export even if the manifest shows that exports are up to date
+
+    Returns:
+        List[NotebookExportResult]: outcome for each notebook, in the same order as notebook_paths
+    """
+    return export_notebook_configs(
+        ((path, config) for path in notebook_paths),
+        jobs=jobs,
+        use_manifest=use_manifest,
+        force=force,
+    )
+
+
+def export_notebook_configs(
+    notebook_configs: Iterable[Tuple[Path, NbAutoexportConfig]],
+    jobs: int = 1,
+    use_manifest: bool = False,
+    force: bool = False,
+) -> List[NotebookExportResult]:
+    """Export multiple notebook files, each with its own configuration, using one shared queue of
+    work. See export_notebooks.
+
+    Args:
+        notebook_configs (Iterable[Tuple[Path, NbAutoexportConfig]]): pairs of path to notebook
+            and configuration to export it with
+        jobs (int): number of worker processes to use. If 1, notebooks are exported one after
+            another in the current process.
+        use_manifest (bool): whether to use the export manifests. See export_notebook.
+        force (bool): export even if the manifest shows that exports are up to date
+
+    Returns:
+        List[NotebookExportResult]: outcome for each notebook, in the same order as
+            notebook_configs
+    """
+    notebook_configs = [(Path(path), config) for path, config in notebook_configs]
+    outcomes: List[Tuple[Path, Optional[_ExportOutcome], Optional[str]]] = []
+
+    if jobs > 1 and len(notebook_configs) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(notebook_configs))) as executor:
+            futures = [
+                executor.submit(_export_notebook, path, config, use_manifest, force)
+                for path, config in notebook_configs
+            ]
+            for (path, _), future in zip(notebook_configs, futures):
+                try:
+                    outcomes.append((path, future.result(), None))
+                # nbconvert calls sys.exit on conversion errors
+                except (Exception, SystemExit) as e:
+                    outcomes.append((path, None, f"{type(e).__name__}: {e}"))
+    else:
+        for path, config in notebook_configs:
+            try:
+                outcomes.append((path, _export_notebook(path, config, use_manifest, force), None))
+            except (Exception, SystemExit) as e:  # nbconvert calls sys.exit on conversion errors
+                outcomes.append((path, None, f"{type(e).__name__}: {e}"))
+
+    entries_by_directory: Dict[Path, Dict[str, ManifestEntry]] = {}
+    results = []
+    for path, outcome, error in outcomes:
+        if error is not None:
+            logger.error(f"nbautoexport | Exporting {path} failed due to {error}")
+            results.append(NotebookExportResult(notebook_path=path, exported=False, error=error))
+            continue
+        files, entry = outcome
+        if entry is not None:
+            entries_by_directory.setdefault(path.parent, {})[path.name] = entry
+        if files is None:
+            results.append(NotebookExportResult(notebook_path=path, exported=False))
+        else:
+            results.append(
+                NotebookExportResult(
+                    notebook_path=path,
+                    exported=True,
+                    written=len(files.written),
+                    unchanged=len(files.unchanged),
+                )
             )
-            converter.export_format = export_format.value
-            converter.initialize()
-            converter.notebooks = [str(notebook_path)]
-            converter.convert_notebooks()
+
+    for directory, entries in entries_by_directory.items():
+        record_exports(directory, entries)
+    return results
@@ -0,0 +1,226 @@
+import threading
+from typing import Iterable, Optional
+
+from jupyter_server.extension.application import ExtensionApp
+from jupyter_server.services.contents.manager import ContentsManager
+from traitlets import Bool, Float, Integer, List, TraitError, Unicode, validate
+
+from nbautoexport.background import (
+    BackgroundExporter,
+    disable_background_exports,
+    enable_background_exports,
+)
+from nbautoexport.export import get_exporter_registry, handle_save, SERVICE_ATTRIBUTE
+from nbautoexport.handlers import METRICS_PATH, MetricsHandler
+from nbautoexport.sentinel import ExportFormat
+from nbautoexport.utils import get_logger
+from nbautoexport.worker import disable_worker_exports, enable_worker_exports, ExportWorker
+
+logger = get_logger()
+
+
+class ExportService:
+    """Long-lived state of nbautoexport in a Jupyter server, owned by the nbautoexport server
+    extension: the background exporter, if background exports are enabled, the export worker
+    process, if enabled, and the registry of warm nbconvert exporters. Provides the post-save hook
+    that the extension registers.
+
+    Args:
+        background (bool): whether to run exports on background worker threads. Always enabled
+            with worker.
+        max_workers (int): maximum number of background exports to run at the same time
+        debounce (float): seconds to wait for further saves of a notebook before exporting it in
+            the background
+        warm_formats (Iterable[ExportFormat]): export formats to build exporters for on start, so
+            that the first save does not wait for nbconvert to load
+        worker (bool): whether to run exports in a long-lived worker process. Exporters are then
+            warmed in the worker process. Exports are submitted to the worker by background
+            worker threads, so that the post-save hook does not wait for it.
+        worker_timeout (Optional[float]): seconds to wait for an export in the worker process
+            before restarting it. None waits indefinitely.
+    """
+
+    def __init__(
+        self,
+        background: bool = False,
+        max_workers: int = 1,
+        debounce: float = 0.0,
+        warm_formats: Iterable[ExportFormat] = (),
+        worker: bool = False,
+        worker_timeout: Optional[float] = None,
+    ):
+        self.background = background
+        self.max_workers = max_workers
+        self.debounce = debounce
+        self.warm_formats = [ExportFormat(export_format) for export_format in warm_formats]
+        self.worker = worker
+        self.worker_timeout = worker_timeout
+        self.background_exporter: Optional[BackgroundExporter] = None
+        self.export_worker: Optional[ExportWorker] = None
+        self._warm_thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start background exports and the export worker process if enabled, and start building
+        warm exporters on a separate thread, so that the server's startup is not delayed."""
+        # Saving must not wait for the worker process, which would block the server's event loop
+        if self.background or self.worker:
+            self.background_exporter = enable_background_exports(
+                max_workers=self.max_workers, debounce=self.debounce
+            )
+        if self.worker:
+            self.export_worker = enable_worker_exports(
+                warm_formats=self.warm_formats, timeout=self.worker_timeout
+            )
+        elif self.warm_formats:
+            self._warm_thread = threading.Thread(
+                target=self.warm_exporters, name="nbautoexport-warm", daemon=True
+            )
+            self._warm_thread.start()
+
+    def warm_exporters(self):
+        """Build the exporters for warm_formats. Failures are logged and otherwise ignored, since
+        the exporter is built again on first use."""
+        registry = get_exporter_registry()
+        for export_format in self.warm_formats:
+            try:
+                registry.get(export_format)
+            except Exception as e:
+                logger.warning(
+                    f"nbautoexport | Failed to build exporter for {export_format.value} due to "
+                    f"{type(e).__name__}: {e}"
+                )
+        logger.debug("nbautoexport | Exporters are warm.")
+
+    def register(self, contents_manager: ContentsManager):
+        """Register the post-save hook with a contents manager. A post-save hook installed in the
+        Jupyter configuration file by earlier versions of nbautoexport defers to this one.
+
+        Args:
+            contents_manager (ContentsManager): the server's contents manager
+        """
+        setattr(contents_manager, SERVICE_ATTRIBUTE, self)
+        contents_manager.register_post_save_hook(self.post_save)
+
+    def post_save(self, model: dict, os_path: str, contents_manager: ContentsManager):
+        """Post-save hook that exports saved notebooks. See nbautoexport.export.post_save."""
+        handle_save(model, os_path)
+
+    def stop(self, wait: bool = True):
+        """Stop background exports and the export worker process, if they were started by this
+        service.
+
+        Args:
+            wait (bool): whether to block until queued exports have finished
+        """
+        if self.background_exporter is not None:
+            disable_background_exports(wait=wait)
+            self.background_exporter = None
+        if self.export_worker is not None:
+            disable_worker_exports()
+            self.export_worker = None
+
+
+class NbAutoexportExtension(ExtensionApp):
+    """Jupyter server extension that exports notebooks when they are saved, enabled with
+
+        c.ServerApp.jpserver_extensions = {"nbautoexport": True}
+
+    or with `nbautoexport install --server-extension`. It registers the post-save hook when the
+    server loads it, owns the ExportService that holds long-lived state, and serves export
+    metrics. Settings are configured in the Jupyter server configuration file, e.g.,
+
+        c.NbAutoexportExtension.background = True
+        c.NbAutoexportExtension.max_workers = 2
+    """
+
+    name = "nbautoexport"
+    description = "Automatically export Jupyter notebooks to other formats on save."
+    load_other_extensions = True
+
+    background = Bool(
+        False,
+        config=True,
+        help=(
+            "Run exports on background worker threads, so that saving does not wait for exports "
+            "to finish."
+        ),
+    )
+    max_workers = Integer(
+        1, config=True, help="Maximum number of background exports to run at the same time."
+    )
+    debounce = Float(
+        0.0,
+        config=True,
+        help=(
+            "Seconds to wait for further saves of a notebook before exporting it in the "
+            "background. Repeated saves within the window are exported once."
+        ),
+    )
+    warm_formats = List(
+        Unicode(),
+        config=True,
+        help=(
+            "Export formats to build nbconvert exporters for when the server starts, so that the "
+            "first save of a notebook does not wait for nbconvert to load, e.g., "
+            "['script', 'html']."
+        ),
+    )
+    worker = Bool(
+        False,
+        config=True,
+        help=(
+            "Run exports in a long-lived worker process that keeps nbconvert loaded, so that "
+            "exports don't compete with the server for the GIL or grow its memory. The worker is "
+            "restarted if it crashes. Exports are submitted to the worker in the background, as "
+            "with background = True."
+        ),
+    )
+    worker_timeout = Float(
+        None,
+        allow_none=True,
+        config=True,
+        help=(
+            "Seconds to wait for an export in the worker process before restarting the worker. "
+            "None waits indefinitely."
+        ),
+    )
+    serve_metrics = Bool(
+        True, config=True, help=f"Serve export metrics at /{METRICS_PATH} in Prometheus format."
+    )
+
+    @validate("max_workers")
+    def _validate_max_workers(self, proposal):
+        if proposal["value"] < 1:
+            raise TraitError("max_workers must be at least 1.")
+        return proposal["value"]
+
+    @validate("warm_formats")
+    def _validate_warm_formats(self, proposal):
+        valid = [export_format.value for export_format in ExportFormat]
+        for value in proposal["value"]:
+            if value not in valid:
+                raise TraitError(f"Unknown export format {value!r}. Choose from {valid}.")
+        return proposal["value"]
+
+    service: Optional[ExportService] = None
+
+    def initialize_settings(self):
+        self.service = ExportService(
+            background=self.background,
+            max_workers=self.max_workers,
+            debounce=self.debounce,
+            warm_formats=self.warm_formats,
+            worker=self.worker,
+            worker_timeout=self.worker_timeout,
+        )
+        self.service.start()
+        self.service.register(self.serverapp.contents_manager)
+        logger.info("nbautoexport | Successfully registered post-save hook.")
+
+    def initialize_handlers(self):
+        if self.serve_metrics:
+            self.handlers.append((METRICS_PATH, MetricsHandler))
+
+    async def stop_extension(self):
+        if self.service is not None:
+            self.service.stop()
@@ -0,0 +1,30 @@
+from jupyter_server.base.handlers import JupyterHandler
+from tornado import web
+
+from nbautoexport.metrics import get_export_metrics, PROMETHEUS_CONTENT_TYPE
+
+try:
+    from jupyter_server.auth.decorator import allow_unauthenticated
+except ImportError:  # jupyter_server < 2.13 allows unauthenticated requests to reach handlers
+
+    def allow_unauthenticated(method):
+        return method
+
+
+# Path of the metrics endpoint, relative to the server's base URL
+METRICS_PATH = "nbautoexport/metrics"
+
+
+class MetricsHandler(JupyterHandler):
+    """Serves nbautoexport's export metrics in the Prometheus text exposition format. Registered
+    by the nbautoexport server extension, NbAutoexportExtension. Like the Jupyter server's own
+    /metrics endpoint, requests must be authenticated unless the server is configured with
+    `ServerApp.authenticate_prometheus = False`."""
+
+    @allow_unauthenticated
+    def get(self):
+        if self.settings.get("authenticate_prometheus", True) and not self.logged_in:
+            raise web.HTTPError(403)
+
+        self.set_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.write(get_export_metrics().render())
@@ -1,12 +1,16 @@
+from functools import lru_cache
 from inspect import getsourcelines
+import json
 from pathlib import Path
 from packaging.version import parse as parse_version
 import re
 import textwrap
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 from jupyter_core.paths import jupyter_config_dir
-from traitlets.config import Config
+
+if TYPE_CHECKING:
+    from traitlets.config import Config
 
 from nbautoexport.utils import __version__, get_logger
 
@@ -14,7 +18,7 @@ from nbautoexport.utils import __version__, get_logger
 logger = get_logger()
 
 
-def initialize_post_save_hook(c: Config):
+def initialize_post_save_hook(c: "Config"):
     # >>> nbautoexport initialize, version=[{{version}}] >>>
     try:
         import nbautoexport
@@ -58,11 +62,24 @@ def initialize_post_save_hook(c: Config):
     pass  # need this line for above comment to be included in function source
 
 
-post_save_hook_initialize_block = textwrap.dedent(
-    "".join(getsourcelines(initialize_post_save_hook)[0][1:-1]).replace(
-        r"{{version}}", __version__, 1
+@lru_cache(maxsize=None)
+def get_post_save_hook_initialize_block() -> str:
+    """Returns the block of code that install_post_save_hook splices into the Jupyter
+    configuration file: the body of initialize_post_save_hook. Reading the function's source is
+    slow, so it is done on first use rather than on import."""
+    return textwrap.dedent(
+        "".join(getsourcelines(initialize_post_save_hook)[0][1:-1]).replace(
+            r"{{version}}", __version__, 1
+        )
     )
-)
+
+
+def __getattr__(name):
+    # Kept for backwards compatibility with the module-level constant
+    if name == "post_save_hook_initialize_block":
+        return get_post_save_hook_initialize_block()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 block_regex = re.compile(
     r"# >>> nbautoexport initialize.*# <<< nbautoexport initialize <<<\n?",
@@ -71,13 +88,24 @@ block_regex = re.compile(
 version_regex = re.compile(r"(?<=# >>> nbautoexport initialize, version=\[).*(?=\] >>>)")
 
 
+# Jupyter server configuration that enables the nbautoexport server extension
+SERVER_EXTENSION_CONFIG = {"ServerApp": {"jpserver_extensions": {"nbautoexport": True}}}
+SERVER_EXTENSION_CONFIG_FILE = Path("jupyter_server_config.d") / "nbautoexport.json"
+
+
+def default_config_path() -> Path:
+    """Returns the path of the Jupyter configuration file that the post save hook is spliced into
+    by default."""
+    return (Path(jupyter_config_dir()) / "jupyter_notebook_config.py").expanduser().resolve()
+
+
 def install_post_save_hook(config_path: Optional[Path] = None):
     """Splices the post save hook into the global Jupyter configuration file"""
     if config_path is None:
-        config_dir = jupyter_config_dir()
-        config_path = Path(config_dir) / "jupyter_notebook_config.py"
+        config_path = default_config_path()
 
     config_path = config_path.expanduser().resolve()
+    post_save_hook_initialize_block = get_post_save_hook_initialize_block()
 
     if not config_path.exists():
         logger.debug(f"No existing Jupyter configuration detected at {config_path}. Creating...")
@@ -122,3 +150,87 @@ def install_post_save_hook(config_path: Optional[Path] = None):
             fp.write("\n" + post_save_hook_initialize_block)
 
     logger.info("nbautoexport post-save hook installed.")
+
+
+def uninstall_post_save_hook(config_path: Optional[Path] = None) -> bool:
+    """Removes the post save hook initialization block from the global Jupyter configuration file,
+    leaving the rest of the file unchanged.
+
+    Args:
+        config_path (Optional[Path]): Jupyter configuration file. Defaults to
+            jupyter_notebook_config.py in the Jupyter config directory.
+
+    Returns:
+        bool: whether an initialization block was found and removed
+    """
+    if config_path is None:
+        config_path = default_config_path()
+    config_path = config_path.expanduser().resolve()
+    if not config_path.exists():
+        return False
+
+    with config_path.open("r", encoding="utf-8") as fp:
+        config = fp.read()
+    if not block_regex.search(config):
+        return False
+
+    with config_path.open("w", encoding="utf-8") as fp:
+        fp.write(block_regex.sub("", config))
+    logger.info(f"Removed nbautoexport post-save hook from {config_path}.")
+    return True
+
+
+def server_extension_config_path(config_dir: Optional[Path] = None) -> Path:
+    """Returns the path of the Jupyter server configuration file that enables the nbautoexport
+    server extension.
+
+    Args:
+        config_dir (Optional[Path]): Jupyter config directory. Defaults to the user's.
+    """
+    if config_dir is None:
+        config_dir = Path(jupyter_config_dir())
+    return (Path(config_dir) / SERVER_EXTENSION_CONFIG_FILE).expanduser().resolve()
+
+
+def install_server_extension(
+    config_dir: Optional[Path] = None, hook_config_path: Optional[Path] = None
+) -> Path:
+    """Enables the nbautoexport Jupyter server extension by writing a configuration file into the
+    Jupyter config directory's jupyter_server_config.d directory. Removes the post save hook
+    initialization block from the Jupyter configuration file, if there is one, since the
+    extension registers its own post-save hook.
+
+    Args:
+        config_dir (Optional[Path]): Jupyter config directory. Defaults to the user's.
+        hook_config_path (Optional[Path]): Jupyter configuration file to remove the post save
+            hook from. Defaults to jupyter_notebook_config.py in the Jupyter config directory.
+
+    Returns:
+        Path: path of the configuration file enabling the extension
+    """
+    config_path = server_extension_config_path(config_dir)
+    config_path.parent.mkdir(exist_ok=True, parents=True)
+    with config_path.open("w", encoding="utf-8") as fp:
+        json.dump(SERVER_EXTENSION_CONFIG, fp, indent=2)
+        fp.write("\n")
+    logger.info(f"nbautoexport server extension enabled in {config_path}.")
+
+    uninstall_post_save_hook(hook_config_path)
+    return config_path
+
+
+def is_server_extension_installed(config_dir: Optional[Path] = None) -> bool:
+    """Returns whether the nbautoexport server extension is enabled by the configuration file that
+    install_server_extension writes.
+
+    Args:
+        config_dir (Optional[Path]): Jupyter config directory. Defaults to the user's.
+    """
+    config_path = server_extension_config_path(config_dir)
+    try:
+        with config_path.open("r", encoding="utf-8") as fp:
+            config = json.load(fp)
+    except (OSError, ValueError):
+        return False
+    extensions = config.get("ServerApp", {}).get("jpserver_extensions", {})
+    return bool(extensions.get("nbautoexport", False))
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+from typing import Any, Dict, Iterable, List, Optional, TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from nbautoexport.sentinel import (
+    EXPORT_MANIFEST_FILE,
+    NbAutoexportConfig,
+    SAVE_PROGRESS_INDICATOR_FILE,
+)
+from nbautoexport.utils import __version__, atomic_write, get_logger, ValidationMode
+
+# nbconvert and nbformat are slow to import, and are only needed to export
+if TYPE_CHECKING:
+    import nbformat
+
+logger = get_logger()
+
+
+class ManifestEntry(BaseModel):
+    notebook_hash: str
+    config_hash: str
+    exports: List[str] = []
+
+
+class ValidationRecord(BaseModel):
+    """Record of a notebook file that was read and checked successfully, identified by its
+    modification time, size, and inode. Holds the notebook's top-level metadata keys, so that the
+    file is not read or checked again while unchanged."""
+
+    mtime_ns: int
+    size: int
+    inode: int
+    validation: ValidationMode
+    notebook: Dict[str, Any]
+
+
+class ExportManifest(BaseModel):
+    """Record of the last successful export of each notebook in a directory. Used to skip
+    exporting notebooks whose content and export configuration are unchanged. Also records which
+    notebook files have been validated, so that unchanged notebooks are not validated again by
+    later runs."""
+
+    notebooks: Dict[str, ManifestEntry] = {}
+    validated: Dict[str, ValidationRecord] = {}
+
+    # deprecated in pydantic v2.0
+    def json(self, *args, **kwargs):
+        if hasattr(self, "model_dump_json"):
+            return self.model_dump_json(*args, **kwargs)
+        else:
+            return super().json(*args, **kwargs)
+
+
+_manifest_lock = threading.Lock()
+
+
+def hash_notebook(notebook: "nbformat.NotebookNode") -> str:
+    """Hash the content of a notebook that affects its exports: its cells and metadata.
+
+    Args:
+        notebook (nbformat.NotebookNode): parsed notebook
+
+    Returns:
+        str: hex digest of notebook content
+    """
+    content = {
+        "nbformat": notebook.get("nbformat"),
+        "nbformat_minor": notebook.get("nbformat_minor"),
+        "metadata": notebook.get("metadata", {}),
+        "cells": notebook.get("cells", []),
+    }
+    return _hash_json(content)
+
+
+def hash_config(config: NbAutoexportConfig) -> str:
+    """Hash the parts of an nbautoexport configuration that affect exports. Versions of
+    nbautoexport and nbconvert are included, since upgrading either may change exported output.
+
+    Args:
+        config (NbAutoexportConfig): configuration
+
+    Returns:
+        str: hex digest of export configuration
+    """
+    import nbconvert
+
+    content = {
+        "export_formats": [fmt.value for fmt in config.export_formats],
+        "organize_by": config.organize_by.value,
+        "nbautoexport": __version__,
+        "nbconvert": nbconvert.__version__,
+    }
+    return _hash_json(content)
+
+
+def _hash_json(content) -> str:
+    serialized = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def load_manifest(directory: Path) -> ExportManifest:
+    """Read the export manifest for a directory. A missing or unreadable manifest is treated as
+    empty, so that every notebook is exported.
+
+    Args:
+        directory (Path): notebooks directory
+
+    Returns:
+        ExportManifest: manifest for directory
+    """
+    manifest_path = Path(directory) / EXPORT_MANIFEST_FILE
+    if not manifest_path.exists():
+        return ExportManifest()
+    try:
+        return ExportManifest.parse_file(
+            path=manifest_path, content_type="application/json", encoding="utf-8"
+        )
+    except Exception as e:
+        logger.warning(
+            f"nbautoexport | Ignoring unreadable export manifest {manifest_path} due to "
+            f"{type(e).__name__}: {e}"
+        )
+        return ExportManifest()
+
+
+def is_export_current(notebook_path: Path, notebook_hash: str, config_hash: str) -> bool:
+    """Check whether a notebook's exports are up to date: the manifest records a successful export
+    with the same notebook content and configuration, and the recorded export files all exist.
+
+    Args:
+        notebook_path (Path): path to notebook file
+        notebook_hash (str): hash of current notebook content, from hash_notebook
+        config_hash (str): hash of current configuration, from hash_config
+
+    Returns:
+        bool: whether exporting the notebook again can be skipped
+    """
+    notebook_path = Path(notebook_path)
+    directory = notebook_path.parent
+    entry: Optional[ManifestEntry] = load_manifest(directory).notebooks.get(notebook_path.name)
+    if entry is None:
+        return False
+    return (
+        entry.notebook_hash == notebook_hash
+        and entry.config_hash == config_hash
+        and all((directory / export).exists() for export in entry.exports)
+    )
+
+
+def make_manifest_entry(
+    notebook_path: Path, notebook_hash: str, config_hash: str, exports: Iterable[Path]
+) -> ManifestEntry:
+    """Build the manifest record of a successful export of a notebook.
+
+    Args:
+        notebook_path (Path): path to notebook file
+        notebook_hash (str): hash of exported notebook content, from hash_notebook
+        config_hash (str): hash of configuration used, from hash_config
+        exports (Iterable[Path]): exported files
+
+    Returns:
+        ManifestEntry: manifest record, with export paths relative to the notebook's directory
+    """
+    directory = Path(notebook_path).parent
+    return ManifestEntry(
+        notebook_hash=notebook_hash,
+        config_hash=config_hash,
+        exports=sorted(Path(os.path.relpath(p, directory)).as_posix() for p in exports),
+    )
+
+
+def record_exports(directory: Path, entries: Dict[str, ManifestEntry]):
+    """Record successful exports of notebooks in a directory's manifest. The manifest is
+    rewritten atomically so that readers never see a partially written file.
+
+    Args:
+        directory (Path): notebooks directory
+        entries (Dict[str, ManifestEntry]): manifest records keyed by notebook file name
+    """
+    if len(entries) == 0:
+        return
+    with _manifest_lock:
+        manifest = load_manifest(directory)
+        manifest.notebooks.update(entries)
+        write_manifest(directory, manifest)
+
+
+def load_validation_records(directory: Path) -> Dict[str, ValidationRecord]:
+    """Read the validation records of a directory's notebooks from its export manifest.
+
+    Args:
+        directory (Path): notebooks directory
+
+    Returns:
+        Dict[str, ValidationRecord]: validation records keyed by notebook file name
+    """
+    if not (Path(directory) / EXPORT_MANIFEST_FILE).exists():
+        return {}
+    return load_manifest(directory).validated
+
+
+def record_validations(directory: Path, records: Dict[str, ValidationRecord]):
+    """Replace the validation records in a directory's export manifest. Records are only kept in
+    directories configured with an .nbautoexport file, so that scanning other directories doesn't
+    write to them. Failing to write the manifest, e.g., in a read-only directory, is logged and
+    otherwise ignored, since the records are only a cache.
+
+    Args:
+        directory (Path): notebooks directory
+        records (Dict[str, ValidationRecord]): validation records keyed by notebook file name
+    """
+    if not (Path(directory) / SAVE_PROGRESS_INDICATOR_FILE).exists():
+        return
+    try:
+        with _manifest_lock:
+            manifest = load_manifest(directory)
+            manifest.validated = records
+            write_manifest(directory, manifest)
+    except OSError as e:
+        logger.debug(
+            f"nbautoexport | Could not record validated notebooks in {directory} due to "
+            f"{type(e).__name__}: {e}"
+        )
+
+
+def write_manifest(directory: Path, manifest: ExportManifest):
+    """Atomically write the export manifest for a directory.
+
+    Args:
+        directory (Path): notebooks directory
+        manifest (ExportManifest): manifest to write
+    """
+    atomic_write(Path(directory) / EXPORT_MANIFEST_FILE, manifest.json(indent=2))
@@ -0,0 +1,289 @@
+import abc
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Upper bounds of export duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(abc.ABC):
+    """Base class for in-process metrics with optional labels, rendered in the Prometheus text
+    exposition format. Thread-safe."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Metric {self.name} has labels {list(self.label_names)}, got {sorted(labels)}."
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """Yields sample name, formatted labels, and value of each sample."""
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for sample_name, labels, value in self.samples():
+            lines.append(f"{sample_name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count, per set of label values."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        key = self._label_values(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def snapshot(self) -> Dict[LabelValues, float]:
+        """Returns a copy of the counts, which can be pickled and merged into another counter."""
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, snapshot: Dict[LabelValues, float]):
+        """Add counts from a snapshot of another counter."""
+        with self._lock:
+            for key, value in snapshot.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, _format_labels(self.label_names, key), value
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets, per set of label values."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label values: count in each bucket (not cumulative), sum, and count
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._label_values(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def get_count(self, **labels: str) -> int:
+        key = self._label_values(labels)
+        with self._lock:
+            return self._values[key][2] if key in self._values else 0
+
+    def snapshot(self) -> Dict[LabelValues, Tuple[List[int], float, int]]:
+        """Returns a copy of the observations, which can be pickled and merged into another
+        histogram with the same buckets."""
+        with self._lock:
+            return {key: (list(v[0]), v[1], v[2]) for key, v in self._values.items()}
+
+    def merge(self, snapshot: Dict[LabelValues, Tuple[List[int], float, int]]):
+        """Add observations from a snapshot of another histogram with the same buckets."""
+        with self._lock:
+            for key, (counts, total, count) in snapshot.items():
+                own_counts, own_total, own_count = self._values.get(
+                    key, ([0] * len(self.buckets), 0.0, 0)
+                )
+                merged_counts = [a + b for a, b in zip(own_counts, counts)]
+                self._values[key] = (merged_counts, own_total + total, own_count + count)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted((key, (list(v[0]), v[1], v[2])) for key, v in self._values.items())
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names + ("le",), key + (_format_value(bound),))
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class Gauge(Metric):
+    """Value that can go up and down, read from a callback when metrics are rendered."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Optional[float]]):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        value = self.callback()
+        if value is not None:
+            yield self.name, "", value
+
+
+def _background_queue_depth() -> Optional[float]:
+    from nbautoexport.background import get_background_exporter
+
+    background_exporter = get_background_exporter()
+    return 0 if background_exporter is None else background_exporter.queue_depth
+
+
+class ExportMetrics:
+    """In-process counters and histograms of export activity, for monitoring how much work
+    nbautoexport does in a long-running process such as a Jupyter server. Exports run in the export
+    worker process are merged in with `merge`. Exports run in other worker processes, e.g., by the
+    export command with --jobs, are not counted."""
+
+    def __init__(self):
+        self.exports = Counter(
+            "nbautoexport_exports_total", "Notebook exports to a format completed.", ["format"]
+        )
+        self.export_failures = Counter(
+            "nbautoexport_export_failures_total",
+            "Notebook exports to a format failed.",
+            ["format"],
+        )
+        self.export_duration = Histogram(
+            "nbautoexport_export_duration_seconds",
+            "Time to render and write a notebook export to a format.",
+            ["format"],
+        )
+        self.notebooks_exported = Counter(
+            "nbautoexport_notebooks_exported_total", "Notebooks exported to all their formats."
+        )
+        self.notebooks_skipped = Counter(
+            "nbautoexport_notebooks_skipped_unchanged_total",
+            "Notebook exports skipped because the notebook and configuration were unchanged.",
+        )
+        self.notebook_failures = Counter(
+            "nbautoexport_notebook_failures_total", "Notebooks that failed to export."
+        )
+        self.notebook_duration = Histogram(
+            "nbautoexport_notebook_export_duration_seconds",
+            "Time to read a notebook and export it to all its formats.",
+        )
+        self.queue_depth = Gauge(
+            "nbautoexport_background_queue_depth",
+            "Background exports requested and not yet finished, including running exports.",
+            _background_queue_depth,
+        )
+
+    @property
+    def metrics(self) -> List[Metric]:
+        return [
+            self.exports,
+            self.export_failures,
+            self.export_duration,
+            self.notebooks_exported,
+            self.notebooks_skipped,
+            self.notebook_failures,
+            self.notebook_duration,
+            self.queue_depth,
+        ]
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Returns a copy of all recorded counters and histograms by metric name, which can be
+        pickled, e.g., to send metrics recorded in a worker process to the main process.
+
+        Returns:
+            Dict[str, dict]: snapshot of each counter and histogram
+        """
+        return {
+            metric.name: metric.snapshot()
+            for metric in self.metrics
+            if isinstance(metric, (Counter, Histogram))
+        }
+
+    def merge(self, snapshot: Dict[str, dict]):
+        """Add the counters and histograms of a snapshot from ExportMetrics.snapshot.
+
+        Args:
+            snapshot (Dict[str, dict]): snapshot of other export metrics
+        """
+        for metric in self.metrics:
+            if isinstance(metric, (Counter, Histogram)) and metric.name in snapshot:
+                metric.merge(snapshot[metric.name])
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: metrics text
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+_export_metrics = ExportMetrics()
+
+
+def get_export_metrics() -> ExportMetrics:
+    """Return the process-wide export metrics."""
+    return _export_metrics
+
+
+def reset_export_metrics() -> ExportMetrics:
+    """Discard all recorded export metrics.
+
+    Returns:
+        ExportMetrics: the new, empty process-wide export metrics
+    """
+    global _export_metrics
+    _export_metrics = ExportMetrics()
+    return _export_metrics
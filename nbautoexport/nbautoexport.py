@@ -1,25 +1,37 @@
 import logging
+import os
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, TYPE_CHECKING
 
-from jupyter_core.paths import jupyter_config_dir
 from packaging.version import parse as parse_version
 import typer
 
-from nbautoexport.clean import find_files_to_clean
-from nbautoexport.export import export_notebook
-from nbautoexport.jupyter_config import block_regex, install_post_save_hook, version_regex
-from nbautoexport.sentinel import (
-    CleanConfig,
+from nbautoexport.jupyter_config import (
+    block_regex,
+    default_config_path,
+    install_post_save_hook,
+    install_server_extension,
+    is_server_extension_installed,
+    version_regex,
+)
+from nbautoexport.constants import (
+    CleanMode,
+    DEFAULT_CLEAN_MODE,
     DEFAULT_EXPORT_FORMATS,
     DEFAULT_ORGANIZE_BY,
+    DEFAULT_VALIDATION,
     ExportFormat,
-    install_sentinel,
-    NbAutoexportConfig,
     OrganizeBy,
     SAVE_PROGRESS_INDICATOR_FILE,
+    ValidationMode,
 )
-from nbautoexport.utils import __version__, find_notebooks, get_logger
+from nbautoexport.utils import __version__, find_notebook_descriptors, get_logger
+
+# Modules that import nbconvert, like nbautoexport.export and nbautoexport.clean, or pydantic,
+# like nbautoexport.sentinel, are slow to import, so commands import them when they run. Commands
+# like '--version' and 'install' stay fast.
+if TYPE_CHECKING:
+    from nbautoexport.sentinel import NbAutoexportConfig
 
 app = typer.Typer()
 logger = get_logger()
@@ -53,6 +65,18 @@ verbose_option = typer.Option(
     callback=verbose_callback,
 )
 
+validation_override_option = typer.Option(
+    None,
+    "--validation",
+    show_default=False,
+    help=(
+        "How thoroughly to check notebook files: 'full' validates against the nbformat schema, "
+        "'fast' checks only top-level structure, and 'off' skips checks. Overrides the "
+        f"{SAVE_PROGRESS_INDICATOR_FILE} config file. If neither provided, defaults to "
+        f"'{DEFAULT_VALIDATION.value}'."
+    ),
+)
+
 
 def version_callback(value: bool):
     if value:
@@ -112,21 +136,44 @@ def clean(
     dry_run: bool = typer.Option(
         False, "--dry-run", help="Show files that would be removed, without actually removing."
     ),
+    mode: Optional[CleanMode] = typer.Option(
+        None,
+        "--mode",
+        "-m",
+        show_default=False,
+        help=(
+            "Which files to consider for cleaning: 'all' files under the directory, or only "
+            "'managed' files in subfolders that nbautoexport could have exported to. Overrides "
+            f"the {SAVE_PROGRESS_INDICATOR_FILE} config file. If neither provided, defaults to "
+            f"'{DEFAULT_CLEAN_MODE.value}'."
+        ),
+    ),
+    validation: Optional[ValidationMode] = validation_override_option,
     verbose: int = verbose_option,
 ):
     """(EXPERIMENTAL) Remove subfolders/files not matching .nbautoexport configuration and
     existing notebooks.
 
+    With --mode managed, only subfolders that nbautoexport exports to are cleaned: one per
+    configured export format when organizing by extension, or one per notebook when organizing by
+    notebook, and any recorded in the export manifest from earlier exports. All other files and
+    subfolders are left alone, and are never walked.
+
     Known limitations:
     - Not able to correctly handle additional intended files, such as image assets or
       non-notebook-related files.
     """
+    from nbautoexport.clean import find_files_to_clean, managed_subfolders
+    from nbautoexport.sentinel import read_sentinel
+
     sentinel_path = directory / SAVE_PROGRESS_INDICATOR_FILE
     validate_sentinel_path(sentinel_path)
 
-    config = NbAutoexportConfig.parse_file(
-        path=sentinel_path, content_type="application/json", encoding="utf-8"
-    )
+    config = read_sentinel(sentinel_path)
+    if validation is not None:
+        config.validation = validation
+    if mode is not None:
+        config.clean.mode = mode
 
     # Combine exclude patterns from config and command-line
     config.clean.exclude.extend(exclude)
@@ -159,7 +206,13 @@ def clean(
 
     # Remove empty subdirectories
     typer.echo("Removing empty subdirectories...")
-    subfolders = (d for d in directory.iterdir() if d.is_dir())
+    if config.clean.mode == CleanMode.managed:
+        notebooks = find_notebook_descriptors(directory, validation=config.validation)
+        subfolders = (
+            d for d in sorted(managed_subfolders(directory, notebooks, config)) if d.is_dir()
+        )
+    else:
+        subfolders = (d for d in directory.iterdir() if d.is_dir())
     for subfolder in subfolders:
         for subsubfolder in subfolder.iterdir():
             if subsubfolder.is_dir() and not any(subsubfolder.iterdir()):
@@ -205,6 +258,35 @@ def export(
             f"provided, defaults to '{DEFAULT_ORGANIZE_BY}'."
         ),
     ),
+    recursive: bool = typer.Option(
+        False,
+        "--recursive",
+        "-r",
+        help=(
+            f"Export notebooks in every directory with a {SAVE_PROGRESS_INDICATOR_FILE} config "
+            "file under the input directory, using each directory's config file."
+        ),
+    ),
+    jobs: Optional[int] = typer.Option(
+        None,
+        "--jobs",
+        "-j",
+        min=1,
+        show_default=False,
+        help=(
+            "Number of worker processes to export a directory of notebooks with. Defaults to the "
+            "number of CPUs."
+        ),
+    ),
+    force: bool = typer.Option(
+        False,
+        "--force",
+        help=(
+            "Export notebooks even if their content and configuration are unchanged since they "
+            "were last exported."
+        ),
+    ),
+    validation: Optional[ValidationMode] = validation_override_option,
     verbose: int = verbose_option,
 ):
     """Manually export notebook or directory of notebooks.
@@ -214,35 +296,118 @@ def export(
     file. If no existing configuration option exists and no values are provided, default values
     will be used.
 
+    With --recursive, all directories with an .nbautoexport configuration file under the input
+    directory are found and exported together. Directories such as .git and
+    .ipynb_checkpoints are skipped.
+
+    If an .nbautoexport configuration file exists, notebooks whose content and configuration are
+    unchanged since they were last exported, and whose exports still exist, are skipped. Use
+    --force to export them anyway.
+
     The export command will not do cleaning, regardless of the 'clean' setting in an .nbautoexport
     configuration file.
     """
-    if input.is_dir():
-        sentinel_path = input / SAVE_PROGRESS_INDICATOR_FILE
-        notebook_paths = [nb.path for nb in find_notebooks(input)]
+    from nbautoexport.export import export_notebook_configs
+    from nbautoexport.sentinel import find_sentinel_files, read_sentinel
+
+    if recursive:
+        if not input.is_dir():
+            typer.echo(f"Error: --recursive requires a directory, got [{input}].")
+            raise typer.Exit(code=1)
 
-        if len(notebook_paths) == 0:
-            typer.echo(f"No notebooks found in directory [{input}]. Exiting.")
+        sentinel_paths = find_sentinel_files(input)
+        if len(sentinel_paths) == 0:
+            typer.echo(
+                f"No {SAVE_PROGRESS_INDICATOR_FILE} config files found under directory "
+                f"[{input}]. Exiting."
+            )
             raise typer.Exit(code=1)
 
+        notebook_configs = []
+        for sentinel_path in sentinel_paths:
+            config = load_export_config(sentinel_path, export_formats, organize_by, validation)
+            notebook_configs.extend(
+                (nb.path, config)
+                for nb in find_notebook_descriptors(
+                    sentinel_path.parent, validation=config.validation
+                )
+            )
+        use_manifest = True
+
     else:
-        sentinel_path = input.parent / SAVE_PROGRESS_INDICATOR_FILE
-        notebook_paths = [input]
+        if input.is_dir():
+            sentinel_path = input / SAVE_PROGRESS_INDICATOR_FILE
+            if validation is None:
+                validation_mode = (
+                    read_sentinel(sentinel_path).validation
+                    if sentinel_path.exists()
+                    else DEFAULT_VALIDATION
+                )
+            else:
+                validation_mode = validation
+            notebook_paths = [
+                nb.path for nb in find_notebook_descriptors(input, validation=validation_mode)
+            ]
+
+            if len(notebook_paths) == 0:
+                typer.echo(f"No notebooks found in directory [{input}]. Exiting.")
+                raise typer.Exit(code=1)
+
+        else:
+            sentinel_path = input.parent / SAVE_PROGRESS_INDICATOR_FILE
+            notebook_paths = [input]
+
+        config = load_export_config(sentinel_path, export_formats, organize_by, validation)
+        notebook_configs = [(notebook_path, config) for notebook_path in notebook_paths]
+        use_manifest = sentinel_path.exists()
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    results = export_notebook_configs(
+        notebook_configs, jobs=jobs, use_manifest=use_manifest, force=force
+    )
+
+    exported = [result for result in results if result.exported]
+    typer.echo(
+        f"Exported {len(exported)} of {len(results)} notebook(s): "
+        f"{sum(result.written for result in exported)} file(s) written, "
+        f"{sum(result.unchanged for result in exported)} file(s) unchanged."
+    )
+
+    failed = [result for result in results if result.failed]
+    if len(failed) > 0:
+        typer.echo(f"Failed to export {len(failed)} of {len(results)} notebook(s):")
+        for result in failed:
+            typer.echo(f"  {result.notebook_path}: {result.error}")
+        raise typer.Exit(code=1)
+
+
+def load_export_config(
+    sentinel_path: Path,
+    export_formats: List[ExportFormat],
+    organize_by: Optional[OrganizeBy],
+    validation: Optional[ValidationMode] = None,
+) -> "NbAutoexportConfig":
+    """Determine export configuration for the export command. Provided options override an
+    existing config file, and defaults are used for options that are neither provided nor in a
+    config file."""
+    from nbautoexport.sentinel import NbAutoexportConfig, read_sentinel
 
-    # Configuration: input options override existing sentinel file
     if sentinel_path.exists():
         typer.echo(f"Reading existing configuration file from {sentinel_path} ...")
-        config = NbAutoexportConfig.parse_file(
-            path=sentinel_path, content_type="application/json", encoding="utf-8"
-        )
+        config = read_sentinel(sentinel_path)
 
         # Overrides
         if len(export_formats) > 0:
             typer.echo(f"Overriding config with specified export formats: {export_formats}")
             config.export_formats = export_formats
         if organize_by is not None:
-            typer.echo(f"Overriding config with specified organization strategy: {export_formats}")
+            typer.echo(f"Overriding config with specified organization strategy: {organize_by}")
             config.organize_by = organize_by
+        if validation is not None:
+            typer.echo(f"Overriding config with specified validation mode: {validation}")
+            config.validation = validation
     else:
         typer.echo("No configuration found. Using command options as configuration ...")
         if len(export_formats) == 0:
@@ -251,10 +416,12 @@ def export(
         if organize_by is None:
             typer.echo(f"No organize-by specified. Using default: {DEFAULT_ORGANIZE_BY}")
             organize_by = DEFAULT_ORGANIZE_BY
-        config = NbAutoexportConfig(export_formats=export_formats, organize_by=organize_by)
-
-    for notebook_path in notebook_paths:
-        export_notebook(notebook_path, config=config)
+        if validation is None:
+            validation = DEFAULT_VALIDATION
+        config = NbAutoexportConfig(
+            export_formats=export_formats, organize_by=organize_by, validation=validation
+        )
+    return config
 
 
 @app.command()
@@ -268,7 +435,17 @@ def install(
         help=(
             "Path to config file. If not specified (default), will determine appropriate path "
             "used by Jupyter. You should only specify this option if you use a nonstandard config "
-            "file path that you explicitly pass to Jupyter with the --config option at startup."
+            "file path that you explicitly pass to Jupyter with the --config option at startup. "
+            "With --server-extension, the config file to remove the post-save hook from."
+        ),
+    ),
+    server_extension: bool = typer.Option(
+        False,
+        "--server-extension",
+        help=(
+            "Enable nbautoexport as a Jupyter server extension instead of adding a post-save hook "
+            "to the Jupyter config file. Removes an existing nbautoexport post-save hook. "
+            "Requires jupyter_server 2 or later."
         ),
     ),
     verbose: int = verbose_option,
@@ -280,7 +457,20 @@ def install(
     This works by adding an initialization block in your Jupyter config file that will register
     nbautoexport's post-save function. If an nbautoexport initialization block already exists and
     is from an older version of nbautoexport, this command will replace it with an updated version.
+
+    With --server-extension, nbautoexport is instead enabled as a Jupyter server extension, which
+    registers the post-save hook when the server starts and can be configured with settings such as
+    background exports. Any existing nbautoexport initialization block is removed.
     """
+    if server_extension:
+        config_path = install_server_extension(hook_config_path=jupyter_config)
+        typer.echo(f"nbautoexport server extension successfully enabled in {config_path}.")
+        typer.echo(
+            "If a Jupyter server is already running, you will need to restart it for nbautoexport "
+            "to work."
+        )
+        return
+
     install_post_save_hook(config_path=jupyter_config)
 
     typer.echo("nbautoexport post-save hook successfully installed with Jupyter.")
@@ -319,6 +509,16 @@ def configure(
             "Whether to save exported file(s) in a subfolder per notebook or per export format. "
         ),
     ),
+    validation: ValidationMode = typer.Option(
+        DEFAULT_VALIDATION,
+        "--validation",
+        show_default=True,
+        help=(
+            "How thoroughly to check notebook files when finding notebooks: 'full' validates "
+            "against the nbformat schema, 'fast' checks only top-level structure, and 'off' "
+            "skips checks."
+        ),
+    ),
     clean_exclude: List[str] = typer.Option(
         [],
         "--clean-exclude",
@@ -329,6 +529,16 @@ def configure(
             "command."
         ),
     ),
+    clean_mode: CleanMode = typer.Option(
+        DEFAULT_CLEAN_MODE,
+        "--clean-mode",
+        show_default=True,
+        help=(
+            "Which files the clean command considers for cleaning: 'all' files under the "
+            "directory, or only 'managed' files in subfolders that nbautoexport could have "
+            "exported to."
+        ),
+    ),
     overwrite: bool = typer.Option(
         False,
         "--overwrite",
@@ -347,10 +557,13 @@ def configure(
     An .nbautoexport configuration file only applies to that directory, nonrecursively. You must
     independently configure other directories containing notebooks.
     """
+    from nbautoexport.sentinel import CleanConfig, install_sentinel, NbAutoexportConfig
+
     config = NbAutoexportConfig(
         export_formats=export_formats,
         organize_by=organize_by,
-        clean=CleanConfig(exclude=clean_exclude),
+        validation=validation,
+        clean=CleanConfig(exclude=clean_exclude, mode=clean_mode),
     )
     try:
         install_sentinel(directory=directory, config=config, overwrite=overwrite)
@@ -359,10 +572,8 @@ def configure(
         raise typer.Exit(code=1)
 
     # Check for installation in Jupyter config
-    installed = False
-    jupyter_config_file = (
-        (Path(jupyter_config_dir()) / "jupyter_notebook_config.py").expanduser().resolve()
-    )
+    installed = is_server_extension_installed()
+    jupyter_config_file = default_config_path()
     if jupyter_config_file.exists():
         with jupyter_config_file.open("r", encoding="utf-8") as fp:
             jupyter_config_text = fp.read()
@@ -384,3 +595,75 @@ def configure(
             "Warning: nbautoexport is not properly installed with Jupyter. "
             "Please run 'install' command."
         )
+
+
+@app.command()
+def watch(
+    directory: Path = typer.Argument(
+        ...,
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        writable=True,
+        help="Directory to watch for notebook changes.",
+    ),
+    recursive: bool = typer.Option(
+        False,
+        "--recursive",
+        "-r",
+        help="Also watch all directories under the directory, including ones created later.",
+    ),
+    debounce: float = typer.Option(
+        1.0,
+        "--debounce",
+        min=0,
+        show_default=True,
+        help="Seconds to wait for further changes to a notebook before exporting it.",
+    ),
+    jobs: int = typer.Option(
+        1,
+        "--jobs",
+        "-j",
+        min=1,
+        show_default=True,
+        help="Maximum number of notebooks to export at the same time.",
+    ),
+    polling: bool = typer.Option(
+        False,
+        "--polling",
+        help="Detect changes by polling file stats, even where inotify is available.",
+    ),
+    poll_interval: float = typer.Option(
+        1.0,
+        "--poll-interval",
+        min=0.01,
+        show_default=True,
+        help="Seconds between checks for changes when polling.",
+    ),
+    verbose: int = verbose_option,
+):
+    """Watch a directory and export notebooks when they change, for use with editors that do not
+    run Jupyter's post-save hook. Stop with Ctrl+C.
+
+    Only notebooks in directories with an .nbautoexport configuration file are exported, using
+    that directory's configuration. Notebooks whose content and configuration are unchanged since
+    they were last exported are skipped. Changes are detected with inotify on Linux, and by
+    polling file stats elsewhere.
+
+    The watch command will not do cleaning, regardless of the 'clean' setting in an .nbautoexport
+    configuration file.
+    """
+    from nbautoexport.watch import watch as watch_directory
+
+    typer.echo(f"Watching {directory} for notebook changes. Press Ctrl+C to stop.")
+    try:
+        watch_directory(
+            directory,
+            recursive=recursive,
+            debounce=debounce,
+            max_workers=jobs,
+            polling=polling,
+            poll_interval=poll_interval,
+        )
+    except KeyboardInterrupt:
+        typer.echo("Stopped watching.")
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from nbautoexport.constants import ValidationMode
+from nbautoexport.utils import _language_info_key, load_notebook_metadata, script_extension
+
+
+class NotebookNodeField:
+    """Pydantic field type for nbformat.NotebookNode values, which are kept as is. Unlike
+    annotating a field with NotebookNode directly, nbformat is only imported when a value is
+    validated rather than when the model is defined."""
+
+    # pydantic v1
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    # pydantic v2
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        from pydantic_core import core_schema
+
+        return core_schema.no_info_plain_validator_function(cls.validate)
+
+    @classmethod
+    def validate(cls, value):
+        from nbformat import NotebookNode
+
+        if not isinstance(value, NotebookNode):
+            raise ValueError(f"Expected NotebookNode, got {type(value).__name__}.")
+        return value
+
+
+class JupyterNotebook(BaseModel):
+    path: Path
+    metadata: NotebookNodeField
+
+    def get_script_extension(self):
+        return script_extension(*_language_info_key(self.metadata))
+
+    @property
+    def name(self):
+        return self.path.stem
+
+    @classmethod
+    def from_file(cls, path, validation: ValidationMode = ValidationMode.fast):
+        notebook = load_notebook_metadata(path, validation=validation)
+        return cls(path=path, metadata=notebook.metadata)
+
+    # deprecated in pydantic v2.0
+    def json(self, *args, **kwargs):
+        if hasattr(self, "model_dump_json"):
+            return self.model_dump_json(*args, **kwargs)
+        else:
+            return super().json(*args, **kwargs)
+
+    def __hash__(self):
+        # Equal notebooks have equal paths, and hashing a path is cheaper than serializing
+        return hash(self.path)
@@ -1,50 +1,39 @@
-from enum import Enum
+import os
 from pathlib import Path
-from typing import List
+import threading
+from typing import Dict, List, Tuple
 
 from pydantic import BaseModel
 
-from nbautoexport.utils import get_logger
+# Options and file names are defined without pydantic for the command line interface, and are
+# re-exported here
+from nbautoexport.constants import (  # noqa: F401
+    CleanMode,
+    DEFAULT_CLEAN_MODE,
+    DEFAULT_EXPORT_FORMATS,
+    DEFAULT_ORGANIZE_BY,
+    DEFAULT_VALIDATION,
+    EXPORT_MANIFEST_FILE,
+    ExportFormat,
+    OrganizeBy,
+    SAVE_PROGRESS_INDICATOR_FILE,
+    ValidationMode,
+)
+from nbautoexport.utils import get_logger, IGNORED_DIRECTORIES
 
 
 logger = get_logger()
 
 
-SAVE_PROGRESS_INDICATOR_FILE = ".nbautoexport"
-
-
-class ExportFormat(str, Enum):
-    asciidoc = "asciidoc"
-    html = "html"
-    latex = "latex"
-    markdown = "markdown"
-    notebook = "notebook"
-    pdf = "pdf"
-    rst = "rst"
-    script = "script"
-    slides = "slides"
-
-    @classmethod
-    def has_value(cls, value: str) -> bool:
-        return any(level for level in cls if level.value == value)
-
-
-class OrganizeBy(str, Enum):
-    notebook = "notebook"
-    extension = "extension"
-
-
-DEFAULT_EXPORT_FORMATS = [ExportFormat.script]
-DEFAULT_ORGANIZE_BY = OrganizeBy.extension
-
-
 class CleanConfig(BaseModel):
     exclude: List[str] = []
+    mode: CleanMode = CleanMode(DEFAULT_CLEAN_MODE)
 
 
 class NbAutoexportConfig(BaseModel):
     export_formats: List[ExportFormat] = [ExportFormat(fmt) for fmt in DEFAULT_EXPORT_FORMATS]
     organize_by: OrganizeBy = OrganizeBy(DEFAULT_ORGANIZE_BY)
+    validation: ValidationMode = ValidationMode(DEFAULT_VALIDATION)
     clean: CleanConfig = CleanConfig()
 
     class Config:
@@ -64,6 +53,48 @@ class NbAutoexportConfig(BaseModel):
         else:
             return super().dict(*args, **kwargs)
 
+    # deprecated in pydantic v2.0
+    def copy(self, *args, **kwargs):
+        if hasattr(self, "model_copy"):
+            return self.model_copy(*args, **kwargs)
+        else:
+            return super().copy(*args, **kwargs)
+
+
+_config_cache: Dict[Path, Tuple[Tuple[int, int, int], NbAutoexportConfig]] = {}
+_config_cache_lock = threading.Lock()
+
+
+def read_sentinel(sentinel_path: Path) -> NbAutoexportConfig:
+    """Reads and validates a configuration file. Parsed configurations are cached in-process,
+    keyed by the file's modification time, size, and inode, so rereading an unchanged file only
+    costs a stat. Editing the file invalidates its cache entry.
+
+    Args:
+        sentinel_path (Path): path to configuration file
+
+    Returns:
+        NbAutoexportConfig: configuration. A copy is returned, so callers may modify it.
+
+    Raises:
+        FileNotFoundError: if configuration file does not exist
+    """
+    sentinel_path = Path(sentinel_path)
+    stat = os.stat(sentinel_path)
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    with _config_cache_lock:
+        cached = _config_cache.get(sentinel_path)
+    if cached is not None and cached[0] == key:
+        return cached[1].copy(deep=True)
+
+    config = NbAutoexportConfig.parse_file(
+        path=sentinel_path, content_type="application/json", encoding="utf-8"
+    )
+    with _config_cache_lock:
+        _config_cache[sentinel_path] = (key, config)
+    return config.copy(deep=True)
+
 
 def install_sentinel(directory: Path, config: NbAutoexportConfig, overwrite: bool):
     """Writes the configuration file to a specified directory."""
@@ -75,7 +106,26 @@ def install_sentinel(directory: Path, config: NbAutoexportConfig, overwrite: boo
             """If you wish to overwrite, use the --overwrite flag."""
         )
     else:
+        config_json = config.json(indent=2)
         logger.info(f"Creating configuration file at {sentinel_path}")
-        logger.info(f"\n{config.json(indent=2)}")
+        logger.info(f"\n{config_json}")
         with sentinel_path.open("w", encoding="utf-8") as fp:
-            fp.write(config.json(indent=2))
+            fp.write(config_json)
+
+
+def find_sentinel_files(root: Path) -> List[Path]:
+    """Finds all nbautoexport configuration files in a directory tree with a single walk. Skips
+    directories that never hold configured notebooks, such as .git and .ipynb_checkpoints.
+
+    Args:
+        root (Path): directory to search
+
+    Returns:
+        List[Path]: paths of configuration files, in sorted walk order
+    """
+    sentinel_paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_DIRECTORIES)
+        if SAVE_PROGRESS_INDICATOR_FILE in filenames:
+            sentinel_paths.append(Path(dirpath) / SAVE_PROGRESS_INDICATOR_FILE)
+    return sentinel_paths
@@ -0,0 +1,147 @@
+from contextlib import nullcontext
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, ContextManager, Dict, List, Optional, Union
+
+from nbautoexport.utils import get_logger
+
+logger = get_logger()
+
+# Environment variable setting the log level of timing records, e.g., 'INFO', or 'off' to disable
+TIMING_LEVEL_ENV_VAR = "NBAUTOEXPORT_TIMING_LEVEL"
+DEFAULT_TIMING_LEVEL = logging.DEBUG
+
+# Attribute of log records that holds a timing record as a dict, for structured log handlers
+TIMING_RECORD_ATTRIBUTE = "nbautoexport_timing"
+
+
+def parse_timing_level(level: Union[int, str, None]) -> Optional[int]:
+    """Parse a log level for timing records, given as a number or a level name. None, 'off', and
+    'none' disable timing.
+
+    Args:
+        level (Union[int, str, None]): log level
+
+    Returns:
+        Optional[int]: numeric log level, or None if disabled
+
+    Raises:
+        ValueError: if level is not a known log level
+    """
+    if level is None or isinstance(level, int):
+        return level
+    name = level.strip().upper()
+    if name in ("", "OFF", "NONE"):
+        return None
+    if name.isdigit():
+        return int(name)
+    value = logging.getLevelName(name)
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level for timing records: {level}")
+    return value
+
+
+def _timing_level_from_env() -> Optional[int]:
+    try:
+        return parse_timing_level(os.environ.get(TIMING_LEVEL_ENV_VAR, DEFAULT_TIMING_LEVEL))
+    except ValueError as e:
+        logger.warning(f"nbautoexport | Ignoring {TIMING_LEVEL_ENV_VAR}: {e}")
+        return DEFAULT_TIMING_LEVEL
+
+
+_timing_level = _timing_level_from_env()
+_span_stacks = threading.local()
+_DISABLED_SPAN = nullcontext()
+
+
+def set_timing_level(level: Union[int, str, None]):
+    """Set the log level that timing records are emitted at. Records are only built if the
+    nbautoexport logger is enabled for this level. Defaults to DEBUG, or to the level named by the
+    NBAUTOEXPORT_TIMING_LEVEL environment variable.
+
+    Args:
+        level (Union[int, str, None]): log level, as a number or a level name. None or 'off'
+            disables timing.
+    """
+    global _timing_level
+    _timing_level = parse_timing_level(level)
+
+
+def get_timing_level() -> Optional[int]:
+    """Returns the log level that timing records are emitted at, or None if timing is disabled."""
+    return _timing_level
+
+
+class TimingSpan:
+    """Measures the duration of a stage of exporting, and logs it as a structured record when the
+    stage ends. Create with timing_span."""
+
+    __slots__ = ("name", "level", "fields", "parent", "start")
+
+    def __init__(self, name: str, level: int, fields: Dict[str, Any]):
+        self.name = name
+        self.level = level
+        self.fields = fields
+        self.parent: Optional[str] = None
+        self.start = 0.0
+
+    def __enter__(self) -> "TimingSpan":
+        stack = _span_stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        _span_stack().pop()
+        record: Dict[str, Any] = {"span": self.name, "duration_ms": round(duration * 1000, 3)}
+        if self.parent is not None:
+            record["parent"] = self.parent
+        record.update(self.fields)
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        logger.log(
+            self.level,
+            f"nbautoexport | timing {json.dumps(record, default=str)}",
+            extra={TIMING_RECORD_ATTRIBUTE: record},
+        )
+        return False
+
+
+def _span_stack() -> List[TimingSpan]:
+    stack = getattr(_span_stacks, "stack", None)
+    if stack is None:
+        stack = _span_stacks.stack = []
+    return stack
+
+
+def timing_span(name: str, **fields: Any) -> ContextManager:
+    """Context manager that times a stage of exporting. When the stage ends, a record is logged as
+    JSON, e.g.,
+
+        nbautoexport | timing {"span": "render", "duration_ms": 12.5, "parent": "export_format",
+        "notebook": "/path/to/notebook.ipynb", "format": "html"}
+
+    The record is also attached to the log record as its `nbautoexport_timing` attribute. Spans
+    record the name of the span they are nested in as their parent, per thread. If the stage
+    raises, the record has the exception type as 'error'.
+
+    If timing is disabled, or the nbautoexport logger is not enabled for the timing level, a no-op
+    context manager is returned, so nothing is measured or built.
+
+    Args:
+        name (str): name of stage
+        **fields: additional values to include in the record. Values that aren't JSON
+            serializable, like paths, are converted to strings when logged.
+
+    Returns:
+        ContextManager: span
+    """
+    level = _timing_level
+    if level is None or not logger.isEnabledFor(level):
+        return _DISABLED_SPAN
+    return TimingSpan(name, level, fields)
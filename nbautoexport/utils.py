@@ -1,9 +1,15 @@
 from contextlib import contextmanager
+import copy
+import hashlib
+import json
 import logging
+import mmap
 import os
 from pathlib import Path
+import re
 import sys
-from typing import List
+import threading
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple, TYPE_CHECKING, Union
 from warnings import warn
 
 if sys.version_info[:2] >= (3, 8):
@@ -11,86 +17,547 @@ if sys.version_info[:2] >= (3, 8):
 else:
     import importlib_metadata
 
-from pydantic import BaseModel
-from nbconvert.exporters import get_export_names, get_exporter
-import nbformat
-from jupyter_core.application import JupyterApp
+from nbautoexport.constants import ValidationMode
 
+# nbconvert, nbformat, jupyter_core.application, and pydantic are slow to import, so they are
+# imported where they are used. Commands like 'nbautoexport configure' never need most of them.
+if TYPE_CHECKING:
+    import nbformat
+
+    from nbautoexport.notebook import JupyterNotebook
 
 __version__ = importlib_metadata.version("nbautoexport")
 
+# Directories that never contain notebooks nbautoexport should manage, skipped when walking trees
+IGNORED_DIRECTORIES = frozenset(
+    [
+        ".git",
+        ".hg",
+        ".svn",
+        ".ipynb_checkpoints",
+        "__pycache__",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".tox",
+        ".nox",
+        ".venv",
+        "node_modules",
+    ]
+)
+
 
 def get_logger():
-    if JupyterApp.initialized():
-        return JupyterApp.instance().log
+    # A Jupyter application can only be running if jupyter_core.application was imported
+    jupyter_application = sys.modules.get("jupyter_core.application")
+    if jupyter_application is not None and jupyter_application.JupyterApp.initialized():
+        return jupyter_application.JupyterApp.instance().log
     else:
         logger = logging.getLogger("nbautoexport")
         logger.addHandler(logging.NullHandler())
         return logger
 
 
-class JupyterNotebook(BaseModel):
-    path: Path
-    metadata: nbformat.notebooknode.NotebookNode
-
-    class Config:
-        # NotebookNode not pydantic v2 compatible
-        arbitrary_types_allowed = True
-
-    def get_script_extension(self):
-        # Match logic of nbconvert.exporters.script.ScriptExporter
-        # Order of precedence is: nb_convert_exporter, language, file_extension, .txt
-        lang_info = self.metadata.get("language_info", {})
-        if "nbconvert_exporter" in lang_info:
-            return get_exporter(lang_info.nbconvert_exporter)().file_extension
-        if "name" in lang_info and lang_info.name in get_export_names():
-            return get_exporter(lang_info.name)().file_extension
-        return lang_info.get("file_extension", ".txt")
-
-    @property
-    def name(self):
-        return self.path.stem
-
-    @classmethod
-    def from_file(cls, path):
-        notebook = nbformat.read(path, as_version=nbformat.NO_CONVERT)
-        nbformat.validate(notebook)
-        return cls(path=path, metadata=notebook.metadata)
-
-    # deprecated in pydantic v2.0
-    def json(self, *args, **kwargs):
-        if hasattr(self, "model_dump_json"):
-            return self.model_dump_json(*args, **kwargs)
-        else:
-            return super().json(*args, **kwargs)
+class NotebookDescriptor:
+    """Compact, read-only description of a notebook file, for scanning many notebooks, e.g., when
+    cleaning. Unlike JupyterNotebook, the notebook's metadata isn't kept: only what is needed to
+    determine its exports. Hashed and compared by path.
+
+    Args:
+        path (Path): path to notebook file
+        language_info (Tuple[Optional[str], Optional[str], Optional[str]]): notebook's
+            language_info nbconvert_exporter, name, and file_extension, used to determine its
+            script extension
+        mtime_ns (int): modification time of notebook file in nanoseconds
+        size (int): size of notebook file in bytes
+    """
+
+    __slots__ = ("path", "name", "language_info", "mtime_ns", "size", "_script_extension")
+
+    def __init__(
+        self,
+        path: Path,
+        language_info: Tuple[Optional[str], Optional[str], Optional[str]],
+        mtime_ns: int,
+        size: int,
+    ):
+        self.path = Path(path)
+        self.name = self.path.stem
+        self.language_info = language_info
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self._script_extension: Optional[str] = None
+
+    def get_script_extension(self) -> str:
+        """File extension of notebook's script export, resolved on first use."""
+        if self._script_extension is None:
+            self._script_extension = script_extension(*self.language_info)
+        return self._script_extension
 
     def __hash__(self):
-        return hash(self.json())
+        return hash(self.path)
 
+    def __eq__(self, other):
+        if not isinstance(other, NotebookDescriptor):
+            return NotImplemented
+        return self.path == other.path
 
-def find_notebooks(directory: Path) -> List[JupyterNotebook]:
-    """Finds Jupyter notebooks in a directory. Not recursive.
+    def __repr__(self):
+        return f"NotebookDescriptor(path={self.path!r})"
+
+
+def _language_info_key(
+    metadata: "nbformat.NotebookNode",
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    lang_info = metadata.get("language_info", {})
+    return (
+        lang_info.get("nbconvert_exporter"),
+        lang_info.get("name"),
+        lang_info.get("file_extension"),
+    )
+
+
+# Opening of a notebook's JSON: an object whose first key is a top-level notebook key
+NOTEBOOK_SIGNATURE_REGEX = re.compile(
+    rb'^(\xef\xbb\xbf)?\s*\{\s*"(cells|metadata|nbformat|nbformat_minor|worksheets)"\s*:'
+)
+NOTEBOOK_SIGNATURE_SIZE = 256
+
+
+def looks_like_notebook(path: Path) -> bool:
+    """Cheaply checks whether a file could be a Jupyter notebook, before fully reading it. Files
+    with the .ipynb extension qualify. Files without an extension qualify if their first few bytes
+    look like the start of notebook JSON. All other files, e.g., data files, are never opened.
+
+    Args:
+        path (Path): path of file
+
+    Returns:
+        bool: whether file may be a notebook
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".ipynb":
+        return True
+    if path.suffix != "":
+        return False
+    try:
+        with path.open("rb") as fp:
+            head = fp.read(NOTEBOOK_SIGNATURE_SIZE)
+    except OSError:
+        return False
+    return NOTEBOOK_SIGNATURE_REGEX.match(head) is not None
+
+
+_exporter_cache_lock = threading.Lock()
+_exporter_cache_token: Optional[Tuple] = None
+_export_names: Optional[List[str]] = None
+_exporter_extensions: Dict[str, str] = {}
+_script_extensions: Dict[Tuple[Optional[str], Optional[str], Optional[str]], str] = {}
+
+
+def _exporter_registry_token() -> Tuple:
+    """Cheap fingerprint of the nbconvert exporter registry. Exporters are registered as package
+    entry points, which only change when packages are installed or removed, i.e., when an import
+    path entry is added or modified."""
+    token = [os.environ.get("NBCONVERT_DISABLE_CONFIG_EXPORTERS")]
+    for entry in sys.path:
+        try:
+            token.append((entry, os.stat(entry or ".").st_mtime_ns))
+        except OSError:
+            token.append((entry, None))
+    return tuple(token)
+
+
+def refresh_exporter_cache():
+    """Clears cached exporter lookups if the nbconvert exporter registry has changed since the
+    last refresh. Fingerprinting the registry stats every import path entry, so rather than on
+    every lookup, this is called once per scan of a directory for notebooks, which is where
+    commands like 'nbautoexport clean' start looking up exporters."""
+    global _exporter_cache_token, _export_names
+    token = _exporter_registry_token()
+    with _exporter_cache_lock:
+        if token != _exporter_cache_token:
+            _exporter_cache_token = token
+            _export_names = None
+            _exporter_extensions.clear()
+            _script_extensions.clear()
+
+
+def clear_exporter_cache():
+    """Clears cached exporter lookups, so they are looked up from nbconvert again on next use."""
+    global _exporter_cache_token, _export_names
+    with _exporter_cache_lock:
+        _exporter_cache_token = None
+        _export_names = None
+        _exporter_extensions.clear()
+        _script_extensions.clear()
+
+
+def export_names() -> List[str]:
+    """Returns names of the exporters nbconvert supports, like nbconvert's get_export_names.
+    Cached in-process until the cache is refreshed after the nbconvert exporter registry changes.
+
+    Returns:
+        List[str]: exporter names
+    """
+    global _export_names
+    with _exporter_cache_lock:
+        if _export_names is None:
+            from nbconvert.exporters import get_export_names
+
+            _export_names = get_export_names()
+        return list(_export_names)
+
+
+def exporter_extension(name: str) -> str:
+    """Returns the file extension of an nbconvert exporter's output. Cached in-process until the
+    cache is refreshed after the nbconvert exporter registry changes, so each exporter is only
+    looked up and built once.
+
+    Args:
+        name (str): exporter name
+
+    Returns:
+        str: file extension, e.g., '.py'
+    """
+    with _exporter_cache_lock:
+        if name not in _exporter_extensions:
+            from nbconvert.exporters import get_exporter
+
+            _exporter_extensions[name] = get_exporter(name)().file_extension
+        return _exporter_extensions[name]
+
+
+def script_extension(
+    nbconvert_exporter: Optional[str], language: Optional[str], file_extension: Optional[str]
+) -> str:
+    """Returns the file extension of a notebook's script export given its language_info
+    metadata. Matches the logic of nbconvert.exporters.script.ScriptExporter, with order of
+    precedence: nbconvert_exporter, language name, file_extension, '.txt'. Cached in-process until
+    the cache is refreshed after the nbconvert exporter registry changes.
+
+    Args:
+        nbconvert_exporter (Optional[str]): language_info.nbconvert_exporter
+        language (Optional[str]): language_info.name
+        file_extension (Optional[str]): language_info.file_extension
+
+    Returns:
+        str: file extension, e.g., '.py'
+    """
+    key = (nbconvert_exporter, language, file_extension)
+    with _exporter_cache_lock:
+        if key in _script_extensions:
+            return _script_extensions[key]
+
+    if nbconvert_exporter is not None:
+        extension = exporter_extension(nbconvert_exporter)
+    elif language is not None and language in export_names():
+        extension = exporter_extension(language)
+    elif file_extension is not None:
+        extension = file_extension
+    else:
+        extension = ".txt"
+
+    with _exporter_cache_lock:
+        _script_extensions[key] = extension
+    return extension
+
+
+def find_notebooks(
+    directory: Path, validation: ValidationMode = ValidationMode.fast
+) -> List["JupyterNotebook"]:
+    """Finds Jupyter notebooks in a directory. Not recursive. Only files that pass the cheap
+    looks_like_notebook check are read, and only their metadata is parsed.
 
     Args:
         directory (Path): directory to search for notebook files
+        validation (ValidationMode): how thoroughly to check notebook files. See
+            load_notebook_metadata.
 
     Returns:
         List[JupyterNotebook]: notebooks found
     """
-    notebooks = []
-    for subfile in directory.iterdir():
-        if subfile.is_file() and subfile.name:
-            try:
-                notebook = nbformat.read(str(subfile), as_version=nbformat.NO_CONVERT)
-                nbformat.validate(notebook)
-                notebooks.append(JupyterNotebook(path=subfile, metadata=notebook.metadata))
-            except Exception as e:
-                if subfile.suffix.lower() == ".ipynb":
-                    warn(
-                        f"Error reading {subfile.resolve()} as Jupyter Notebook: "
-                        + f"[{type(e).__name__}] {e}"
-                    )
-    return notebooks
+    from nbautoexport.notebook import JupyterNotebook
+
+    return [
+        JupyterNotebook(path=path, metadata=notebook.metadata)
+        for path, notebook, _ in _iter_notebook_files(directory, validation)
+    ]
+
+
+def find_notebook_descriptors(
+    directory: Path, validation: ValidationMode = ValidationMode.fast
+) -> List[NotebookDescriptor]:
+    """Finds Jupyter notebooks in a directory, like find_notebooks, but returns compact
+    NotebookDescriptor objects that are cheap to hold and hash for many notebooks.
+
+    Args:
+        directory (Path): directory to search for notebook files
+        validation (ValidationMode): how thoroughly to check notebook files. See
+            load_notebook_metadata.
+
+    Returns:
+        List[NotebookDescriptor]: notebooks found
+    """
+    return [
+        NotebookDescriptor(
+            path=path,
+            language_info=_language_info_key(notebook.metadata),
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+        )
+        for path, notebook, stat in _iter_notebook_files(directory, validation)
+    ]
+
+
+def _iter_notebook_files(
+    directory: Path, validation: ValidationMode
+) -> Iterator[Tuple[Path, "nbformat.NotebookNode", os.stat_result]]:
+    """Yields path, top-level metadata, and stat of each notebook file in a directory. Warns
+    about .ipynb files that can't be read. Notebooks recorded as validated in the directory's
+    export manifest, and unchanged since, are not read again. Validation records are updated in
+    the manifest once the directory has been scanned. Refreshes cached exporter lookups, which
+    are used on the notebooks found."""
+    from nbformat import from_dict
+
+    from nbautoexport.manifest import (
+        load_validation_records,
+        record_validations,
+        ValidationRecord,
+    )
+
+    refresh_exporter_cache()
+    validation = ValidationMode(validation)
+    records = load_validation_records(directory)
+    current_records = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            subfile = Path(directory) / entry.name
+            if entry.is_file() and looks_like_notebook(subfile):
+                try:
+                    # Stat before reading, so that a file changed while read is read again
+                    stat = entry.stat()
+                    key = (stat.st_mtime_ns, stat.st_size, entry.inode())
+                    record = records.get(entry.name)
+                    if (
+                        record is not None
+                        and (record.mtime_ns, record.size, record.inode) == key
+                        and _VALIDATION_STRENGTH[record.validation]
+                        >= _VALIDATION_STRENGTH[validation]
+                    ):
+                        notebook = from_dict(copy.deepcopy(record.notebook))
+                    else:
+                        notebook = load_notebook_metadata(subfile, validation=validation)
+                        record = ValidationRecord(
+                            mtime_ns=key[0],
+                            size=key[1],
+                            inode=key[2],
+                            validation=validation,
+                            notebook=notebook,
+                        )
+                    current_records[entry.name] = record
+                except Exception as e:
+                    if subfile.suffix.lower() == ".ipynb":
+                        warn(
+                            f"Error reading {subfile.resolve()} as Jupyter Notebook: "
+                            + f"[{type(e).__name__}] {e}"
+                        )
+                    continue
+                yield subfile, notebook, stat
+    if current_records != records:
+        record_validations(directory, current_records)
+
+
+NOTEBOOK_METADATA_KEYS = frozenset(["metadata", "nbformat", "nbformat_minor"])
+
+_JSON_WHITESPACE_REGEX = re.compile(rb"[ \t\n\r]*")
+_JSON_STRING_REGEX = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_JSON_SCALAR_REGEX = re.compile(rb"-?[0-9][0-9.eE+\-]*|true|false|null")
+_JSON_STRUCTURE_REGEX = re.compile(rb'["\[\]{}]')
+
+
+_VALIDATION_STRENGTH = {ValidationMode.off: 0, ValidationMode.fast: 1, ValidationMode.full: 2}
+
+_notebook_metadata_cache: Dict[
+    Path, Tuple[Tuple[int, int, int], ValidationMode, "nbformat.NotebookNode"]
+] = {}
+_notebook_metadata_cache_lock = threading.Lock()
+
+
+def load_notebook_metadata(
+    path: Path, validation: ValidationMode = ValidationMode.fast
+) -> "nbformat.NotebookNode":
+    """Reads the top-level metadata of a notebook file with read_notebook_metadata, checking the
+    file as thoroughly as the validation mode asks:
+
+    - full: validate the whole notebook against the nbformat schema with nbformat.validate
+    - fast: check only the notebook's top-level structure
+    - off: only require the file to be a JSON object
+
+    Successful results are cached in-process, keyed by the file's modification time, size, and
+    inode, so unchanged notebooks are not read or validated again. Editing the file invalidates its
+    cache entry. find_notebooks and find_notebook_descriptors also keep validation records in the
+    export manifest of directories configured with nbautoexport, so that later runs skip unchanged
+    notebooks too.
+
+    Args:
+        path (Path): path to notebook file
+        validation (ValidationMode): how thoroughly to check the notebook file
+
+    Returns:
+        nbformat.NotebookNode: notebook with only top-level metadata keys. A copy is returned, so
+            callers may modify it.
+
+    Raises:
+        ValueError: if the file is not notebook JSON
+        nbformat.ValidationError: if full validation fails
+    """
+    validation = ValidationMode(validation)
+    path = Path(os.path.abspath(path))
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    with _notebook_metadata_cache_lock:
+        cached = _notebook_metadata_cache.get(path)
+    if (
+        cached is not None
+        and cached[0] == key
+        and _VALIDATION_STRENGTH[cached[1]] >= _VALIDATION_STRENGTH[validation]
+    ):
+        return copy.deepcopy(cached[2])
+
+    if validation == ValidationMode.full:
+        import nbformat
+
+        # Validating needs the whole notebook, so take the metadata from it instead of reading the
+        # file a second time
+        full_notebook = nbformat.read(str(path), as_version=nbformat.NO_CONVERT)
+        nbformat.validate(full_notebook)
+        notebook = nbformat.from_dict(
+            {key: full_notebook[key] for key in NOTEBOOK_METADATA_KEYS if key in full_notebook}
+        )
+    else:
+        notebook = read_notebook_metadata(path, check_structure=validation != ValidationMode.off)
+
+    with _notebook_metadata_cache_lock:
+        _notebook_metadata_cache[path] = (key, validation, notebook)
+    return copy.deepcopy(notebook)
+
+
+def read_notebook_metadata(path: Path, check_structure: bool = True) -> "nbformat.NotebookNode":
+    """Reads only the top-level metadata of a notebook file, without parsing its cells. The file is
+    memory-mapped and scanned, and the values of the top-level 'metadata', 'nbformat', and
+    'nbformat_minor' keys are the only parts decoded. Cells, including any large outputs, are
+    skipped over without being built, so this is fast and uses little memory for any size of
+    notebook. The notebook's top-level structure is checked, but not its full schema.
+
+    Args:
+        path (Path): path to notebook file
+        check_structure (bool): whether to check that the top-level keys a notebook must have are
+            present. If False, a missing 'metadata' key is treated as empty.
+
+    Returns:
+        nbformat.NotebookNode: notebook with only the 'metadata', 'nbformat', and 'nbformat_minor'
+            keys
+
+    Raises:
+        ValueError: if the file is not notebook JSON
+    """
+    with Path(path).open("rb") as fp:
+        try:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError("Notebook file is empty.")
+        with data:
+            values, keys = _scan_json_object(data, NOTEBOOK_METADATA_KEYS)
+
+    from nbformat import from_dict
+
+    if not check_structure:
+        values.setdefault("metadata", {})
+        return from_dict(values)
+
+    nbformat_version = values.get("nbformat")
+    if not isinstance(nbformat_version, int):
+        raise ValueError("Notebook JSON has no integer 'nbformat' key.")
+    if not isinstance(values.get("metadata"), dict):
+        raise ValueError("Notebook JSON has no 'metadata' object.")
+    contents_key = "cells" if nbformat_version >= 4 else "worksheets"
+    if contents_key not in keys:
+        raise ValueError(f"Notebook JSON has no '{contents_key}' key.")
+    return from_dict(values)
+
+
+def _scan_json_object(data: bytes, wanted: FrozenSet[str]) -> Tuple[Dict, FrozenSet[str]]:
+    """Scans a top-level JSON object, decoding only the values of wanted keys. Returns the decoded
+    values, and all keys of the object."""
+    pos = _skip_json_whitespace(data, 3 if data[:3] == b"\xef\xbb\xbf" else 0)
+    if data[pos : pos + 1] != b"{":
+        raise ValueError("Notebook JSON is not an object.")
+    pos = _skip_json_whitespace(data, pos + 1)
+
+    values = {}
+    keys = set()
+    if data[pos : pos + 1] == b"}":
+        return values, frozenset(keys)
+    while True:
+        match = _JSON_STRING_REGEX.match(data, pos)
+        if match is None:
+            raise ValueError(f"Expected object key in notebook JSON at byte {pos}.")
+        key = json.loads(match.group().decode("utf-8"))
+        pos = _skip_json_whitespace(data, match.end())
+        if data[pos : pos + 1] != b":":
+            raise ValueError(f"Expected ':' in notebook JSON at byte {pos}.")
+        pos = _skip_json_whitespace(data, pos + 1)
+
+        end = _skip_json_value(data, pos)
+        keys.add(key)
+        if key in wanted:
+            values[key] = json.loads(data[pos:end].decode("utf-8"))
+
+        pos = _skip_json_whitespace(data, end)
+        delimiter = data[pos : pos + 1]
+        if delimiter == b"}":
+            return values, frozenset(keys)
+        if delimiter != b",":
+            raise ValueError(f"Expected ',' or '}}' in notebook JSON at byte {pos}.")
+        pos = _skip_json_whitespace(data, pos + 1)
+
+
+def _skip_json_whitespace(data: bytes, pos: int) -> int:
+    return _JSON_WHITESPACE_REGEX.match(data, pos).end()
+
+
+def _skip_json_value(data: bytes, pos: int) -> int:
+    """Returns the position just past the JSON value starting at pos. Nested arrays and objects
+    are skipped by only looking at brackets and strings."""
+    start = data[pos : pos + 1]
+    if start == b'"':
+        match = _JSON_STRING_REGEX.match(data, pos)
+        if match is None:
+            raise ValueError(f"Unterminated string in notebook JSON at byte {pos}.")
+        return match.end()
+    if start not in (b"{", b"["):
+        match = _JSON_SCALAR_REGEX.match(data, pos)
+        if match is None:
+            raise ValueError(f"Expected value in notebook JSON at byte {pos}.")
+        return match.end()
+
+    depth = 0
+    while True:
+        match = _JSON_STRUCTURE_REGEX.search(data, pos)
+        if match is None:
+            raise ValueError("Unexpected end of notebook JSON.")
+        char = match.group()
+        if char == b'"':
+            string_match = _JSON_STRING_REGEX.match(data, match.start())
+            if string_match is None:
+                raise ValueError(f"Unterminated string in notebook JSON at byte {match.start()}.")
+            pos = string_match.end()
+            continue
+        depth += 1 if char in (b"{", b"[") else -1
+        pos = match.end()
+        if depth == 0:
+            return pos
 
 
 @contextmanager
@@ -106,6 +573,68 @@ def cleared_argv():
         sys.argv = prev_argv
 
 
+def atomic_write(path: Path, content: Union[str, bytes]):
+    """Writes a file by writing to a temporary file in the same directory and then renaming it
+    into place, so that readers such as file watchers never see a partially written file. Text is
+    written with UTF-8 encoding.
+
+    Args:
+        path (Path): path of file to write
+        content (Union[str, bytes]): file content
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        if isinstance(content, bytes):
+            with tmp_path.open("wb") as fp:
+                fp.write(content)
+        else:
+            with tmp_path.open("w", encoding="utf-8") as fp:
+                fp.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+def write_if_changed(path: Path, content: Union[str, bytes]) -> bool:
+    """Writes a file with atomic_write, unless the file already has exactly this content. The
+    existing file's size is compared first, and its hash only if the sizes match, so that unchanged
+    files keep their modification times and don't trigger file watchers or rebuilds. Text is
+    written with UTF-8 encoding and platform line endings.
+
+    Args:
+        path (Path): path of file to write
+        content (Union[str, bytes]): file content
+
+    Returns:
+        bool: whether the file was written. False if it was left unchanged.
+    """
+    path = Path(path)
+    if isinstance(content, str):
+        # Match the newline translation of writing in text mode
+        content = content.replace("\n", os.linesep).encode("utf-8")
+    try:
+        if (
+            path.stat().st_size == len(content)
+            and _hash_file(path) == hashlib.sha256(content).digest()
+        ):
+            return False
+    except FileNotFoundError:
+        pass
+    atomic_write(path, content)
+    return True
+
+
+def _hash_file(path: Path) -> bytes:
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
 @contextmanager
 def working_directory(directory: Path):
     """Changes working directory and returns to previous on exit."""
@@ -115,3 +644,12 @@ def working_directory(directory: Path):
         yield
     finally:
         os.chdir(prev_cwd)
+
+
+def __getattr__(name):
+    # JupyterNotebook is a pydantic model, imported on first use, since importing pydantic is slow
+    if name in ("JupyterNotebook", "NotebookNodeField"):
+        from nbautoexport import notebook
+
+        return getattr(notebook, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,321 @@
+import ctypes
+import ctypes.util
+import os
+from pathlib import Path
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from nbautoexport.background import BackgroundExporter
+from nbautoexport.export import export_notebook
+from nbautoexport.sentinel import read_sentinel, SAVE_PROGRESS_INDICATOR_FILE
+from nbautoexport.utils import get_logger, IGNORED_DIRECTORIES
+
+logger = get_logger()
+
+
+def is_watched_notebook(path: Path) -> bool:
+    """Whether a changed file is a notebook that watch mode should export. Hidden files, such as
+    the temporary files of atomic saves, are ignored."""
+    return path.suffix.lower() == ".ipynb" and not path.name.startswith(".")
+
+
+def watched_directories(root: Path, recursive: bool) -> List[Path]:
+    """Directories to watch for notebook changes: the root directory, and if recursive, all
+    directories under it except those skipped by IGNORED_DIRECTORIES."""
+    if not recursive:
+        return [Path(root)]
+    directories = []
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_DIRECTORIES)
+        directories.append(Path(dirpath))
+    return directories
+
+
+class PollingWatcher:
+    """Watches directories for changed notebook files by periodically listing them with
+    os.scandir and comparing each notebook's modification time and size. Only files that look
+    like notebooks by name are stat-ed.
+
+    Args:
+        root (Path): directory to watch
+        recursive (bool): whether to also watch all directories under root
+        interval (float): seconds between polls
+    """
+
+    def __init__(self, root: Path, recursive: bool = False, interval: float = 1.0):
+        self.root = Path(root)
+        self.recursive = recursive
+        self.interval = interval
+        self._stats = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        stats = {}
+        for directory in watched_directories(self.root, self.recursive):
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        path = directory / entry.name
+                        if is_watched_notebook(path) and entry.is_file():
+                            stat = entry.stat()
+                            stats[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                # Directory removed while scanning
+                continue
+        return stats
+
+    def poll(self, timeout: float) -> Set[Path]:
+        """Wait up to timeout seconds for notebook changes.
+
+        Args:
+            timeout (float): maximum seconds to wait
+
+        Returns:
+            Set[Path]: notebooks that were created or modified
+        """
+        time.sleep(min(timeout, self.interval))
+        stats = self._scan()
+        changed = {path for path, stat in stats.items() if self._stats.get(path) != stat}
+        self._stats = stats
+        return changed
+
+    def close(self):
+        pass
+
+
+# Constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_INOTIFY_EVENT = struct.Struct("iIII")
+_INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+
+
+class InotifyWatcher:
+    """Watches directories for changed notebook files using Linux's inotify, so that changes are
+    reported as soon as files are written without polling. Notebooks count as changed when a
+    file is closed after writing, or renamed into a watched directory, as with atomic saves. If
+    the kernel's event queue overflows, events are lost, so the watched directories are rescanned
+    and all of their notebooks are reported as changed.
+
+    Args:
+        root (Path): directory to watch
+        recursive (bool): whether to also watch all directories under root, including ones
+            created later
+
+    Raises:
+        OSError: if inotify is not available
+    """
+
+    def __init__(self, root: Path, recursive: bool = False):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux.")
+        self.root = Path(root)
+        self.recursive = recursive
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self._watches: Dict[int, Path] = {}
+        try:
+            for directory in watched_directories(self.root, self.recursive):
+                self._add_watch(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory: Path):
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), _INOTIFY_MASK | IN_ONLYDIR
+        )
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch failed for {directory}: {os.strerror(errno)}")
+        self._watches[wd] = directory
+
+    def poll(self, timeout: float) -> Set[Path]:
+        """Wait up to timeout seconds for notebook changes.
+
+        Args:
+            timeout (float): maximum seconds to wait
+
+        Returns:
+            Set[Path]: notebooks that were written or moved into a watched directory
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed: Set[Path] = set()
+        overflowed = False
+        for wd, mask, name in self._read_events():
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+                continue
+            directory = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if directory is None or name is None:
+                continue
+            path = directory / name
+            if mask & IN_ISDIR:
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_new_directory(path, changed)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and is_watched_notebook(path):
+                changed.add(path)
+        if overflowed:
+            self._rescan(changed)
+        return changed
+
+    def _rescan(self, changed: Set[Path]):
+        """Recover from an event queue overflow, after which changes may have been missed. Watches
+        any directories created in the meantime, and reports all notebooks as changed, as a first
+        scan by PollingWatcher would. Exports of unchanged notebooks are skipped by the export
+        manifest."""
+        logger.warning(
+            f"nbautoexport | inotify event queue overflowed, so changes may have been missed. "
+            f"Rescanning {self.root} ..."
+        )
+        watched = set(self._watches.values())
+        for directory in watched_directories(self.root, self.recursive):
+            try:
+                if directory not in watched:
+                    self._add_watch(directory)
+                with os.scandir(directory) as entries:
+                    changed.update(
+                        directory / entry.name
+                        for entry in entries
+                        if is_watched_notebook(directory / entry.name) and entry.is_file()
+                    )
+            except OSError as e:
+                logger.warning(f"nbautoexport | Unable to rescan {directory}: {e}")
+
+    def _watch_new_directory(self, directory: Path, changed: Set[Path]):
+        """Watch a directory created or moved under a watched directory. Notebooks already in it
+        may have been written before the watch was added, so they are reported as changed."""
+        if directory.name in IGNORED_DIRECTORIES:
+            return
+        for subdirectory in watched_directories(directory, recursive=True):
+            try:
+                self._add_watch(subdirectory)
+                changed.update(p for p in subdirectory.iterdir() if is_watched_notebook(p))
+            except OSError as e:
+                logger.warning(f"nbautoexport | Unable to watch {subdirectory}: {e}")
+
+    def _read_events(self) -> Iterable[Tuple[int, int, Optional[str]]]:
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(buffer):
+            wd, mask, _, name_length = _INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += _INOTIFY_EVENT.size
+            raw_name = buffer[offset : offset + name_length].rstrip(b"\0")
+            offset += name_length
+            yield wd, mask, os.fsdecode(raw_name) if raw_name else None
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(
+    root: Path, recursive: bool = False, polling: bool = False, poll_interval: float = 1.0
+):
+    """Create a watcher for notebook changes, using inotify where available, and otherwise
+    falling back to stat polling.
+
+    Args:
+        root (Path): directory to watch
+        recursive (bool): whether to also watch all directories under root
+        polling (bool): whether to always use stat polling
+        poll_interval (float): seconds between polls when polling
+
+    Returns:
+        Union[InotifyWatcher, PollingWatcher]: watcher
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(root, recursive=recursive)
+        except (OSError, AttributeError) as e:
+            # AttributeError if libc has no inotify functions
+            logger.info(f"nbautoexport | inotify unavailable ({e}). Falling back to polling.")
+    return PollingWatcher(root, recursive=recursive, interval=poll_interval)
+
+
+def watch(
+    root: Path,
+    recursive: bool = False,
+    debounce: float = 1.0,
+    max_workers: int = 1,
+    polling: bool = False,
+    poll_interval: float = 1.0,
+    stop_event: Optional[threading.Event] = None,
+):
+    """Watch a directory and export notebooks whenever they change, for editors that don't run
+    Jupyter's post-save hook. Only notebooks in directories with an .nbautoexport configuration
+    file are exported, with the same pipeline as the post-save hook, so notebooks whose content is
+    unchanged since their last export are skipped.
+
+    Exports run on a BackgroundExporter, so repeated changes to a notebook within the debounce
+    window result in a single export, and at most max_workers exports run at once. Blocks until
+    stop_event is set or KeyboardInterrupt (SIGINT) is raised. On stopping, exports still waiting
+    to run are finished before returning.
+
+    Args:
+        root (Path): directory to watch
+        recursive (bool): whether to also watch all directories under root
+        debounce (float): seconds to wait for further changes to a notebook before exporting it
+        max_workers (int): maximum number of exports to run at the same time
+        polling (bool): whether to always use stat polling instead of inotify
+        poll_interval (float): seconds between polls when polling
+        stop_event (Optional[threading.Event]): event to set to stop watching
+    """
+    stop_event = stop_event or threading.Event()
+    exporter = BackgroundExporter(max_workers=max_workers, debounce=debounce)
+    watcher = make_watcher(root, recursive=recursive, polling=polling, poll_interval=poll_interval)
+    logger.info(f"nbautoexport | Watching {root} with {type(watcher).__name__} ...")
+    try:
+        while not stop_event.is_set():
+            for notebook_path in sorted(watcher.poll(timeout=poll_interval)):
+                submit_export(exporter, notebook_path)
+    finally:
+        watcher.close()
+        exporter.shutdown(wait=True)
+        logger.info("nbautoexport | Stopped watching.")
+
+
+def submit_export(exporter: BackgroundExporter, notebook_path: Path):
+    """Queue an export of a changed notebook if its directory is configured with nbautoexport."""
+    sentinel_path = notebook_path.parent / SAVE_PROGRESS_INDICATOR_FILE
+    try:
+        config = read_sentinel(sentinel_path)
+    except FileNotFoundError:
+        logger.debug(f"nbautoexport | {sentinel_path} not found. Not exporting {notebook_path}.")
+        return
+    except Exception as e:
+        logger.error(
+            f"nbautoexport | Unable to read {sentinel_path} due to {type(e).__name__}: {e}"
+        )
+        return
+    if not notebook_path.exists():
+        return
+    logger.info(f"nbautoexport | {notebook_path} changed. Exporting notebook ...")
+    exporter.submit(
+        notebook_path, export_notebook, notebook_path, config=config, use_manifest=True
+    )
@@ -0,0 +1,320 @@
+import logging
+import os
+from pathlib import Path
+import pickle
+import queue
+import signal
+import subprocess
+import sys
+import threading
+from typing import Any, BinaryIO, Iterable, Optional
+
+from nbautoexport.background import (
+    BackgroundExporter,
+    disable_background_exports,
+    enable_background_exports,
+    get_background_exporter,
+)
+from nbautoexport.metrics import get_export_metrics, reset_export_metrics
+from nbautoexport.sentinel import ExportFormat, NbAutoexportConfig
+from nbautoexport.timing import timing_span
+from nbautoexport.utils import get_logger
+
+logger = get_logger()
+
+# Seconds to wait for the worker process to exit after asking it to stop, before killing it
+STOP_TIMEOUT = 5.0
+
+
+class ExportWorkerError(Exception):
+    """Exporting a notebook in the export worker process failed, or the worker process crashed or
+    timed out while exporting it."""
+
+
+def run_worker(jobs: BinaryIO, results: BinaryIO):
+    """Main loop of the export worker process. The first message on jobs holds the export formats
+    to build exporters for and the log level. Then notebooks are exported as jobs arrive, until
+    None is received or jobs is closed. Each job is answered on results with whether the notebook
+    was exported, the error if it failed, and a snapshot of the export metrics recorded for it.
+    Messages are pickled.
+
+    Args:
+        jobs (BinaryIO): stream of jobs from the main process
+        results (BinaryIO): stream of results to the main process
+    """
+    warm_formats, log_level = pickle.load(jobs)
+    # Log to stderr, which is shared with the main process
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("[nbautoexport worker] %(levelname)s %(message)s"))
+    worker_logger = logging.getLogger("nbautoexport")
+    worker_logger.addHandler(handler)
+    worker_logger.setLevel(log_level)
+
+    from nbautoexport.export import export_notebook, get_exporter_registry
+
+    registry = get_exporter_registry()
+    for export_format in warm_formats:
+        try:
+            registry.get(export_format)
+        except Exception as e:
+            worker_logger.warning(
+                f"nbautoexport | Failed to build exporter for {export_format.value} due to "
+                f"{type(e).__name__}: {e}"
+            )
+
+    while True:
+        try:
+            job = pickle.load(jobs)
+        except EOFError:  # main process exited
+            break
+        if job is None:
+            break
+        notebook_path, config, use_manifest, force = job
+        metrics = reset_export_metrics()
+        try:
+            exported = export_notebook(
+                notebook_path, config=config, use_manifest=use_manifest, force=force
+            )
+            error = None
+        except BaseException as e:  # nbconvert calls sys.exit on conversion errors
+            exported = False
+            error = f"{type(e).__name__}: {e}"
+        pickle.dump((exported, error, metrics.snapshot()), results)
+        results.flush()
+
+
+def main():
+    """Entry point of the export worker process, run as `python -m nbautoexport.worker`."""
+    # Ctrl+C in a terminal is for the Jupyter server, which stops the worker itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Keep stdout for results, and send anything else printed to stdout to stderr instead
+    results = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    run_worker(sys.stdin.buffer, results)
+
+
+def _read_results(results: BinaryIO, received: "queue.Queue[Any]"):
+    # Runs on a thread per worker process, so that waiting for a result can time out. None is
+    # queued when the worker process exits.
+    while True:
+        try:
+            result = pickle.load(results)
+        except (EOFError, OSError, ValueError, pickle.UnpicklingError):
+            received.put(None)
+            return
+        received.put(result)
+
+
+class ExportWorker:
+    """Long-lived worker process that exports notebooks, so that exports don't compete with the
+    Jupyter server for the GIL or grow its memory. The worker imports nbconvert once and keeps its
+    exporters warm between exports. Jobs are sent to it over a pipe and run one at a time.
+
+    The worker is started on first use if not started with `start`. If it crashes, or an export
+    takes longer than `timeout`, it is killed if needed and restarted, and the export in progress
+    fails with ExportWorkerError. Export metrics recorded by the worker are merged into this
+    process's metrics.
+
+    Args:
+        warm_formats (Iterable[ExportFormat]): export formats to build exporters for whenever
+            the worker starts
+        timeout (Optional[float]): seconds to wait for an export before the worker is considered
+            hung and restarted. None waits indefinitely.
+    """
+
+    def __init__(self, warm_formats: Iterable[ExportFormat] = (), timeout: Optional[float] = None):
+        self.warm_formats = [ExportFormat(export_format) for export_format in warm_formats]
+        self.timeout = timeout
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._results: "queue.Queue[Any]" = queue.Queue()
+
+    @property
+    def pid(self) -> Optional[int]:
+        """Process ID of the worker process, or None if it is not running."""
+        return None if self._process is None else self._process.pid
+
+    def start(self):
+        """Start the worker process, if it is not running, so that its exporters are warm by the
+        first export."""
+        with self._lock:
+            if self._process is None:
+                self._start()
+
+    def _start(self):
+        # A fresh interpreter, rather than a fork of the server or multiprocessing's spawn, which
+        # would reimport the server's main module
+        process = subprocess.Popen(
+            [sys.executable, "-m", "nbautoexport.worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self._results = queue.Queue()
+        threading.Thread(
+            target=_read_results,
+            args=(process.stdout, self._results),
+            name="nbautoexport-worker-results",
+            daemon=True,
+        ).start()
+        self._process = process
+        self._send((self.warm_formats, logger.getEffectiveLevel()))
+        logger.info(f"nbautoexport | Started export worker process {process.pid}.")
+
+    def _send(self, message: Any):
+        process = self._process
+        assert process is not None and process.stdin is not None
+        pickle.dump(message, process.stdin)
+        process.stdin.flush()
+
+    def _kill(self):
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if process.poll() is None:
+            process.kill()
+        process.wait(STOP_TIMEOUT)
+        for stream in (process.stdin, process.stdout):
+            if stream is None:
+                continue
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def _restart(self, reason: str):
+        process = self._process
+        assert process is not None
+        logger.warning(
+            f"nbautoexport | Export worker process {process.pid} {reason} "
+            f"(exit code {process.poll()}). Restarting it ..."
+        )
+        self._kill()
+        self.restarts += 1
+        self._start()
+
+    def export_notebook(
+        self,
+        notebook_path: Path,
+        config: NbAutoexportConfig,
+        use_manifest: bool = False,
+        force: bool = False,
+    ) -> bool:
+        """Export a notebook in the worker process. Same as nbautoexport.export.export_notebook.
+
+        Args:
+            notebook_path (Path): path to notebook to export with nbconvert
+            config (NbAutoexportConfig): configuration
+            use_manifest (bool): whether to use the export manifest. See export_notebook.
+            force (bool): export even if the manifest shows that exports are up to date
+
+        Returns:
+            bool: whether the notebook was exported. False if skipped as unchanged.
+
+        Raises:
+            ExportWorkerError: if the export failed, or the worker crashed or timed out
+        """
+        notebook_path = Path(notebook_path)
+        with timing_span("worker_export", notebook=notebook_path), self._lock:
+            if self._process is None:
+                self._start()
+            elif self._process.poll() is not None:
+                self._restart("exited")
+
+            failure: Optional[str] = None
+            result: Any = None
+            try:
+                self._send((notebook_path, config, use_manifest, force))
+                result = self._results.get(timeout=self.timeout)
+            except OSError:
+                pass
+            except queue.Empty:
+                failure = f"timed out after {self.timeout} seconds"
+            if result is None and failure is None:
+                failure = "crashed"
+            if failure is not None:
+                self._restart(f"{failure} while exporting {notebook_path}")
+
+        if failure is not None:
+            get_export_metrics().notebook_failures.inc()
+            raise ExportWorkerError(f"Export worker {failure} while exporting {notebook_path}.")
+        exported, error, metrics_snapshot = result
+        get_export_metrics().merge(metrics_snapshot)
+        if error is not None:
+            raise ExportWorkerError(error)
+        return exported
+
+    def stop(self):
+        """Ask the worker process to exit after its current export, killing it if it does not
+        exit within STOP_TIMEOUT seconds."""
+        with self._lock:
+            process = self._process
+            if process is None:
+                return
+            try:
+                self._send(None)
+                process.wait(STOP_TIMEOUT)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+            self._kill()
+        logger.info("nbautoexport | Stopped export worker process.")
+
+
+_export_worker: Optional[ExportWorker] = None
+# Background exporter started by enable_worker_exports, to be shut down with the worker
+_worker_background_exporter: Optional[BackgroundExporter] = None
+_export_worker_lock = threading.Lock()
+
+
+def enable_worker_exports(
+    warm_formats: Iterable[ExportFormat] = (), timeout: Optional[float] = None
+) -> ExportWorker:
+    """Run post-save exports in a long-lived worker process, which is started right away. Replaces
+    any existing export worker, which is stopped. Post-save hooks submit exports to the worker
+    through the background exporter, so that they never wait for the worker. If background exports
+    are not enabled already, they are enabled with default settings, and disabled again by
+    disable_worker_exports.
+
+    Args:
+        warm_formats (Iterable[ExportFormat]): export formats to build exporters for whenever
+            the worker starts
+        timeout (Optional[float]): seconds to wait for an export before restarting the worker
+
+    Returns:
+        ExportWorker: the active export worker
+    """
+    global _export_worker, _worker_background_exporter
+    export_worker = ExportWorker(warm_formats=warm_formats, timeout=timeout)
+    export_worker.start()
+    with _export_worker_lock:
+        previous = _export_worker
+        _export_worker = export_worker
+        if get_background_exporter() is None:
+            _worker_background_exporter = enable_background_exports()
+    if previous is not None:
+        previous.stop()
+    return export_worker
+
+
+def disable_worker_exports():
+    """Run post-save exports in this process again, stopping any active export worker. Background
+    exports enabled by enable_worker_exports are disabled first, after their queued exports have
+    finished."""
+    global _export_worker, _worker_background_exporter
+    with _export_worker_lock:
+        previous = _export_worker
+        _export_worker = None
+        background_exporter, _worker_background_exporter = _worker_background_exporter, None
+    if background_exporter is not None and get_background_exporter() is background_exporter:
+        disable_background_exports(wait=True)
+    if previous is not None:
+        previous.stop()
+
+
+def get_export_worker() -> Optional[ExportWorker]:
+    """Return the active export worker, or None if exports run in this process."""
+    return _export_worker
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import json
+import logging
+import shutil
+import threading
+
+import pytest
+
+from nbautoexport import background
+from nbautoexport.export import post_save
+from nbautoexport.sentinel import NbAutoexportConfig, SAVE_PROGRESS_INDICATOR_FILE
+from tests.utils import caplog_contains
+
+
+@pytest.fixture()
+def notebooks_dir(tmp_path, notebook_asset):
+    shutil.copy(notebook_asset.path, tmp_path / "the_notebook.ipynb")
+    with (tmp_path / SAVE_PROGRESS_INDICATOR_FILE).open("w", encoding="utf-8") as fp:
+        json.dump(NbAutoexportConfig(export_formats=["script"]).dict(), fp)
+    return tmp_path
+
+
+@pytest.fixture()
+def background_exporter():
+    exporter = background.enable_background_exports(max_workers=1)
+    yield exporter
+    background.disable_background_exports()
+
+
+def test_enable_disable_background_exports():
+    assert background.get_background_exporter() is None
+
+    exporter = background.enable_background_exports(max_workers=2)
+    assert background.get_background_exporter() is exporter
+    assert exporter.max_workers == 2
+
+    background.disable_background_exports()
+    assert background.get_background_exporter() is None
+
+
+def test_post_save_background(notebooks_dir, background_exporter, caplog):
+    """Test that post_save returns before the export runs, and that the export still completes."""
+    caplog.set_level(logging.INFO)
+
+    release = threading.Event()
+    background_exporter.submit(notebooks_dir, release.wait)  # block the single worker
+
+    notebook_path = notebooks_dir / "the_notebook.ipynb"
+    post_save(model={"type": "notebook"}, os_path=str(notebook_path), contents_manager=None)
+    assert not (notebooks_dir / "script").exists()
+
+    release.set()
+    background_exporter.shutdown(wait=True)
+
+    assert (notebooks_dir / "script" / "the_notebook.py").exists()
+    assert caplog_contains(
+        caplog,
+        level=logging.INFO,
+        in_msg=f"nbautoexport | Background export of {notebook_path} completed.",
+    )
+
+
+def test_background_export_failure_logged(background_exporter, tmp_path, caplog):
+    def failing_export():
+        raise RuntimeError("the kraken")
+
+    future = background_exporter.submit(tmp_path / "the_notebook.ipynb", failing_export)
+    with pytest.raises(RuntimeError):
+        future.result()
+    background_exporter.shutdown(wait=True)
+
+    assert caplog_contains(
+        caplog,
+        level=logging.ERROR,
+        in_msg="failed due to RuntimeError: the kraken",
+    )
+
+
+def test_coalesce_queued_saves(background_exporter, tmp_path):
+    """Test that saves queued behind a busy worker collapse into one export of the latest save."""
+    release = threading.Event()
+    background_exporter.submit(tmp_path / "other.ipynb", release.wait)  # block the single worker
+
+    calls = []
+    notebook_path = tmp_path / "the_notebook.ipynb"
+    futures = [background_exporter.submit(notebook_path, calls.append, n) for n in range(3)]
+
+    release.set()
+    background_exporter.shutdown(wait=True)
+
+    assert calls == [2]
+    assert [f.cancelled() for f in futures] == [True, True, False]
+
+
+def test_coalesce_in_flight_save(background_exporter, tmp_path):
+    """Test that saves during a running export lead to one follow-up export of the latest save."""
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def export_fn(n):
+        calls.append(n)
+        if n == 0:
+            started.set()
+            release.wait()
+
+    notebook_path = tmp_path / "the_notebook.ipynb"
+    background_exporter.submit(notebook_path, export_fn, 0)
+    started.wait()
+    background_exporter.submit(notebook_path, export_fn, 1)
+    background_exporter.submit(notebook_path, export_fn, 2)
+
+    release.set()
+    background_exporter.shutdown(wait=True)
+
+    assert calls == [0, 2]
+
+
+def test_debounce(tmp_path):
+    """Test that a burst of saves within the debounce window results in a single export."""
+    exporter = background.BackgroundExporter(max_workers=2, debounce=0.2)
+    calls = []
+    notebook_path = tmp_path / "the_notebook.ipynb"
+    futures = [exporter.submit(notebook_path, calls.append, n) for n in range(5)]
+
+    futures[-1].result(timeout=5)
+    exporter.shutdown(wait=True)
+
+    assert calls == [4]
+    assert all(f.cancelled() for f in futures[:-1])
+
+
+def test_debounce_flushed_on_shutdown(tmp_path):
+    """Test that exports still in their debounce window run when shutting down with wait."""
+    exporter = background.BackgroundExporter(max_workers=1, debounce=60)
+    calls = []
+    exporter.submit(tmp_path / "the_notebook.ipynb", calls.append, "saved")
+    exporter.shutdown(wait=True)
+    assert calls == ["saved"]
@@ -0,0 +1,85 @@
+import json
+
+from typer.testing import CliRunner
+
+from benchmarks import bench
+from benchmarks.notebooks import KERNEL_LANGUAGES, make_notebook, write_notebook
+from nbautoexport.sentinel import ExportFormat
+from nbautoexport.utils import JupyterNotebook
+
+
+def test_make_notebook(tmp_path):
+    notebook = make_notebook(cells=6, output_bytes=100, images=2, image_bytes=10, language="r")
+    assert len(notebook.cells) == 6
+    code_cells = [cell for cell in notebook.cells if cell.cell_type == "code"]
+    assert [len(cell.outputs) for cell in code_cells] == [2, 2, 1]
+    assert len(code_cells[0].outputs[0].text) == 100
+
+    first = write_notebook(notebook, tmp_path / "first.ipynb", revision=1)
+    second = write_notebook(notebook, tmp_path / "second.ipynb", revision=2)
+    assert first.read_text() != second.read_text()
+    for language in KERNEL_LANGUAGES:
+        path = write_notebook(make_notebook(language=language), tmp_path / f"{language}.ipynb")
+        JupyterNotebook.from_file(path, validation="full")
+
+
+def test_run_benchmarks(tmp_path):
+    output = tmp_path / "results.json"
+    result = CliRunner().invoke(
+        bench.app,
+        ["run", "--output", str(output), "-f", "script", "--cells", "4", "--notebooks", "2"]
+        + ["--depth", "1", "--breadth", "2", "--files", "2", "--repeat", "2"],
+    )
+    assert result.exit_code == 0, result.output
+
+    results = json.loads(output.read_text())
+    assert results["schema_version"] == bench.SCHEMA_VERSION
+    assert results["environment"]["nbautoexport"]
+    names = [benchmark["name"] for benchmark in results["benchmarks"]]
+    assert names == [
+        "post_save",
+        "post_save_unchanged",
+        "export",
+        "find_files_to_clean",
+        "find_files_to_clean",
+    ]
+    for benchmark in results["benchmarks"]:
+        assert len(benchmark["samples"]) == 2
+        assert benchmark["stats"]["min"] <= benchmark["stats"]["median"]
+    clean_all = results["benchmarks"][3]
+    assert clean_all["params"]["mode"] == "all"
+    assert clean_all["peak_memory_bytes"] > 0
+    # data/ and script/ trees: 2 files at the root and in each of 2 subdirectories
+    assert clean_all["files_to_clean"] == 2 * (2 + 2 * 2)
+
+
+def test_compare_results(tmp_path):
+    def results(post_save_median, export_median):
+        return {
+            "benchmarks": [
+                {
+                    "name": "post_save",
+                    "params": {"format": ExportFormat.script.value},
+                    "stats": {"median": post_save_median},
+                },
+                {"name": "export", "params": {"notebooks": 2}, "stats": {"median": export_median}},
+            ]
+        }
+
+    baseline = tmp_path / "baseline.json"
+    current = tmp_path / "current.json"
+    baseline.write_text(json.dumps(results(1.0, 1.0)))
+    current.write_text(json.dumps(results(1.05, 2.0)))
+
+    rows, regressions = bench.compare_results(
+        json.loads(baseline.read_text()), json.loads(current.read_text()), threshold=0.1
+    )
+    assert [row[3] for row in rows] == [1.05, 2.0]
+    assert regressions == ['export{"notebooks": 2}']
+
+    result = CliRunner().invoke(bench.app, ["compare", str(baseline), str(current)])
+    assert result.exit_code == 1
+    assert "REGRESSION" in result.output
+
+    result = CliRunner().invoke(bench.app, ["compare", str(baseline), str(baseline)])
+    assert result.exit_code == 0
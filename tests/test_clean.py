@@ -1,10 +1,24 @@
 import itertools
+import os
 import shutil
 import pytest
 
-from nbautoexport.clean import notebook_exports_generator
+from nbautoexport.clean import (
+    ExcludeMatcher,
+    find_files_to_clean,
+    iter_files_to_clean,
+    managed_subfolders,
+    notebook_exports_generator,
+)
 from nbautoexport.export import export_notebook
-from nbautoexport.sentinel import ExportFormat, NbAutoexportConfig, OrganizeBy
+from nbautoexport.manifest import ExportManifest, ManifestEntry, write_manifest
+from nbautoexport.sentinel import (
+    CleanConfig,
+    ExportFormat,
+    NbAutoexportConfig,
+    OrganizeBy,
+    SAVE_PROGRESS_INDICATOR_FILE,
+)
 from nbautoexport.utils import find_notebooks
 
 EXPORT_FORMATS_TO_TEST = [fmt for fmt in ExportFormat if fmt != ExportFormat.pdf]
@@ -35,3 +49,262 @@ def test_notebook_exports_generator(notebooks_dir, export_format, organize_by):
 
     actual_exports = set(notebooks_dir.glob("**/*")).difference(notebook_files)
     assert predicted_exports == actual_exports
+
+
+GLOB_TEST_FILES = [
+    "keep.txt",
+    "delete.txt",
+    "images/keep.jpg",
+    "images/delete.png",
+    "a/keep.txt",
+    "a/b/keep.md",
+    "a/b/c/keep.md",
+    "a/b/c/q1.py",
+    "a/b/c/q22.py",
+    ".hidden/keep.md",
+    "docs/[x].md",
+]
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "keep.txt",
+        "*.txt",
+        "*/*",
+        "**/*.md",
+        "**/keep.*",
+        "images/*.jpg",
+        "a/**/*.md",
+        "a/*/c/*",
+        "**/q?.py",
+        "**/q[0-9].py",
+        "**/q[!1].py",
+        "docs/[[]x].md",
+        "nothing/*",
+    ],
+)
+def test_exclude_matcher_matches_glob(tmp_path, pattern):
+    """Test that ExcludeMatcher matches the same files as Path.glob."""
+    for relative_path in GLOB_TEST_FILES:
+        path = tmp_path / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+    globbed = {p for p in tmp_path.glob(pattern) if p.is_file()}
+    matcher = ExcludeMatcher([pattern])
+    matched = {tmp_path / p for p in GLOB_TEST_FILES if matcher.matches(p)}
+    assert matched == globbed
+
+
+def test_exclude_matcher_multiple_patterns():
+    matcher = ExcludeMatcher(["keep.txt", "images/*.jpg", "**/*.md"])
+    assert matcher.matches("keep.txt")
+    assert matcher.matches("images/keep.jpg")
+    assert matcher.matches("keep.md")
+    assert matcher.matches("a/b/keep.md")
+    assert not matcher.matches("a/keep.txt")
+    assert not matcher.matches("images/delete.png")
+
+    assert not ExcludeMatcher([]).matches("keep.txt")
+
+
+def test_exclude_matcher_negation():
+    matcher = ExcludeMatcher(["*.txt", "**/*.md", "!keep*", "keep_not.txt"])
+    assert matcher.matches("delete.txt")
+    assert matcher.matches("a/delete.md")
+    assert not matcher.matches("keep.txt")
+    assert not matcher.matches("keep.md")
+    assert matcher.matches("a/keep.md")
+    assert matcher.matches("keep_not.txt")
+    assert not matcher.matches("keep.png")
+
+
+def test_exclude_matcher_dirs():
+    matcher = ExcludeMatcher(["data", "**/node_modules", "images/**", "docs/*", "src/*.py"])
+    assert matcher.matches_dir("data")
+    assert not matcher.matches_dir("a/data")
+    assert matcher.matches_dir("node_modules")
+    assert matcher.matches_dir("a/b/node_modules")
+    assert matcher.matches_dir("images")
+    assert matcher.matches_dir("images/diagrams")
+    assert not matcher.matches_dir("docs")
+    assert not matcher.matches_dir("src")
+    assert not matcher.matches_dir("script")
+
+    assert not ExcludeMatcher(["data", "!data"]).matches_dir("data")
+    assert not ExcludeMatcher(["data/*", "!data/keep.txt"]).matches_dir("data")
+
+
+def test_iter_files_to_clean_negated_dir_contents(notebooks_dir):
+    """Test that a directory's contents excluded with 'data/*' can be re-included by a negation."""
+    config = NbAutoexportConfig(
+        export_formats=["script"], clean=CleanConfig(exclude=["data/*", "!data/keep.txt"])
+    )
+    (notebooks_dir / SAVE_PROGRESS_INDICATOR_FILE).write_text(config.json(), encoding="utf-8")
+    for nb in EXPECTED_NOTEBOOKS:
+        export_notebook(notebooks_dir / f"{nb}.ipynb", config)
+
+    (notebooks_dir / "data").mkdir()
+    (notebooks_dir / "data" / "exclude.txt").touch()
+    (notebooks_dir / "data" / "keep.txt").touch()
+
+    assert find_files_to_clean(notebooks_dir, config) == [notebooks_dir / "data" / "keep.txt"]
+
+
+def test_iter_files_to_clean(notebooks_dir):
+    config = NbAutoexportConfig(
+        export_formats=["script"], clean=CleanConfig(exclude=["data/*.csv"])
+    )
+    (notebooks_dir / SAVE_PROGRESS_INDICATOR_FILE).write_text(config.json(), encoding="utf-8")
+    for nb in EXPECTED_NOTEBOOKS:
+        export_notebook(notebooks_dir / f"{nb}.ipynb", config)
+
+    extra_files = [
+        notebooks_dir / "script" / "Untitled.py",
+        notebooks_dir / "data" / "deep" / "delete.txt",
+        notebooks_dir / ".ipynb_checkpoints" / "the_notebook_0-checkpoint.ipynb",
+        notebooks_dir / "data" / "keep.csv",
+    ]
+    for path in extra_files:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+    files_to_clean = iter_files_to_clean(notebooks_dir, config)
+    assert not isinstance(files_to_clean, (list, set))
+    assert set(files_to_clean) == set(extra_files[:2])
+    assert find_files_to_clean(notebooks_dir, config) == sorted(extra_files[:2])
+
+
+@pytest.mark.skipif(os.name == "nt", reason="Creating symlinks requires privileges on Windows")
+def test_iter_files_to_clean_symlinks(notebooks_dir, tmp_path_factory):
+    """Test that symbolic links to directories are not followed."""
+    outside_dir = tmp_path_factory.mktemp("outside")
+    (outside_dir / "precious.txt").touch()
+    (notebooks_dir / "linked").symlink_to(outside_dir, target_is_directory=True)
+
+    config = NbAutoexportConfig()
+    assert list(iter_files_to_clean(notebooks_dir, config)) == []
+
+
+def test_iter_files_to_clean_prunes_excluded_dirs(notebooks_dir, monkeypatch):
+    """Test that excluded directories are never listed, and their contents never cleaned."""
+    config = NbAutoexportConfig(
+        export_formats=["script"],
+        clean=CleanConfig(exclude=["data", "**/node_modules", "images/**", "!images/*.png"]),
+    )
+    kept_files = [
+        notebooks_dir / "data" / "raw" / "potatoes.csv",
+        notebooks_dir / "app" / "node_modules" / "left-pad" / "index.js",
+        notebooks_dir / "images" / "delete.png",
+    ]
+    cleaned_files = [notebooks_dir / "app" / "delete.js", notebooks_dir / "delete.png"]
+    for path in kept_files + cleaned_files:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+    scanned = []
+    real_scandir = os.scandir
+
+    def recording_scandir(path):
+        scanned.append(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+
+    assert set(iter_files_to_clean(notebooks_dir, config)) == set(cleaned_files)
+    assert set(scanned) == {notebooks_dir, notebooks_dir / "app"}
+    assert scanned.count(notebooks_dir / "app") == 1
+
+
+@pytest.mark.parametrize("organize_by", ["extension", "notebook"])
+def test_managed_subfolders(notebooks_dir, organize_by):
+    manifest = ExportManifest(
+        notebooks={
+            "the_notebook_0.ipynb": ManifestEntry(
+                notebook_hash="a", config_hash="b", exports=["script/the_notebook_0.py"]
+            ),
+            "Untitled.ipynb": ManifestEntry(
+                notebook_hash="c", config_hash="d", exports=["exports/Untitled.py"]
+            ),
+        }
+    )
+    write_manifest(notebooks_dir, manifest)
+    config = NbAutoexportConfig(export_formats=["html", "markdown"], organize_by=organize_by)
+
+    subfolders = managed_subfolders(notebooks_dir, find_notebooks(notebooks_dir), config)
+    if organize_by == "extension":
+        expected_names = {"html", "markdown"}
+    else:
+        expected_names = set(EXPECTED_NOTEBOOKS)
+    expected_names |= {"script", "exports"}
+    assert subfolders == {notebooks_dir / name for name in expected_names}
+
+
+@pytest.mark.parametrize("organize_by", ["extension", "notebook"])
+def test_iter_files_to_clean_managed_user_folders(notebooks_dir, organize_by):
+    """Test that managed clean mode leaves alone user folders named like a notebook or an export
+    format that the configuration doesn't export to."""
+    config = NbAutoexportConfig(
+        export_formats=["script"], organize_by=organize_by, clean=CleanConfig(mode="managed")
+    )
+    (notebooks_dir / SAVE_PROGRESS_INDICATOR_FILE).write_text(config.json(), encoding="utf-8")
+    shutil.copy(notebooks_dir / f"{EXPECTED_NOTEBOOKS[0]}.ipynb", notebooks_dir / "data.ipynb")
+    for path in notebooks_dir.glob("*.ipynb"):
+        export_notebook(path, config, use_manifest=True)
+
+    user_files = [notebooks_dir / "html" / "index.html"]
+    if organize_by == "extension":
+        user_files.append(notebooks_dir / "data" / "train.csv")
+    else:
+        user_files.append(notebooks_dir / "script" / "train.py")
+    for path in user_files:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+    assert find_files_to_clean(notebooks_dir, config) == []
+
+
+@pytest.mark.parametrize("organize_by", ["extension", "notebook"])
+def test_iter_files_to_clean_managed(notebooks_dir, organize_by, monkeypatch):
+    """Test that managed clean mode only walks and cleans subfolders nbautoexport exports to."""
+    config = NbAutoexportConfig(
+        export_formats=["script"], organize_by=organize_by, clean=CleanConfig(mode="managed")
+    )
+    (notebooks_dir / SAVE_PROGRESS_INDICATOR_FILE).write_text(config.json(), encoding="utf-8")
+    for nb in EXPECTED_NOTEBOOKS:
+        export_notebook(notebooks_dir / f"{nb}.ipynb", config, use_manifest=True)
+
+    # Stale exports of a notebook that has since been deleted
+    shutil.copy(notebooks_dir / f"{EXPECTED_NOTEBOOKS[0]}.ipynb", notebooks_dir / "Untitled.ipynb")
+    export_notebook(notebooks_dir / "Untitled.ipynb", config, use_manifest=True)
+    (notebooks_dir / "Untitled.ipynb").unlink()
+    stale_export = (
+        notebooks_dir / "script" / "Untitled.py"
+        if organize_by == "extension"
+        else notebooks_dir / "Untitled" / "Untitled.py"
+    )
+
+    cleaned_files = [stale_export]
+    kept_files = [
+        notebooks_dir / "delete.txt",
+        notebooks_dir / "data" / "potatoes.csv",
+        notebooks_dir / "html" / "the_notebook_0.html",
+    ]
+    for path in cleaned_files + kept_files:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+    scanned = []
+    real_scandir = os.scandir
+
+    def recording_scandir(path):
+        scanned.append(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+
+    assert set(iter_files_to_clean(notebooks_dir, config)) == set(cleaned_files)
+    # Top-level directory is only listed once, to find notebooks
+    assert scanned.count(notebooks_dir) == 1
+    assert notebooks_dir / "data" not in scanned
@@ -1,14 +1,18 @@
 from itertools import product
+import json
 from pathlib import Path
 import shutil
 
+import nbformat
 import pytest
 from typer.testing import CliRunner
 
+from nbautoexport import utils
 from nbautoexport.clean import get_expected_exports, get_extension
 from nbautoexport.nbautoexport import app
 from nbautoexport.sentinel import (
     CleanConfig,
+    EXPORT_MANIFEST_FILE,
     ExportFormat,
     NbAutoexportConfig,
     SAVE_PROGRESS_INDICATOR_FILE,
@@ -72,7 +76,11 @@ def test_clean(notebooks_dir, need_confirmation, organize_by):
     ]
     expected_exports = set(get_expected_exports(expected_notebooks, config))
 
-    all_expected = {nb.path for nb in expected_notebooks} | expected_exports | {sentinel_path}
+    # The export manifest records validated notebooks
+    manifest_path = notebooks_dir / EXPORT_MANIFEST_FILE
+    all_expected = (
+        {nb.path for nb in expected_notebooks} | expected_exports | {sentinel_path, manifest_path}
+    )
     assert set(notebooks_dir.glob("**/*")) == all_expected
 
     # Run clean again, there should be nothing to do
@@ -98,7 +106,12 @@ def test_clean_relative(notebooks_dir, organize_by):
         ]
         expected_exports = set(get_expected_exports(expected_notebooks, config))
 
-        all_expected = {nb.path for nb in expected_notebooks} | expected_exports | {sentinel_path}
+        manifest_path = Path(EXPORT_MANIFEST_FILE)
+        all_expected = (
+            {nb.path for nb in expected_notebooks}
+            | expected_exports
+            | {sentinel_path, manifest_path}
+        )
         assert set(Path().glob("**/*")) == all_expected
 
         # Run clean again, there should be nothing to do
@@ -130,7 +143,12 @@ def test_clean_relative_subdirectory(notebooks_dir, organize_by):
         ]
         expected_exports = set(get_expected_exports(expected_notebooks, config))
 
-        all_expected = {nb.path for nb in expected_notebooks} | expected_exports | {sentinel_path}
+        manifest_path = subdir / EXPORT_MANIFEST_FILE
+        all_expected = (
+            {nb.path for nb in expected_notebooks}
+            | expected_exports
+            | {sentinel_path, manifest_path}
+        )
         assert set(subdir.glob("**/*")) == all_expected
 
         # Run clean again, there should be nothing to do
@@ -186,7 +204,7 @@ def test_clean_exclude(notebooks_dir):
         all_expected = (
             {nb.path for nb in expected_notebooks}
             | expected_exports
-            | {sentinel_path}
+            | {sentinel_path, subdir / EXPORT_MANIFEST_FILE}
             | expected_extra
         )
         assert set(subdir.glob("**/*")) == all_expected
@@ -197,6 +215,34 @@ def test_clean_exclude(notebooks_dir):
         assert result_rerun.stdout.strip().endswith("No files identified for cleaning. Exiting.")
 
 
+def test_clean_managed(notebooks_dir):
+    """Test that managed clean mode only cleans subfolders of configured export formats, and
+    leaves other files alone, including subfolders named after notebooks or other formats."""
+    extra_files = [notebooks_dir / "delete.txt", notebooks_dir / "data" / "delete.txt"]
+    for extra_file in extra_files:
+        extra_file.parent.mkdir(exist_ok=True)
+        extra_file.touch()
+    (notebooks_dir / "empty").mkdir()
+
+    sentinel_path = notebooks_dir / SAVE_PROGRESS_INDICATOR_FILE
+    config = NbAutoexportConfig(export_formats=EXPECTED_FORMATS, organize_by="extension")
+    with sentinel_path.open("w", encoding="utf-8") as fp:
+        fp.write(config.json())
+    files_before = set(notebooks_dir.glob("**/*"))
+    cleaned_files = {
+        path
+        for fmt in EXPECTED_FORMATS
+        for path in (notebooks_dir / fmt).glob(f"{UNEXPECTED_NOTEBOOK}.*")
+    }
+    assert len(cleaned_files) == len(EXPECTED_FORMATS)
+
+    result = CliRunner().invoke(app, ["clean", str(notebooks_dir), "--mode", "managed", "-y"])
+    assert result.exit_code == 0
+
+    manifest_path = notebooks_dir / EXPORT_MANIFEST_FILE
+    assert set(notebooks_dir.glob("**/*")) == files_before - cleaned_files | {manifest_path}
+
+
 def test_clean_abort(notebooks_dir):
     sentinel_path = notebooks_dir / SAVE_PROGRESS_INDICATOR_FILE
     with sentinel_path.open("w", encoding="utf-8") as fp:
@@ -211,7 +257,49 @@ def test_clean_abort(notebooks_dir):
     ending_files = set(notebooks_dir.glob("**/*"))
 
     # no files deleted
-    assert starting_files == ending_files
+    assert starting_files == ending_files - {notebooks_dir / EXPORT_MANIFEST_FILE}
+
+
+@pytest.mark.parametrize("validation", ["fast", "full"])
+def test_clean_skips_validated_notebooks(notebooks_dir, validation, monkeypatch):
+    """Test that notebooks validated by one run are not read or validated again by the next run,
+    unless they have changed since."""
+    sentinel_path = notebooks_dir / SAVE_PROGRESS_INDICATOR_FILE
+    config = NbAutoexportConfig(export_formats=EXPECTED_FORMATS, validation=validation)
+    sentinel_path.write_text(config.json(), encoding="utf-8")
+    result = CliRunner().invoke(app, ["clean", str(notebooks_dir), "--dry-run"])
+    assert result.exit_code == 0
+
+    read = []
+    real_read_notebook_metadata = utils.read_notebook_metadata
+    real_nbformat_read = nbformat.read
+
+    def recording_read_notebook_metadata(path, *args, **kwargs):
+        read.append(Path(path).name)
+        return real_read_notebook_metadata(path, *args, **kwargs)
+
+    def recording_nbformat_read(path, *args, **kwargs):
+        read.append(Path(path).name)
+        return real_nbformat_read(path, *args, **kwargs)
+
+    monkeypatch.setattr(utils, "read_notebook_metadata", recording_read_notebook_metadata)
+    monkeypatch.setattr(nbformat, "read", recording_nbformat_read)
+    monkeypatch.setattr(nbformat, "validate", lambda *args, **kwargs: read.append("validate"))
+
+    # A new process starts without the in-process cache
+    monkeypatch.setattr(utils, "_notebook_metadata_cache", {})
+    result = CliRunner().invoke(app, ["clean", str(notebooks_dir), "--dry-run"])
+    assert result.exit_code == 0
+    assert read == []
+
+    changed_path = notebooks_dir / f"{EXPECTED_NOTEBOOKS[0]}.ipynb"
+    notebook = json.loads(changed_path.read_text(encoding="utf-8"))
+    notebook["metadata"]["potatoes"] = 400
+    changed_path.write_text(json.dumps(notebook), encoding="utf-8")
+    monkeypatch.setattr(utils, "_notebook_metadata_cache", {})
+    result = CliRunner().invoke(app, ["clean", str(notebooks_dir), "--dry-run"])
+    assert result.exit_code == 0
+    assert [name for name in read if name != "validate"] == [changed_path.name]
 
 
 def test_clean_dry_run(notebooks_dir):
@@ -227,7 +315,7 @@ def test_clean_dry_run(notebooks_dir):
     ending_files = set(notebooks_dir.glob("**/*"))
 
     # no files deleted
-    assert starting_files == ending_files
+    assert starting_files == ending_files - {notebooks_dir / EXPORT_MANIFEST_FILE}
 
 
 def test_clean_no_directory_error():
@@ -252,4 +340,4 @@ def test_clean_missing_config_error(notebooks_dir):
     ending_files = set(notebooks_dir.glob("**/*"))
 
     # no files deleted
-    assert starting_files == ending_files
+    assert starting_files == ending_files - {notebooks_dir / EXPORT_MANIFEST_FILE}
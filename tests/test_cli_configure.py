@@ -10,6 +10,7 @@ from nbautoexport.sentinel import (
     CleanConfig,
     DEFAULT_EXPORT_FORMATS,
     DEFAULT_ORGANIZE_BY,
+    DEFAULT_VALIDATION,
     NbAutoexportConfig,
     SAVE_PROGRESS_INDICATOR_FILE,
 )
@@ -32,14 +33,17 @@ def test_configure_defaults(tmp_path):
 def test_configure_specified(tmp_path):
     export_formats = ["script", "html"]
     organize_by = "notebook"
+    validation = "full"
     clean_exclude = ["README.md", "images/*"]
     assert export_formats != DEFAULT_EXPORT_FORMATS
     assert organize_by != DEFAULT_ORGANIZE_BY
+    assert validation != DEFAULT_VALIDATION
 
     cmd_list = ["configure", str(tmp_path)]
     for fmt in export_formats:
         cmd_list.extend(["-f", fmt])
     cmd_list.extend(["-b", organize_by])
+    cmd_list.extend(["--validation", validation])
     for excl in clean_exclude:
         cmd_list.extend(["-e", excl])
 
@@ -55,6 +59,7 @@ def test_configure_specified(tmp_path):
     expected_config = NbAutoexportConfig(
         export_formats=export_formats,
         organize_by=organize_by,
+        validation=validation,
         clean=CleanConfig(exclude=clean_exclude),
     )
     assert config == expected_config
@@ -151,6 +156,16 @@ def test_configure_no_warning(tmp_path, monkeypatch):
     assert "Warning:" not in result.output
 
 
+def test_configure_server_extension_no_warning(tmp_path, monkeypatch):
+    monkeypatch.setenv("JUPYTER_CONFIG_DIR", str(tmp_path))
+
+    jupyter_config.install_server_extension()
+
+    result = CliRunner().invoke(app, ["configure", str(tmp_path)])
+    assert result.exit_code == 0
+    assert "Warning:" not in result.output
+
+
 def test_configure_no_directory_error():
     result = CliRunner().invoke(app, ["configure"])
 
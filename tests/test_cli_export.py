@@ -6,11 +6,13 @@ import shutil
 import pytest
 from typer.testing import CliRunner
 
+from nbautoexport import export
 from nbautoexport.clean import get_expected_exports
 from nbautoexport.nbautoexport import app
 from nbautoexport.sentinel import (
     NbAutoexportConfig,
     DEFAULT_EXPORT_FORMATS,
+    EXPORT_MANIFEST_FILE,
     SAVE_PROGRESS_INDICATOR_FILE,
 )
 from nbautoexport.utils import find_notebooks, working_directory
@@ -95,6 +97,7 @@ def test_export_with_config_no_cli_opts(notebooks_dir, input_type, organize_by):
         input_path = str(expected_notebooks[0].path)
 
     sentinel_path = notebooks_dir / SAVE_PROGRESS_INDICATOR_FILE
+    manifest_path = notebooks_dir / EXPORT_MANIFEST_FILE
     config = NbAutoexportConfig(export_formats=EXPECTED_FORMATS, organize_by=organize_by)
     with sentinel_path.open("w", encoding="utf-8") as fp:
         fp.write(config.json())
@@ -105,7 +108,7 @@ def test_export_with_config_no_cli_opts(notebooks_dir, input_type, organize_by):
     expected_notebook_files = {nb.path for nb in expected_notebooks}
     expected_exports = set(get_expected_exports(expected_to_convert, config))
 
-    all_expected = expected_notebook_files | expected_exports | {sentinel_path}
+    all_expected = expected_notebook_files | expected_exports | {sentinel_path, manifest_path}
     assert set(notebooks_dir.glob("**/*")) == all_expected
 
 
@@ -125,6 +128,7 @@ def test_export_with_config_with_cli_opts(notebooks_dir, input_type, organize_by
         input_path = str(expected_notebooks[0].path)
 
     sentinel_path = notebooks_dir / SAVE_PROGRESS_INDICATOR_FILE
+    manifest_path = notebooks_dir / EXPORT_MANIFEST_FILE
     written_config = NbAutoexportConfig()
     with sentinel_path.open("w", encoding="utf-8") as fp:
         fp.write(written_config.json())
@@ -142,7 +146,7 @@ def test_export_with_config_with_cli_opts(notebooks_dir, input_type, organize_by
     expected_exports_from_written = set(get_expected_exports(expected_to_convert, written_config))
     assert expected_exports != expected_exports_from_written
 
-    all_expected = expected_notebook_files | expected_exports | {sentinel_path}
+    all_expected = expected_notebook_files | expected_exports | {sentinel_path, manifest_path}
     assert set(notebooks_dir.glob("**/*")) == all_expected
 
 
@@ -156,6 +160,7 @@ def test_export_relative(notebooks_dir, input_type, organize_by):
         assert len(expected_notebooks) == len(EXPECTED_NOTEBOOKS)
 
         sentinel_path = Path(SAVE_PROGRESS_INDICATOR_FILE)
+        manifest_path = Path(EXPORT_MANIFEST_FILE)
         config = NbAutoexportConfig(export_formats=EXPECTED_FORMATS, organize_by=organize_by)
         with sentinel_path.open("w", encoding="utf-8") as fp:
             fp.write(config.json())
@@ -173,7 +178,7 @@ def test_export_relative(notebooks_dir, input_type, organize_by):
         expected_notebook_files = {nb.path for nb in expected_notebooks}
         expected_exports = set(get_expected_exports(expected_to_convert, config))
 
-        all_expected = expected_notebook_files | expected_exports | {sentinel_path}
+        all_expected = expected_notebook_files | expected_exports | {sentinel_path, manifest_path}
         assert set(Path().glob("**/*")) == all_expected
 
 
@@ -190,6 +195,7 @@ def test_clean_relative_subdirectory(notebooks_dir, input_type, organize_by):
             shutil.move(str(subfile), str(subdir))
 
         sentinel_path = subdir / SAVE_PROGRESS_INDICATOR_FILE
+        manifest_path = subdir / EXPORT_MANIFEST_FILE
         config = NbAutoexportConfig(export_formats=EXPECTED_FORMATS, organize_by=organize_by)
         with sentinel_path.open("w", encoding="utf-8") as fp:
             fp.write(config.json())
@@ -210,7 +216,7 @@ def test_clean_relative_subdirectory(notebooks_dir, input_type, organize_by):
         expected_notebook_files = {nb.path for nb in expected_notebooks}
         expected_exports = set(get_expected_exports(expected_to_convert, config))
 
-        all_expected = expected_notebook_files | expected_exports | {sentinel_path}
+        all_expected = expected_notebook_files | expected_exports | {sentinel_path, manifest_path}
         assert set(subdir.glob("**/*")) == all_expected
 
 
@@ -235,3 +241,102 @@ def test_export_no_input_error():
     assert result.exit_code == 2
     assert "Error" in result.stdout
     assert "Missing argument 'INPUT'." in result.stdout
+
+
+@pytest.mark.parametrize("organize_by", ["extension", "notebook"])
+def test_export_jobs(notebooks_dir, organize_by):
+    """Test that exporting with multiple worker processes gives same output as a single process."""
+    flags = list(chain(["-b", organize_by], *(["-f", fmt] for fmt in EXPECTED_FORMATS)))
+
+    serial_dir = notebooks_dir / "serial"
+    parallel_dir = notebooks_dir / "parallel"
+    for subdir in [serial_dir, parallel_dir]:
+        subdir.mkdir()
+        for nb in EXPECTED_NOTEBOOKS:
+            shutil.copy(notebooks_dir / f"{nb}.ipynb", subdir / f"{nb}.ipynb")
+
+    result = CliRunner().invoke(app, ["export", str(serial_dir), "--jobs", "1"] + flags)
+    assert result.exit_code == 0
+    result = CliRunner().invoke(app, ["export", str(parallel_dir), "--jobs", "2"] + flags)
+    assert result.exit_code == 0
+
+    serial_files = {p.relative_to(serial_dir) for p in serial_dir.glob("**/*")}
+    parallel_files = {p.relative_to(parallel_dir) for p in parallel_dir.glob("**/*")}
+    assert serial_files == parallel_files
+
+    expected_config = NbAutoexportConfig(export_formats=EXPECTED_FORMATS, organize_by=organize_by)
+    expected_exports = set(get_expected_exports(find_notebooks(parallel_dir), expected_config))
+    assert expected_exports.issubset(set(parallel_dir.glob("**/*")))
+
+
+def test_export_summary_unchanged_files(notebooks_dir):
+    """Test that the export summary counts files left unchanged by exporting again."""
+    result = CliRunner().invoke(app, ["export", str(notebooks_dir), "-f", "script", "-j", "1"])
+    assert result.exit_code == 0
+    assert "Exported 3 of 3 notebook(s): 3 file(s) written, 0 file(s) unchanged." in result.stdout
+
+    result = CliRunner().invoke(app, ["export", str(notebooks_dir), "-f", "script", "-j", "1"])
+    assert result.exit_code == 0
+    assert "Exported 3 of 3 notebook(s): 0 file(s) written, 3 file(s) unchanged." in result.stdout
+
+
+def test_export_failure_exit_code(notebooks_dir, monkeypatch):
+    """Test that a failed export doesn't stop other notebooks, and results in nonzero exit code."""
+    real_export_notebook = export._export_notebook
+
+    def flaky_export_notebook(notebook_path, *args, **kwargs):
+        if notebook_path.stem == EXPECTED_NOTEBOOKS[1]:
+            raise RuntimeError("the kraken")
+        return real_export_notebook(notebook_path, *args, **kwargs)
+
+    monkeypatch.setattr(export, "_export_notebook", flaky_export_notebook)
+
+    result = CliRunner().invoke(app, ["export", str(notebooks_dir), "--jobs", "1"])
+    assert result.exit_code == 1
+    assert "Failed to export 1 of 3 notebook(s):" in result.stdout
+    assert "RuntimeError: the kraken" in result.stdout
+    assert (notebooks_dir / "script" / f"{EXPECTED_NOTEBOOKS[0]}.py").exists()
+    assert not (notebooks_dir / "script" / f"{EXPECTED_NOTEBOOKS[1]}.py").exists()
+    assert (notebooks_dir / "script" / f"{EXPECTED_NOTEBOOKS[2]}.py").exists()
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_export_recursive(notebooks_dir, jobs):
+    """Test that recursive export exports every configured directory with its own config."""
+    configs = {
+        notebooks_dir
+        / "a": NbAutoexportConfig(export_formats=["script"], organize_by="extension"),
+        notebooks_dir
+        / "a"
+        / "b": NbAutoexportConfig(export_formats=["html"], organize_by="notebook"),
+    }
+    unconfigured_dir = notebooks_dir / "unconfigured"
+    ignored_dir = notebooks_dir / "a" / ".ipynb_checkpoints"
+    for directory in list(configs) + [unconfigured_dir, ignored_dir]:
+        directory.mkdir(parents=True)
+        for nb in EXPECTED_NOTEBOOKS:
+            shutil.copy(notebooks_dir / f"{nb}.ipynb", directory / f"{nb}.ipynb")
+    for directory, config in list(configs.items()) + [(ignored_dir, NbAutoexportConfig())]:
+        with (directory / SAVE_PROGRESS_INDICATOR_FILE).open("w", encoding="utf-8") as fp:
+            fp.write(config.json())
+
+    result = CliRunner().invoke(app, ["export", "--recursive", str(notebooks_dir), "-j", jobs])
+    assert result.exit_code == 0
+
+    for directory, config in configs.items():
+        expected_notebooks = find_notebooks(directory)
+        expected_exports = set(get_expected_exports(expected_notebooks, config))
+        assert expected_exports.issubset(set(directory.glob("**/*")))
+        assert (directory / EXPORT_MANIFEST_FILE).exists()
+
+    # Root directory and unconfigured directory not exported
+    assert {p.name for p in notebooks_dir.iterdir() if p.is_dir()} == {"a", "unconfigured"}
+    assert {p.suffix for p in unconfigured_dir.iterdir()} == {".ipynb"}
+    assert {p.suffix for p in ignored_dir.iterdir()} == {".ipynb", ""}
+    assert not (ignored_dir / "script").exists()
+
+
+def test_export_recursive_no_config_error(notebooks_dir):
+    result = CliRunner().invoke(app, ["export", "--recursive", str(notebooks_dir)])
+    assert result.exit_code == 1
+    assert result.stdout.startswith(f"No {SAVE_PROGRESS_INDICATOR_FILE} config files found")
@@ -1,3 +1,5 @@
+import json
+
 from typer.testing import CliRunner
 
 from nbautoexport.nbautoexport import app
@@ -66,3 +68,37 @@ def test_install_existing_config_with_path(tmp_path):
     assert config == (
         "print('hello world!')" + "\n" + jupyter_config.post_save_hook_initialize_block
     )
+
+
+def test_install_server_extension(tmp_path, monkeypatch):
+    monkeypatch.setenv("JUPYTER_CONFIG_DIR", str(tmp_path))
+
+    # Existing post-save hook is migrated to the server extension
+    config_path = tmp_path / "jupyter_notebook_config.py"
+    assert CliRunner().invoke(app, ["install"]).exit_code == 0
+    with config_path.open("a", encoding="utf-8") as fp:
+        fp.write("print('hello world!')\n")
+
+    result = CliRunner().invoke(app, ["install", "--server-extension"])
+    assert result.exit_code == 0
+    assert "server extension successfully enabled" in result.output
+
+    assert config_path.read_text(encoding="utf-8") == "print('hello world!')\n"
+    extension_config = json.loads(
+        (tmp_path / "jupyter_server_config.d" / "nbautoexport.json").read_text(encoding="utf-8")
+    )
+    assert extension_config == {"ServerApp": {"jpserver_extensions": {"nbautoexport": True}}}
+    assert jupyter_config.is_server_extension_installed()
+
+
+def test_install_server_extension_with_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("JUPYTER_CONFIG_DIR", str(tmp_path / "config"))
+    config_path = tmp_path / "nonstandard_config.py"
+    jupyter_config.install_post_save_hook(config_path)
+
+    result = CliRunner().invoke(
+        app, ["install", "--server-extension", "--jupyter-config", str(config_path)]
+    )
+    assert result.exit_code == 0
+    assert config_path.read_text(encoding="utf-8") == ""
+    assert (tmp_path / "config" / "jupyter_server_config.d" / "nbautoexport.json").exists()
@@ -0,0 +1,31 @@
+from typer.testing import CliRunner
+
+from nbautoexport import watch
+from nbautoexport.nbautoexport import app
+
+
+def test_watch_options(tmp_path, monkeypatch):
+    calls = []
+
+    def recording_watch(*args, **kwargs):
+        calls.append((args, kwargs))
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(watch, "watch", recording_watch)
+
+    result = CliRunner().invoke(
+        app, ["watch", str(tmp_path), "--recursive", "--debounce", "0.5", "-j", "2", "--polling"]
+    )
+    assert result.exit_code == 0
+    assert result.output.endswith("Stopped watching.\n")
+    assert calls == [
+        (
+            (tmp_path,),
+            dict(recursive=True, debounce=0.5, max_workers=2, polling=True, poll_interval=1.0),
+        )
+    ]
+
+
+def test_watch_missing_directory(tmp_path):
+    result = CliRunner().invoke(app, ["watch", str(tmp_path / "missing")])
+    assert result.exit_code != 0
@@ -1,11 +1,21 @@
 import json
+import os
+from pathlib import Path
 import shutil
+import sys
 
+import nbformat
 import pytest
 
+from nbautoexport import export, utils
 from nbautoexport.clean import FORMATS_WITH_IMAGE_DIR, get_extension
 from nbautoexport.export import export_notebook, post_save
-from nbautoexport.sentinel import ExportFormat, NbAutoexportConfig, SAVE_PROGRESS_INDICATOR_FILE
+from nbautoexport.sentinel import (
+    EXPORT_MANIFEST_FILE,
+    ExportFormat,
+    NbAutoexportConfig,
+    SAVE_PROGRESS_INDICATOR_FILE,
+)
 from nbautoexport.utils import JupyterNotebook
 
 
@@ -48,6 +58,27 @@ def test_export_notebook(notebooks_dir, organize_by):
     assert all_expected.issubset(set(notebooks_dir.glob("**/*")))
 
 
+def test_export_notebook_reads_once(notebooks_dir, monkeypatch):
+    """Test that the notebook file is only read once no matter how many formats are exported."""
+    read_paths = []
+    real_read = nbformat.read
+
+    def counting_read(fp, *args, **kwargs):
+        read_paths.append(getattr(fp, "name", fp))
+        return real_read(fp, *args, **kwargs)
+
+    monkeypatch.setattr(export.nbformat, "read", counting_read)
+
+    notebook_path = notebooks_dir / "the_notebook.ipynb"
+    config = NbAutoexportConfig(export_formats=["script", "html", "notebook"])
+    export_notebook(notebook_path, config)
+
+    assert read_paths == [str(notebook_path)]
+    assert (notebooks_dir / "script" / "the_notebook.py").exists()
+    assert (notebooks_dir / "html" / "the_notebook.html").exists()
+    assert (notebooks_dir / "notebook" / "the_notebook.nbconvert.ipynb").exists()
+
+
 def test_post_save_no_sentinel(notebooks_dir):
     """Test that post_save does nothing with no sentinel file."""
     notebook_path = notebooks_dir / "the_notebook.ipynb"
@@ -73,6 +104,7 @@ def test_post_save_organize_by_notebook(notebooks_dir):
     post_save(model={"type": "notebook"}, os_path=str(notebook_path), contents_manager=None)
     assert set(notebooks_dir.iterdir()) == {
         sentinel_path,  # sentinel file
+        notebooks_dir / EXPORT_MANIFEST_FILE,  # export manifest
         notebook_path,  # original ipynb
         notebooks_dir / "the_notebook",  # converted notebook directory
     }
@@ -95,6 +127,7 @@ def test_post_save_organize_by_extension(notebooks_dir):
     post_save(model={"type": "notebook"}, os_path=str(notebook_path), contents_manager=None)
     assert set(notebooks_dir.iterdir()) == {
         sentinel_path,  # sentinel file
+        notebooks_dir / EXPORT_MANIFEST_FILE,  # export manifest
         notebook_path,  # original ipynb
         notebooks_dir / "script",  # converted notebook directory
         notebooks_dir / "html",  # converted notebook directory
@@ -135,3 +168,161 @@ def test_post_save_type_directory(notebooks_dir):
         sentinel_path,  # sentinel file
         notebook_path,  # original ipynb
     }
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_export_notebooks_collects_failures(notebooks_dir, jobs):
+    """Test that export_notebooks reports per-notebook failures without stopping other exports."""
+    notebook_path = notebooks_dir / "the_notebook.ipynb"
+    missing_path = notebooks_dir / "anne_hughes_diary.ipynb"
+    config = NbAutoexportConfig(export_formats=["script"])
+
+    results = export.export_notebooks([missing_path, notebook_path], config, jobs=jobs)
+
+    assert [r.notebook_path for r in results] == [missing_path, notebook_path]
+    assert results[0].failed
+    assert "FileNotFoundError" in results[0].error
+    assert not results[1].failed
+    assert results[1].exported
+    assert (notebooks_dir / "script" / "the_notebook.py").exists()
+
+
+def test_export_notebooks_interrupt(notebooks_dir, monkeypatch):
+    """Test that export_notebooks collects nbconvert's sys.exit as a failure, but doesn't swallow
+    KeyboardInterrupt."""
+    config = NbAutoexportConfig(export_formats=["script"])
+    notebook_path = notebooks_dir / "the_notebook.ipynb"
+
+    def exiting_export(self, notebook, notebook_path, export_format, subfolder):
+        raise SystemExit(1)
+
+    monkeypatch.setattr(export.ExporterRegistry, "export", exiting_export)
+    (result,) = export.export_notebooks([notebook_path], config)
+    assert result.failed
+
+    def interrupted_export(self, notebook, notebook_path, export_format, subfolder):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(export.ExporterRegistry, "export", interrupted_export)
+    with pytest.raises(KeyboardInterrupt):
+        export.export_notebooks([notebook_path], config)
+
+
+@pytest.mark.parametrize("nbconvert_5", [False, True])
+def test_export_notebook_format_suffix(notebooks_dir, monkeypatch, nbconvert_5):
+    """Test that notebook format exports keep the .nbconvert suffix with the default output_base,
+    which is '{notebook_name}' since nbconvert 6 and '' in nbconvert 5."""
+    registry = export.ExporterRegistry()
+    monkeypatch.setattr(export, "_exporter_registry", registry)
+    if nbconvert_5:
+        # In nbconvert 5, the notebook name doesn't depend on output_base unless it is set
+        registry.app.output_base = ""
+        monkeypatch.setattr(
+            registry.app,
+            "_notebook_filename_to_name",
+            lambda notebook_filename: Path(notebook_filename).stem,
+        )
+
+    export_notebook(
+        notebooks_dir / "the_notebook.ipynb", NbAutoexportConfig(export_formats=["notebook"])
+    )
+    assert (notebooks_dir / "notebook" / "the_notebook.nbconvert.ipynb").exists()
+
+
+def test_exporter_registry_reuses_exporters(notebooks_dir, monkeypatch):
+    """Test that exporters are built once per format and reused across exports."""
+    built = []
+    real_get_exporter = export.get_exporter
+
+    def counting_get_exporter(name, *args, **kwargs):
+        built.append(name)
+        return real_get_exporter(name, *args, **kwargs)
+
+    monkeypatch.setattr(export, "get_exporter", counting_get_exporter)
+    registry = export.ExporterRegistry()
+    monkeypatch.setattr(export, "_exporter_registry", registry)
+
+    notebook_path = notebooks_dir / "the_notebook.ipynb"
+    export_notebook(notebook_path, NbAutoexportConfig(export_formats=["script", "html"]))
+    export_notebook(
+        notebook_path,
+        NbAutoexportConfig(export_formats=["script", "html"], organize_by="notebook"),
+    )
+    assert sorted(built) == ["html", "script"]
+    assert (notebooks_dir / "html" / "the_notebook.html").exists()
+    assert (notebooks_dir / "the_notebook" / "the_notebook.html").exists()
+
+    registry.clear()
+    export_notebook(notebook_path, NbAutoexportConfig(export_formats=["script"]))
+    assert sorted(built) == ["html", "script", "script"]
+
+
+def test_export_ignores_sys_argv(notebooks_dir, monkeypatch):
+    """Test that exporting neither reads nor modifies sys.argv."""
+    mocked_argv = ["nbautoexport", "export", "--to", "pdf", "--not-an-nbconvert-flag"]
+    monkeypatch.setattr(sys, "argv", mocked_argv)
+    monkeypatch.setattr(export, "_exporter_registry", export.ExporterRegistry())
+
+    export_notebook(notebooks_dir / "the_notebook.ipynb", NbAutoexportConfig())
+
+    assert sys.argv == mocked_argv
+    assert (notebooks_dir / "script" / "the_notebook.py").exists()
+
+
+@pytest.mark.parametrize("organize_by", ["extension", "notebook"])
+def test_export_writes_directly_to_subfolder(notebooks_dir, organize_by, monkeypatch):
+    """Test that exports and their image assets are only ever written inside the subfolder."""
+    written = []
+    real_atomic_write = utils.atomic_write
+
+    def recording_atomic_write(path, content):
+        written.append(path)
+        return real_atomic_write(path, content)
+
+    monkeypatch.setattr(utils, "atomic_write", recording_atomic_write)
+
+    notebook_path = notebooks_dir / "the_notebook.ipynb"
+    config = NbAutoexportConfig(export_formats=["markdown"], organize_by=organize_by)
+    export_notebook(notebook_path, config)
+
+    subfolder = notebooks_dir / ("markdown" if organize_by == "extension" else "the_notebook")
+    assert set(written) == {
+        subfolder / "the_notebook.md",
+        subfolder / "the_notebook_files" / "the_notebook_1_1.png",
+    }
+    assert set(notebooks_dir.glob("**/*")) == {
+        notebook_path,
+        subfolder,
+        subfolder / "the_notebook_files",
+        *written,
+    }
+
+
+def test_strip_cell_numbers():
+    text = "import os\n\n\n# In[1]:\n\n\nprint('hello')\n\n\n# In[ ]:\n\n\n"
+    assert export.strip_cell_numbers(text) == "import os\n\n\nprint('hello')\n\n\n"
+
+
+def test_export_leaves_unchanged_files(notebooks_dir):
+    """Test that exporting again does not rewrite files whose content is unchanged."""
+    notebook_path = notebooks_dir / "the_notebook.ipynb"
+    config = NbAutoexportConfig(export_formats=["script", "markdown"])
+    export_notebook(notebook_path, config)
+
+    script_path = notebooks_dir / "script" / "the_notebook.py"
+    image_path = notebooks_dir / "markdown" / "the_notebook_files" / "the_notebook_1_1.png"
+    markdown_path = notebooks_dir / "markdown" / "the_notebook.md"
+    old_mtime = 1_000_000_000
+    for path in [script_path, image_path, markdown_path]:
+        os.utime(path, ns=(old_mtime, old_mtime))
+    markdown_path.write_text("Stale export", encoding="utf-8")
+    os.utime(markdown_path, ns=(old_mtime, old_mtime))
+
+    results = export.export_notebooks([notebook_path], config)
+    assert results[0].written == 1
+    assert results[0].unchanged == 2
+
+    assert script_path.stat().st_mtime_ns == old_mtime
+    assert image_path.stat().st_mtime_ns == old_mtime
+    assert markdown_path.stat().st_mtime_ns != old_mtime
+    assert markdown_path.read_text(encoding="utf-8") != "Stale export"
@@ -0,0 +1,169 @@
+import asyncio
+import shutil
+
+from jupyter_server.serverapp import ServerApp
+from jupyter_server.services.contents.filemanager import FileContentsManager
+import pytest
+from tornado.httputil import HTTPServerRequest
+from traitlets import TraitError
+from traitlets.config import Config
+
+import nbautoexport
+from nbautoexport import export
+from nbautoexport.background import get_background_exporter
+from nbautoexport.extension import ExportService, NbAutoexportExtension
+from nbautoexport.handlers import MetricsHandler
+from nbautoexport.sentinel import ExportFormat, NbAutoexportConfig, SAVE_PROGRESS_INDICATOR_FILE
+from nbautoexport.worker import get_export_worker
+
+
+@pytest.fixture()
+def notebooks_dir(tmp_path, notebook_asset):
+    notebooks_dir = tmp_path / "notebooks"
+    notebooks_dir.mkdir()
+    shutil.copy(notebook_asset.path, notebooks_dir / "the_notebook.ipynb")
+    config = NbAutoexportConfig(export_formats=["script"])
+    (notebooks_dir / SAVE_PROGRESS_INDICATOR_FILE).write_text(config.json(), encoding="utf-8")
+    return notebooks_dir
+
+
+@pytest.fixture()
+def jupyter_dirs(tmp_path, monkeypatch):
+    for name in ["CONFIG", "DATA", "RUNTIME"]:
+        monkeypatch.setenv(f"JUPYTER_{name}_DIR", str(tmp_path / name.lower()))
+
+
+def make_server_app(notebooks_dir, **extension_config) -> ServerApp:
+    config = Config()
+    config.ServerApp.jpserver_extensions = {"nbautoexport": True}
+    config.ServerApp.root_dir = str(notebooks_dir)
+    for key, value in extension_config.items():
+        setattr(config.NbAutoexportExtension, key, value)
+    server_app = ServerApp(config=config)
+    server_app.initialize(argv=[], find_extensions=False, new_httpserver=False)
+    return server_app
+
+
+async def save_notebook(server_app: ServerApp):
+    contents_manager = server_app.contents_manager
+    model = await contents_manager.get("the_notebook.ipynb")
+    await contents_manager.save(model, "the_notebook.ipynb")
+
+
+def metrics_handler_class(server_app: ServerApp):
+    request = HTTPServerRequest(method="GET", uri="/nbautoexport/metrics")
+    request.host_name = "localhost"
+    return server_app.web_app.find_handler(request).handler_class
+
+
+def test_extension_points():
+    (point,) = nbautoexport._jupyter_server_extension_points()
+    assert point["module"] == "nbautoexport.extension"
+    assert point["app"] is NbAutoexportExtension
+
+
+def test_server_extension(notebooks_dir, jupyter_dirs):
+    server_app = make_server_app(notebooks_dir)
+    (extension,) = server_app.extension_manager.extension_apps["nbautoexport"]
+    assert isinstance(extension.service, ExportService)
+    assert server_app.contents_manager.nbautoexport_service is extension.service
+
+    async def run():
+        await save_notebook(server_app)
+        await server_app.cleanup_extensions()
+
+    asyncio.run(run())
+    assert (notebooks_dir / "script" / "the_notebook.py").exists()
+    assert metrics_handler_class(server_app) is MetricsHandler
+
+
+def test_server_extension_background(notebooks_dir, jupyter_dirs):
+    server_app = make_server_app(
+        notebooks_dir, background=True, max_workers=2, debounce=0.5, serve_metrics=False
+    )
+    background_exporter = get_background_exporter()
+    assert background_exporter.max_workers == 2
+    assert background_exporter.debounce == 0.5
+
+    async def run():
+        await save_notebook(server_app)
+        # Export is still debouncing, and is run when the extension stops
+        assert not (notebooks_dir / "script").exists()
+        await server_app.cleanup_extensions()
+
+    asyncio.run(run())
+    assert get_background_exporter() is None
+    assert (notebooks_dir / "script" / "the_notebook.py").exists()
+    assert metrics_handler_class(server_app) is not MetricsHandler
+
+
+def test_server_extension_worker(notebooks_dir, jupyter_dirs):
+    server_app = make_server_app(notebooks_dir, worker=True, warm_formats=["script"])
+    (extension,) = server_app.extension_manager.extension_apps["nbautoexport"]
+    export_worker = get_export_worker()
+    assert extension.service.export_worker is export_worker
+    assert export_worker.warm_formats == [ExportFormat.script]
+    # Saving doesn't wait for the worker
+    assert get_background_exporter() is extension.service.background_exporter is not None
+
+    async def run():
+        await save_notebook(server_app)
+        await server_app.cleanup_extensions()
+
+    asyncio.run(run())
+    assert get_export_worker() is None
+    assert get_background_exporter() is None
+    assert export_worker.pid is None
+    assert (notebooks_dir / "script" / "the_notebook.py").exists()
+
+
+def test_extension_config_validation():
+    with pytest.raises(TraitError):
+        NbAutoexportExtension(warm_formats=["script", "docx"])
+    with pytest.raises(TraitError):
+        NbAutoexportExtension(max_workers=0)
+
+
+def test_service_warm_exporters(monkeypatch):
+    built = []
+    monkeypatch.setattr(
+        export.ExporterRegistry, "get", lambda self, export_format: built.append(export_format)
+    )
+    service = ExportService(warm_formats=["script", "html"])
+    service.start()
+    service._warm_thread.join(timeout=10)
+    assert built == [ExportFormat.script, ExportFormat.html]
+    service.stop()
+
+
+def test_legacy_hook_defers_to_extension(notebooks_dir, monkeypatch):
+    """A post-save hook installed in the Jupyter config file does not export a second time."""
+    saves = []
+    original_post_save = export._post_save
+
+    def recording_post_save(model, os_path):
+        saves.append(os_path)
+        original_post_save(model, os_path)
+
+    monkeypatch.setattr(export, "_post_save", recording_post_save)
+    contents_manager = FileContentsManager(root_dir=str(notebooks_dir))
+    contents_manager.post_save_hook = nbautoexport.post_save
+    ExportService().register(contents_manager)
+
+    model = contents_manager.get("the_notebook.ipynb")
+    contents_manager.save(model, "the_notebook.ipynb")
+
+    assert saves == [str(notebooks_dir / "the_notebook.ipynb")]
+    assert (notebooks_dir / "script" / "the_notebook.py").exists()
+
+
+def test_legacy_hook_without_extension(notebooks_dir, monkeypatch):
+    handled = []
+    monkeypatch.setattr(export, "handle_save", lambda model, os_path: handled.append(os_path))
+    contents_manager = FileContentsManager(root_dir=str(notebooks_dir))
+    export.post_save(model={"type": "notebook"}, os_path="a.ipynb", contents_manager=None)
+    ExportService().register(contents_manager)
+    export.post_save(
+        model={"type": "notebook"}, os_path="b.ipynb", contents_manager=contents_manager
+    )
+    assert handled == ["a.ipynb"]
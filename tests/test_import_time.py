@@ -0,0 +1,77 @@
+"""Regression tests for CLI startup time. Each test runs in a fresh interpreter, since modules
+imported by other tests are already loaded in the test process."""
+
+import json
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+# Slow to import, and not needed by the CLI's fast path
+HEAVY_MODULES = ["nbconvert", "nbformat", "jupyter_server", "jsonschema", "notebook", "pydantic"]
+
+# Budget for importing the CLI module, in seconds. Importing nbconvert alone takes longer than
+# this.
+IMPORT_TIME_BUDGET = 1.0
+
+
+def run_python(code: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args, "-c", textwrap.dedent(code)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Parse `python -X importtime` output into cumulative import times in seconds, by module."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, module = line[len("import time:") :].split("|")
+        if cumulative_us.strip().isdigit():
+            cumulative[module.strip()] = int(cumulative_us) / 1e6
+    return cumulative
+
+
+def test_cli_import_time():
+    result = run_python("import nbautoexport.nbautoexport", "-X", "importtime")
+    import_times = parse_importtime(result.stderr)
+
+    loaded = [module for module in HEAVY_MODULES if module in import_times]
+    assert loaded == []
+    assert import_times["nbautoexport.nbautoexport"] < IMPORT_TIME_BUDGET
+
+
+@pytest.mark.parametrize(
+    "args, allowed_modules",
+    [
+        (["--version"], []),
+        # Writing a configuration file validates it with pydantic
+        (["configure", "{tmp_path}"], ["pydantic"]),
+        (["install", "--jupyter-config", "{config}"], []),
+    ],
+)
+def test_fast_commands_skip_heavy_imports(tmp_path, args, allowed_modules):
+    args = [
+        arg.format(tmp_path=tmp_path, config=tmp_path / "jupyter_notebook_config.py")
+        for arg in args
+    ]
+    result = run_python(f"""
+        import json
+        import sys
+
+        from typer.testing import CliRunner
+
+        from nbautoexport.nbautoexport import app
+
+        result = CliRunner().invoke(app, {args!r})
+        heavy_modules = {HEAVY_MODULES!r}
+        print(json.dumps([result.exit_code, [m for m in heavy_modules if m in sys.modules]]))
+        """)
+    exit_code, loaded = json.loads(result.stdout.splitlines()[-1])
+    assert exit_code == 0
+    assert [module for module in loaded if module not in allowed_modules] == []
@@ -214,6 +214,15 @@ def test_initialize_post_save_binding():
     assert jupyter_config_obj.FileContentsManager.post_save_hook is export.post_save
 
 
+def test_initialize_leaves_server_extensions():
+    """Test that the post-save hook doesn't enable server extensions. Metrics are served by the
+    nbautoexport server extension only."""
+    jupyter_config_obj = Config(FileContentsManager=FileContentsManager())
+    jupyter_config_obj.ServerApp.jpserver_extensions = {"other_extension": True}
+    jupyter_config.initialize_post_save_hook(jupyter_config_obj)
+    assert jupyter_config_obj.ServerApp.jpserver_extensions == {"other_extension": True}
+
+
 def test_initialize_post_save_execution(monkeypatch, caplog):
     """Test that post_save initialization works as expected and bound post_save executes."""
     caplog.set_level(logging.DEBUG)
@@ -344,3 +353,33 @@ def test_initialize_post_save_double_import_error_caught(monkeypatch, caplog, ca
     captured = capsys.readouterr()
     assert "ModuleNotFoundError: No module named 'jupyter_core.application'" in captured.err
     assert "ModuleNotFoundError: No module named 'nbautoexport'" in captured.err
+
+
+def test_uninstall_hook(tmp_path):
+    config_path = tmp_path / "jupyter_notebook_config.py"
+    assert not jupyter_config.uninstall_post_save_hook(config_path)
+
+    config_path.write_text("print('hello world!')\n", encoding="utf-8")
+    assert not jupyter_config.uninstall_post_save_hook(config_path)
+
+    jupyter_config.install_post_save_hook(config_path)
+    with config_path.open("a", encoding="utf-8") as fp:
+        fp.write("print('good night world!')\n")
+    assert jupyter_config.uninstall_post_save_hook(config_path)
+    assert config_path.read_text(encoding="utf-8") == (
+        "print('hello world!')\n\nprint('good night world!')\n"
+    )
+
+
+def test_is_server_extension_installed(tmp_path):
+    assert not jupyter_config.is_server_extension_installed(tmp_path)
+    config_path = jupyter_config.install_server_extension(
+        config_dir=tmp_path, hook_config_path=tmp_path / "jupyter_notebook_config.py"
+    )
+    assert config_path == tmp_path / "jupyter_server_config.d" / "nbautoexport.json"
+    assert jupyter_config.is_server_extension_installed(tmp_path)
+
+    config_path.write_text('{"ServerApp": {"jpserver_extensions": {"nbautoexport": false}}}')
+    assert not jupyter_config.is_server_extension_installed(tmp_path)
+    config_path.write_text("not json")
+    assert not jupyter_config.is_server_extension_installed(tmp_path)
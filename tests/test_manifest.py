@@ -0,0 +1,128 @@
+import shutil
+
+import nbformat
+import pytest
+
+from nbautoexport.export import export_notebook, export_notebooks, read_notebook
+from nbautoexport.manifest import (
+    hash_config,
+    hash_notebook,
+    is_export_current,
+    load_manifest,
+)
+from nbautoexport.sentinel import (
+    EXPORT_MANIFEST_FILE,
+    NbAutoexportConfig,
+    SAVE_PROGRESS_INDICATOR_FILE,
+)
+from nbautoexport.utils import find_notebooks, ValidationMode
+
+
+@pytest.fixture()
+def notebook_path(tmp_path, notebook_asset):
+    nb_path = tmp_path / "the_notebook.ipynb"
+    shutil.copy(notebook_asset.path, nb_path)
+    return nb_path
+
+
+def test_hash_notebook(notebook_path):
+    notebook = read_notebook(notebook_path)
+    assert hash_notebook(notebook) == hash_notebook(read_notebook(notebook_path))
+
+    notebook.cells[0].source += "\n# edited"
+    assert hash_notebook(notebook) != hash_notebook(read_notebook(notebook_path))
+
+
+def test_hash_config():
+    config = NbAutoexportConfig(export_formats=["script"], organize_by="extension")
+    assert hash_config(config) == hash_config(config.copy())
+    assert hash_config(config) != hash_config(NbAutoexportConfig(export_formats=["html"]))
+    assert hash_config(config) != hash_config(
+        NbAutoexportConfig(export_formats=["script"], organize_by="notebook")
+    )
+    # Clean settings don't affect exports
+    assert hash_config(config) == hash_config(
+        NbAutoexportConfig(export_formats=["script"], clean={"exclude": ["README.md"]})
+    )
+
+
+def test_export_skips_unchanged(notebook_path):
+    config = NbAutoexportConfig(export_formats=["script"])
+    script_path = notebook_path.parent / "script" / "the_notebook.py"
+
+    assert export_notebook(notebook_path, config, use_manifest=True)
+    assert (notebook_path.parent / EXPORT_MANIFEST_FILE).exists()
+    assert load_manifest(notebook_path.parent).notebooks["the_notebook.ipynb"].exports == [
+        "script/the_notebook.py"
+    ]
+    assert script_path.exists()
+
+    # Unchanged
+    assert not export_notebook(notebook_path, config, use_manifest=True)
+    assert export_notebook(notebook_path, config, use_manifest=True, force=True)
+
+    # Export deleted
+    script_path.unlink()
+    assert export_notebook(notebook_path, config, use_manifest=True)
+    assert script_path.exists()
+
+    # Config changed
+    html_config = NbAutoexportConfig(export_formats=["script", "html"])
+    assert export_notebook(notebook_path, html_config, use_manifest=True)
+    assert not export_notebook(notebook_path, html_config, use_manifest=True)
+
+    # Notebook changed
+    notebook = nbformat.read(str(notebook_path), as_version=nbformat.NO_CONVERT)
+    notebook.cells[0].source += "\n# edited"
+    nbformat.write(notebook, str(notebook_path))
+    assert export_notebook(notebook_path, html_config, use_manifest=True)
+
+
+def test_is_export_current_unreadable_manifest(notebook_path):
+    config = NbAutoexportConfig(export_formats=["script"])
+    notebook_hash = hash_notebook(read_notebook(notebook_path))
+    export_notebook(notebook_path, config, use_manifest=True)
+    assert is_export_current(notebook_path, notebook_hash, hash_config(config))
+
+    (notebook_path.parent / EXPORT_MANIFEST_FILE).write_text("not json", encoding="utf-8")
+    assert not is_export_current(notebook_path, notebook_hash, hash_config(config))
+
+
+def test_export_notebooks_records_manifest(notebook_path):
+    """Test that parallel exports record every notebook in the manifest."""
+    other_path = notebook_path.parent / "other_notebook.ipynb"
+    shutil.copy(notebook_path, other_path)
+    config = NbAutoexportConfig(export_formats=["script"])
+
+    results = export_notebooks([notebook_path, other_path], config, jobs=2, use_manifest=True)
+    assert all(result.exported for result in results)
+    manifest = load_manifest(notebook_path.parent)
+    assert set(manifest.notebooks) == {"the_notebook.ipynb", "other_notebook.ipynb"}
+
+    results = export_notebooks([notebook_path, other_path], config, jobs=2, use_manifest=True)
+    assert not any(result.exported for result in results)
+
+
+def test_find_notebooks_records_validation(notebook_path):
+    """Test that validated notebooks are recorded in the manifest of configured directories only,
+    and that records of deleted notebooks are dropped."""
+    directory = notebook_path.parent
+    find_notebooks(directory)
+    assert not (directory / EXPORT_MANIFEST_FILE).exists()
+
+    (directory / SAVE_PROGRESS_INDICATOR_FILE).write_text(
+        NbAutoexportConfig().json(), encoding="utf-8"
+    )
+    other_path = directory / "other_notebook.ipynb"
+    shutil.copy(notebook_path, other_path)
+    (notebook,) = [nb for nb in find_notebooks(directory) if nb.path == notebook_path]
+    validated = load_manifest(directory).validated
+    assert set(validated) == {"the_notebook.ipynb", "other_notebook.ipynb"}
+    record = validated["the_notebook.ipynb"]
+    assert record.validation == ValidationMode.fast
+    assert record.size == notebook_path.stat().st_size
+    assert record.notebook["metadata"] == notebook.metadata
+
+    other_path.unlink()
+    find_notebooks(directory)
+    assert set(load_manifest(directory).validated) == {"the_notebook.ipynb"}
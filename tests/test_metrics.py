@@ -0,0 +1,177 @@
+import pickle
+import shutil
+import threading
+from unittest import mock
+
+import pytest
+from tornado import web
+from tornado.httputil import HTTPServerRequest
+
+from nbautoexport import export, handlers, metrics
+from nbautoexport.background import BackgroundExporter
+from nbautoexport.export import export_notebook, export_notebooks
+from nbautoexport.sentinel import NbAutoexportConfig
+
+
+@pytest.fixture()
+def export_metrics():
+    yield metrics.reset_export_metrics()
+    metrics.reset_export_metrics()
+
+
+@pytest.fixture()
+def notebook_path(tmp_path, notebook_asset):
+    path = tmp_path / "the_notebook.ipynb"
+    shutil.copy(notebook_asset.path, path)
+    return path
+
+
+def test_metric_abstract():
+    with pytest.raises(TypeError):
+        metrics.Metric("things_total", "Things.")
+
+
+def test_counter():
+    counter = metrics.Counter("things_total", "Things.", ["kind"])
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    counter.inc(kind='b"c')
+    assert counter.get(kind="a") == 3
+    assert counter.get(kind="d") == 0
+    assert counter.render() == [
+        "# HELP things_total Things.",
+        "# TYPE things_total counter",
+        'things_total{kind="a"} 3',
+        'things_total{kind="b\\"c"} 1',
+    ]
+    with pytest.raises(ValueError):
+        counter.inc(other="a")
+
+
+def test_histogram():
+    histogram = metrics.Histogram("duration_seconds", "Durations.", buckets=[0.1, 1])
+    for value in [0.05, 0.5, 0.5, 5]:
+        histogram.observe(value)
+    assert histogram.get_count() == 4
+    assert histogram.render()[2:] == [
+        'duration_seconds_bucket{le="0.1"} 1',
+        'duration_seconds_bucket{le="1"} 3',
+        'duration_seconds_bucket{le="+Inf"} 4',
+        "duration_seconds_sum 6.05",
+        "duration_seconds_count 4",
+    ]
+
+
+def test_merge_snapshot():
+    worker_metrics = metrics.ExportMetrics()
+    worker_metrics.exports.inc(format="html")
+    worker_metrics.export_duration.observe(0.2, format="html")
+    worker_metrics.notebooks_exported.inc()
+
+    export_metrics = metrics.ExportMetrics()
+    export_metrics.exports.inc(format="html")
+    export_metrics.export_duration.observe(2, format="html")
+    export_metrics.merge(pickle.loads(pickle.dumps(worker_metrics.snapshot())))
+
+    assert export_metrics.exports.get(format="html") == 2
+    assert export_metrics.export_duration.get_count(format="html") == 2
+    assert export_metrics.notebooks_exported.get() == 1
+    assert 'nbautoexport_export_duration_seconds_bucket{format="html",le="0.25"} 1' in (
+        export_metrics.render()
+    )
+    assert 'nbautoexport_export_duration_seconds_sum{format="html"} 2.2' in (
+        export_metrics.render()
+    )
+
+
+def test_counter_threads():
+    counter = metrics.Counter("things_total", "Things.")
+
+    def increment():
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.get() == 4000
+
+
+def test_export_metrics(notebook_path, export_metrics):
+    config = NbAutoexportConfig(export_formats=["script", "html"])
+    assert export_notebook(notebook_path, config=config, use_manifest=True)
+    assert not export_notebook(notebook_path, config=config, use_manifest=True)
+
+    assert export_metrics.exports.get(format="script") == 1
+    assert export_metrics.exports.get(format="html") == 1
+    assert export_metrics.export_duration.get_count(format="html") == 1
+    assert export_metrics.notebooks_exported.get() == 1
+    assert export_metrics.notebooks_skipped.get() == 1
+    assert export_metrics.notebook_duration.get_count() == 1
+    assert export_metrics.notebook_failures.get() == 0
+
+    text = metrics.get_export_metrics().render()
+    assert 'nbautoexport_exports_total{format="html"} 1\n' in text
+    assert "nbautoexport_notebooks_skipped_unchanged_total 1\n" in text
+    assert "nbautoexport_background_queue_depth 0\n" in text
+
+
+def test_export_failure_metrics(notebook_path, export_metrics, monkeypatch):
+    def failing_export(self, notebook, notebook_path, export_format, subfolder):
+        raise SystemExit(1)
+
+    monkeypatch.setattr(export.ExporterRegistry, "export", failing_export)
+    config = NbAutoexportConfig(export_formats=["script"])
+    (result,) = export_notebooks([notebook_path], config=config)
+
+    assert result.failed
+    assert export_metrics.export_failures.get(format="script") == 1
+    assert export_metrics.exports.get(format="script") == 0
+    assert export_metrics.notebook_failures.get() == 1
+    assert export_metrics.notebooks_exported.get() == 0
+
+
+def test_queue_depth(tmp_path):
+    release = threading.Event()
+    background_exporter = BackgroundExporter(max_workers=1)
+    try:
+        futures = [
+            background_exporter.submit(tmp_path / f"{name}.ipynb", release.wait)
+            for name in ["a", "b"]
+        ]
+        assert background_exporter.queue_depth == 2
+        release.set()
+        for future in futures:
+            future.result(timeout=10)
+        assert background_exporter.queue_depth == 0
+    finally:
+        release.set()
+        background_exporter.shutdown()
+
+
+def make_handler(web_app):
+    request = HTTPServerRequest(
+        method="GET", uri=f"/{handlers.METRICS_PATH}", connection=mock.Mock()
+    )
+    return handlers.MetricsHandler(web_app, request)
+
+
+def test_metrics_handler(export_metrics):
+    export_metrics.notebooks_exported.inc()
+    handler = make_handler(web.Application(authenticate_prometheus=False))
+    handler.get()
+
+    assert handler._headers["Content-Type"] == metrics.PROMETHEUS_CONTENT_TYPE
+    body = b"".join(handler._write_buffer).decode()
+    assert body == export_metrics.render()
+    assert "nbautoexport_notebooks_exported_total 1\n" in body
+
+
+def test_metrics_handler_requires_login(monkeypatch):
+    monkeypatch.setattr(handlers.MetricsHandler, "logged_in", False)
+    handler = make_handler(web.Application())
+    with pytest.raises(web.HTTPError) as exc_info:
+        handler.get()
+    assert exc_info.value.status_code == 403
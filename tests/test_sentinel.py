@@ -1,7 +1,14 @@
 from nbconvert.exporters import get_export_names
+import pytest
 
 from nbautoexport.clean import get_extension
-from nbautoexport.sentinel import ExportFormat
+from nbautoexport.sentinel import (
+    ExportFormat,
+    find_sentinel_files,
+    NbAutoexportConfig,
+    read_sentinel,
+    SAVE_PROGRESS_INDICATOR_FILE,
+)
 
 
 def test_export_format_compatibility():
@@ -24,3 +31,55 @@ def test_export_format_has_value():
         assert ExportFormat.has_value(level.value)
 
     assert not ExportFormat.has_value("paper")
+
+
+def test_find_sentinel_files(tmp_path):
+    configured = [tmp_path, tmp_path / "a", tmp_path / "a" / "b", tmp_path / "c"]
+    ignored = [tmp_path / ".git", tmp_path / "a" / ".ipynb_checkpoints"]
+    for directory in configured + ignored:
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / SAVE_PROGRESS_INDICATOR_FILE).write_text(
+            NbAutoexportConfig().json(), encoding="utf-8"
+        )
+    (tmp_path / "unconfigured").mkdir()
+
+    assert find_sentinel_files(tmp_path) == [
+        directory / SAVE_PROGRESS_INDICATOR_FILE for directory in configured
+    ]
+
+
+def test_read_sentinel_cache(tmp_path, monkeypatch):
+    """Test that configuration files are only reparsed when they change."""
+    sentinel_path = tmp_path / SAVE_PROGRESS_INDICATOR_FILE
+    config = NbAutoexportConfig(export_formats=["script"])
+    sentinel_path.write_text(config.json(), encoding="utf-8")
+
+    parsed = []
+    real_parse_file = NbAutoexportConfig.parse_file
+
+    def counting_parse_file(*args, **kwargs):
+        parsed.append(kwargs["path"])
+        return real_parse_file(*args, **kwargs)
+
+    monkeypatch.setattr(NbAutoexportConfig, "parse_file", counting_parse_file)
+
+    assert read_sentinel(sentinel_path) == config
+    assert read_sentinel(sentinel_path) == config
+    assert parsed == [sentinel_path]
+
+    # Returned configs are copies that can be modified without affecting the cache
+    read_sentinel(sentinel_path).export_formats.append(ExportFormat.html)
+    read_sentinel(sentinel_path).clean.exclude.append("README.md")
+    assert read_sentinel(sentinel_path) == config
+    assert parsed == [sentinel_path]
+
+    # Editing the file invalidates the cache
+    new_config = NbAutoexportConfig(export_formats=["script", "html"], organize_by="notebook")
+    sentinel_path.write_text(new_config.json(), encoding="utf-8")
+    assert read_sentinel(sentinel_path) == new_config
+    assert parsed == [sentinel_path, sentinel_path]
+
+
+def test_read_sentinel_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_sentinel(tmp_path / SAVE_PROGRESS_INDICATOR_FILE)
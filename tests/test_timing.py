@@ -0,0 +1,144 @@
+import json
+import logging
+import shutil
+
+import pytest
+
+from nbautoexport import timing
+from nbautoexport.export import export_notebook, post_save
+from nbautoexport.sentinel import NbAutoexportConfig, SAVE_PROGRESS_INDICATOR_FILE
+
+
+@pytest.fixture()
+def timing_level():
+    original = timing.get_timing_level()
+    yield
+    timing.set_timing_level(original)
+
+
+@pytest.fixture()
+def notebooks_dir(tmp_path, notebook_asset):
+    shutil.copy(notebook_asset.path, tmp_path / "the_notebook.ipynb")
+    config = NbAutoexportConfig(export_formats=["script", "html"])
+    (tmp_path / SAVE_PROGRESS_INDICATOR_FILE).write_text(config.json(), encoding="utf-8")
+    return tmp_path
+
+
+def timing_records(caplog):
+    return [
+        getattr(record, timing.TIMING_RECORD_ATTRIBUTE)
+        for record in caplog.records
+        if hasattr(record, timing.TIMING_RECORD_ATTRIBUTE)
+    ]
+
+
+@pytest.mark.parametrize(
+    "level, expected",
+    [
+        (None, None),
+        ("off", None),
+        ("None", None),
+        (logging.INFO, logging.INFO),
+        ("info", logging.INFO),
+        ("DEBUG", logging.DEBUG),
+        ("15", 15),
+    ],
+)
+def test_parse_timing_level(level, expected):
+    assert timing.parse_timing_level(level) == expected
+
+
+def test_parse_timing_level_invalid():
+    with pytest.raises(ValueError):
+        timing.parse_timing_level("loud")
+
+
+def test_timing_span(caplog, timing_level):
+    caplog.set_level(logging.DEBUG, logger="nbautoexport")
+    timing.set_timing_level("info")
+
+    with timing.timing_span("outer", notebook="a.ipynb"):
+        with timing.timing_span("inner", format="html"):
+            pass
+    with pytest.raises(RuntimeError):
+        with timing.timing_span("failing"):
+            raise RuntimeError
+
+    inner, outer, failing = timing_records(caplog)
+    assert inner["span"] == "inner"
+    assert inner["parent"] == "outer"
+    assert inner["format"] == "html"
+    assert outer["span"] == "outer"
+    assert "parent" not in outer
+    assert outer["notebook"] == "a.ipynb"
+    assert outer["duration_ms"] >= inner["duration_ms"] >= 0
+    assert failing["error"] == "RuntimeError"
+    assert "parent" not in failing
+
+    assert all(record.levelno == logging.INFO for record in caplog.records)
+    message = caplog.records[0].getMessage()
+    assert message.startswith("nbautoexport | timing ")
+    assert json.loads(message[len("nbautoexport | timing ") :]) == inner
+
+
+def test_timing_span_disabled(caplog, timing_level):
+    caplog.set_level(logging.INFO, logger="nbautoexport")
+
+    # Logger not enabled for timing level
+    timing.set_timing_level(logging.DEBUG)
+    assert not isinstance(timing.timing_span("stage"), timing.TimingSpan)
+
+    # Timing disabled
+    caplog.set_level(logging.DEBUG, logger="nbautoexport")
+    timing.set_timing_level(None)
+    with timing.timing_span("stage"):
+        pass
+    assert not isinstance(timing.timing_span("stage"), timing.TimingSpan)
+    assert timing_records(caplog) == []
+
+
+def test_post_save_timing(notebooks_dir, caplog, timing_level):
+    caplog.set_level(logging.DEBUG, logger="nbautoexport")
+    timing.set_timing_level(logging.DEBUG)
+
+    notebook_path = notebooks_dir / "the_notebook.ipynb"
+    post_save(model={"type": "notebook"}, os_path=str(notebook_path), contents_manager=None)
+
+    records = timing_records(caplog)
+    spans = [(record["span"], record.get("parent"), record.get("format")) for record in records]
+    assert spans == [
+        ("read_sentinel", "post_save", None),
+        ("read_notebook", "export_notebook", None),
+        ("check_manifest", "export_notebook", None),
+        ("render", "export_format", "script"),
+        ("write_export", "export_format", "script"),
+        ("export_format", "export_notebook", "script"),
+        ("render", "export_format", "html"),
+        ("write_export", "export_format", "html"),
+        ("export_format", "export_notebook", "html"),
+        ("record_manifest", "export_notebook", None),
+        ("export_notebook", "post_save", None),
+        ("post_save", None, None),
+    ]
+    assert all(
+        str(record["notebook"]) == str(notebook_path) for record in records if "notebook" in record
+    )
+
+
+def test_export_config_not_serialized_without_debug(notebooks_dir, caplog, monkeypatch):
+    """The export configuration is only serialized for the debug log if it will be logged."""
+    caplog.set_level(logging.INFO, logger="nbautoexport")
+    serialized = []
+
+    def recording_json(self, *args, **kwargs):
+        serialized.append(kwargs)
+        return "{}"
+
+    monkeypatch.setattr(NbAutoexportConfig, "json", recording_json)
+    config = NbAutoexportConfig(export_formats=["script"])
+    assert export_notebook(notebooks_dir / "the_notebook.ipynb", config=config)
+    assert serialized == []
+
+    caplog.set_level(logging.DEBUG, logger="nbautoexport")
+    assert export_notebook(notebooks_dir / "the_notebook.ipynb", config=config)
+    assert serialized == [{"indent": 2}]
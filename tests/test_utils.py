@@ -1,18 +1,30 @@
 import json
+import os
 import logging
 from pathlib import Path
 import shutil
 import sys
 
+import nbconvert.exporters
+import nbformat
 import pytest
 
+from nbautoexport import utils
 from nbautoexport.sentinel import NbAutoexportConfig, SAVE_PROGRESS_INDICATOR_FILE
 from nbautoexport.utils import (
+    atomic_write,
     JupyterNotebook,
     cleared_argv,
+    find_notebook_descriptors,
     find_notebooks,
     get_logger,
+    load_notebook_metadata,
+    looks_like_notebook,
+    NotebookDescriptor,
+    read_notebook_metadata,
+    ValidationMode,
     working_directory,
+    write_if_changed,
 )
 
 
@@ -55,6 +67,59 @@ def test_get_script_extensions(notebook_asset, monkeypatch):
     assert notebook_asset.get_script_extension() == ".txt"
 
 
+@pytest.fixture()
+def cleared_exporter_cache():
+    utils.clear_exporter_cache()
+    yield
+    utils.clear_exporter_cache()
+
+
+def test_exporter_lookups_cached(notebook_asset, monkeypatch, tmp_path, cleared_exporter_cache):
+    """Test that exporters are looked up once until the exporter registry changes."""
+    lookups = []
+    real_get_exporter = nbconvert.exporters.get_exporter
+
+    def counting_get_exporter(name, *args, **kwargs):
+        lookups.append(name)
+        return real_get_exporter(name, *args, **kwargs)
+
+    monkeypatch.setattr(nbconvert.exporters, "get_exporter", counting_get_exporter)
+    monkeypatch.setattr(nbconvert.exporters, "get_export_names", lambda: ["html", "python"])
+
+    utils.refresh_exporter_cache()
+    for _ in range(3):
+        assert utils.exporter_extension("html") == ".html"
+        assert utils.export_names() == ["html", "python"]
+        assert notebook_asset.get_script_extension() == ".py"
+        assert utils.script_extension(None, "python", None) == ".py"
+        assert utils.script_extension(None, "mongoose", ".mon") == ".mon"
+    assert lookups == ["html", "python"]
+
+    # Lookups don't fingerprint the exporter registry
+    def fail():
+        raise AssertionError("Exporter registry fingerprinted on lookup")
+
+    with monkeypatch.context() as m:
+        m.setattr(utils, "_exporter_registry_token", fail)
+        assert utils.script_extension(None, "python", None) == ".py"
+
+    # Installing packages modifies the import path, which invalidates the cache when it is next
+    # refreshed, at the start of a scan for notebooks
+    monkeypatch.syspath_prepend(str(tmp_path))
+    assert utils.exporter_extension("html") == ".html"
+    assert lookups == ["html", "python"]
+    utils.find_notebooks(tmp_path)
+    assert utils.exporter_extension("html") == ".html"
+    assert lookups == ["html", "python", "html"]
+    utils.refresh_exporter_cache()
+    assert utils.exporter_extension("html") == ".html"
+    assert lookups == ["html", "python", "html"]
+
+    utils.clear_exporter_cache()
+    assert utils.exporter_extension("html") == ".html"
+    assert lookups == ["html", "python", "html", "html"]
+
+
 def test_find_notebooks(tmp_path, notebook_asset):
     shutil.copy(notebook_asset.path, tmp_path / "the_notebook_0.ipynb")
     shutil.copy(notebook_asset.path, tmp_path / "the_notebook_1.ipynb")
@@ -81,6 +146,39 @@ def test_find_notebooks(tmp_path, notebook_asset):
     assert set(found_notebooks) == set(expected_notebooks)
 
 
+def test_find_notebook_descriptors(tmp_path, notebook_asset):
+    shutil.copy(notebook_asset.path, tmp_path / "the_notebook_0.ipynb")
+    shutil.copy(notebook_asset.path, tmp_path / "the_notebook_1.ipynb")
+    (tmp_path / "the_journal.txt").touch()
+
+    descriptors = find_notebook_descriptors(tmp_path)
+    assert {d.path for d in descriptors} == {nb.path for nb in find_notebooks(tmp_path)}
+
+    descriptor = next(d for d in descriptors if d.name == "the_notebook_0")
+    stat = (tmp_path / "the_notebook_0.ipynb").stat()
+    assert descriptor.path == tmp_path / "the_notebook_0.ipynb"
+    assert descriptor.mtime_ns == stat.st_mtime_ns
+    assert descriptor.size == stat.st_size
+    assert descriptor.get_script_extension() == notebook_asset.get_script_extension()
+    assert not hasattr(descriptor, "__dict__")
+
+
+def test_notebook_descriptor_hashed_by_path(tmp_path):
+    path = tmp_path / "the_notebook.ipynb"
+    descriptor = NotebookDescriptor(
+        path, language_info=("python", "python", ".py"), mtime_ns=0, size=0
+    )
+    same_path = NotebookDescriptor(path, language_info=(None, None, None), mtime_ns=1, size=1)
+    other_path = NotebookDescriptor(
+        tmp_path / "other.ipynb", language_info=("python", "python", ".py"), mtime_ns=0, size=0
+    )
+    assert descriptor == same_path
+    assert hash(descriptor) == hash(same_path) == hash(path)
+    assert descriptor != other_path
+    assert len({descriptor, same_path, other_path}) == 2
+    assert same_path.get_script_extension() == ".txt"
+
+
 def test_find_notebooks_warning(tmp_path):
     bad_notebook_path = tmp_path / "the_journal.ipynb"
     bad_notebook_path.touch()
@@ -88,6 +186,165 @@ def test_find_notebooks_warning(tmp_path):
         find_notebooks(tmp_path)
 
 
+def test_find_notebooks_prefilter(tmp_path, notebook_asset, monkeypatch):
+    """Test that only files that look like notebooks are fully read."""
+    shutil.copy(notebook_asset.path, tmp_path / "the_notebook.ipynb")
+    shutil.copy(notebook_asset.path, tmp_path / "the_notebook_no_extension")
+    shutil.copy(notebook_asset.path, tmp_path / "the_notebook.json")
+    (tmp_path / "the_potatoes.csv").write_text("sol,potatoes\n61,400\n", encoding="utf-8")
+    (tmp_path / "the_log").write_text('{"LOG ENTRY: SOL 61": "whales"}', encoding="utf-8")
+    with (tmp_path / SAVE_PROGRESS_INDICATOR_FILE).open("w", encoding="utf-8") as fp:
+        fp.write(NbAutoexportConfig().json())
+
+    read_paths = []
+    real_read = utils.read_notebook_metadata
+
+    def recording_read(path, *args, **kwargs):
+        read_paths.append(path)
+        return real_read(path, *args, **kwargs)
+
+    monkeypatch.setattr(utils, "read_notebook_metadata", recording_read)
+
+    found_notebooks = find_notebooks(tmp_path)
+    assert {nb.path for nb in found_notebooks} == {
+        tmp_path / "the_notebook.ipynb",
+        tmp_path / "the_notebook_no_extension",
+    }
+    assert set(read_paths) == {nb.path for nb in found_notebooks}
+
+
+def test_looks_like_notebook(tmp_path):
+    path = tmp_path / "the_notebook"
+    for content in [
+        '{"cells": [], "metadata": {}}',
+        '\ufeff{\n "metadata": {},\n "nbformat": 4}',
+        '  {\n  "nbformat" : 4}',
+    ]:
+        path.write_text(content, encoding="utf-8")
+        assert looks_like_notebook(path)
+
+    for content in ["", "cells", '["cells"]', '{"export_formats": ["script"]}']:
+        path.write_text(content, encoding="utf-8")
+        assert not looks_like_notebook(path)
+
+    assert looks_like_notebook(tmp_path / "the_notebook.IPYNB")
+    assert not looks_like_notebook(tmp_path / "the_data.parquet")
+
+
+def test_read_notebook_metadata(tmp_path, notebook_asset):
+    expected = nbformat.read(str(notebook_asset.path), as_version=nbformat.NO_CONVERT)
+    notebook = read_notebook_metadata(notebook_asset.path)
+    assert set(notebook.keys()) == {"metadata", "nbformat", "nbformat_minor"}
+    assert notebook.metadata == expected.metadata
+    assert notebook.nbformat == expected.nbformat
+    assert notebook.nbformat_minor == expected.nbformat_minor
+
+    # Key order doesn't matter, and cell content with JSON syntax in strings is skipped over
+    path = tmp_path / "the_notebook.ipynb"
+    cells = [
+        {
+            "cell_type": "code",
+            "source": ['print("}]{[ \\" ,")'],
+            "outputs": [{"data": {"image/png": "iVBORw0KGgo="}, "execution_count": None}],
+        }
+    ]
+    content = {
+        "nbformat_minor": 5,
+        "cells": cells,
+        "metadata": {"language_info": {"name": "python"}, "tags": ["\u00e9t\u00e9", "{"]},
+        "nbformat": 4,
+    }
+    path.write_text("\ufeff" + json.dumps(content, indent=1), encoding="utf-8")
+    notebook = read_notebook_metadata(path)
+    assert notebook.metadata == content["metadata"]
+    assert notebook.metadata.language_info.name == "python"
+    assert notebook.nbformat == 4
+    assert notebook.nbformat_minor == 5
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "",
+        "[]",
+        '{"metadata": {}, "nbformat": 4}',
+        '{"cells": [], "nbformat": 4}',
+        '{"cells": [], "metadata": {}}',
+        '{"cells": [], "metadata": {}, "nbformat": "4"}',
+        '{"cells": [{"source": "}], "metadata": {}, "nbformat": 4}',
+        '{"cells": [], "metadata": {}, "nbformat": 4',
+    ],
+)
+def test_read_notebook_metadata_invalid(tmp_path, content):
+    path = tmp_path / "the_notebook.ipynb"
+    path.write_text(content, encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_notebook_metadata(path)
+
+
+def test_load_notebook_metadata_validation_modes(tmp_path, notebook_asset):
+    # Structurally a notebook, but a cell doesn't match the nbformat schema
+    schema_invalid_path = tmp_path / "the_schema_invalid_notebook.ipynb"
+    notebook = json.loads(notebook_asset.path.read_text(encoding="utf-8"))
+    notebook["cells"][0]["cell_type"] = "potato"
+    schema_invalid_path.write_text(json.dumps(notebook), encoding="utf-8")
+
+    assert load_notebook_metadata(schema_invalid_path, validation="fast").metadata == (
+        notebook["metadata"]
+    )
+    with pytest.raises(nbformat.ValidationError):
+        load_notebook_metadata(schema_invalid_path, validation="full")
+
+    # Not structurally a notebook
+    not_notebook_path = tmp_path / "the_log.ipynb"
+    not_notebook_path.write_text('{"LOG ENTRY: SOL 61": "whales"}', encoding="utf-8")
+    assert load_notebook_metadata(not_notebook_path, validation="off").metadata == {}
+    with pytest.raises(ValueError):
+        load_notebook_metadata(not_notebook_path, validation="fast")
+
+
+def test_load_notebook_metadata_cache(tmp_path, notebook_asset, monkeypatch):
+    """Test that notebooks are only validated again when they change."""
+    notebook_path = tmp_path / "the_notebook.ipynb"
+    shutil.copy(notebook_asset.path, notebook_path)
+
+    validated = []
+    real_read = nbformat.read
+
+    def counting_read(*args, **kwargs):
+        validated.append(True)
+        return real_read(*args, **kwargs)
+
+    monkeypatch.setattr(nbformat, "read", counting_read)
+    # Full validation reads the file once, with nbformat
+    monkeypatch.setattr(utils, "read_notebook_metadata", None)
+
+    metadata = load_notebook_metadata(notebook_path, validation=ValidationMode.full).metadata
+    assert metadata == json.loads(notebook_path.read_text(encoding="utf-8"))["metadata"]
+    assert load_notebook_metadata(notebook_path, validation=ValidationMode.full).metadata == (
+        metadata
+    )
+    assert len(validated) == 1
+
+    # Full validation also covers weaker modes
+    assert load_notebook_metadata(notebook_path, validation=ValidationMode.fast).metadata == (
+        metadata
+    )
+    monkeypatch.undo()
+    monkeypatch.setattr(nbformat, "read", counting_read)
+
+    # Returned notebooks are copies that can be modified without affecting the cache
+    load_notebook_metadata(notebook_path).metadata["potatoes"] = 400
+    assert "potatoes" not in load_notebook_metadata(notebook_path).metadata
+
+    # Editing the file invalidates the cache
+    notebook = json.loads(notebook_path.read_text(encoding="utf-8"))
+    notebook["metadata"]["potatoes"] = 400
+    notebook_path.write_text(json.dumps(notebook), encoding="utf-8")
+    assert load_notebook_metadata(notebook_path, validation="full").metadata.potatoes == 400
+    assert len(validated) == 2
+
+
 def test_cleared_argv(monkeypatch):
     """cleared_argv context manager clears sys.argv and restores it on exit"""
     mocked_argv = ["nbautoexport", "convert", "the_notebook.ipynb", "-f", "script"]
@@ -122,3 +379,37 @@ def test_working_directory(tmp_path):
     with working_directory(tmp_path):
         assert Path.cwd() == tmp_path
     assert Path.cwd() == cwd
+
+
+def test_atomic_write(tmp_path):
+    text_path = tmp_path / "the_journal.txt"
+    atomic_write(text_path, "How come Aquaman can control whales?")
+    assert text_path.read_text(encoding="utf-8") == "How come Aquaman can control whales?"
+
+    atomic_write(text_path, "That makes me a pirate! A space pirate!")
+    assert text_path.read_text(encoding="utf-8") == "That makes me a pirate! A space pirate!"
+
+    bytes_path = tmp_path / "the_image.png"
+    atomic_write(bytes_path, b"\x89PNG")
+    assert bytes_path.read_bytes() == b"\x89PNG"
+
+    # No temporary files left behind
+    assert set(tmp_path.iterdir()) == {text_path, bytes_path}
+
+
+def test_write_if_changed(tmp_path):
+    path = tmp_path / "the_journal.txt"
+    assert write_if_changed(path, "How come Aquaman can control whales?\n")
+
+    old_mtime = 1_000_000_000
+    os.utime(path, ns=(old_mtime, old_mtime))
+    assert not write_if_changed(path, "How come Aquaman can control whales?\n")
+    assert path.stat().st_mtime_ns == old_mtime
+
+    # Same size, different content
+    assert write_if_changed(path, "How come Aquaman can control snails?\n")
+    assert path.read_text(encoding="utf-8") == "How come Aquaman can control snails?\n"
+
+    bytes_path = tmp_path / "the_image.png"
+    assert write_if_changed(bytes_path, b"\x89PNG")
+    assert not write_if_changed(bytes_path, b"\x89PNG")
@@ -0,0 +1,222 @@
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import pytest
+
+from nbautoexport import watch
+from nbautoexport.sentinel import NbAutoexportConfig, SAVE_PROGRESS_INDICATOR_FILE
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def poll_until(watcher, expected, timeout=5.0):
+    changed = set()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not expected <= changed:
+        changed |= watcher.poll(timeout=0.1)
+    return changed
+
+
+def configure(directory):
+    with (directory / SAVE_PROGRESS_INDICATOR_FILE).open("w", encoding="utf-8") as fp:
+        json.dump(NbAutoexportConfig(export_formats=["script"]).dict(), fp)
+
+
+def test_is_watched_notebook(tmp_path):
+    assert watch.is_watched_notebook(tmp_path / "the_notebook.ipynb")
+    assert not watch.is_watched_notebook(tmp_path / ".~the_notebook.ipynb")
+    assert not watch.is_watched_notebook(tmp_path / "the_notebook.py")
+
+
+def test_watched_directories(tmp_path):
+    for directory in ["a/b", "c", ".ipynb_checkpoints", "a/.git"]:
+        (tmp_path / directory).mkdir(parents=True)
+
+    assert watch.watched_directories(tmp_path, recursive=False) == [tmp_path]
+    assert watch.watched_directories(tmp_path, recursive=True) == [
+        tmp_path,
+        tmp_path / "a",
+        tmp_path / "a" / "b",
+        tmp_path / "c",
+    ]
+
+
+def test_polling_watcher(tmp_path, notebook_asset):
+    existing = tmp_path / "existing.ipynb"
+    shutil.copy(notebook_asset.path, existing)
+    (tmp_path / "sub").mkdir()
+
+    watcher = watch.PollingWatcher(tmp_path, interval=0.01)
+    assert watcher.poll(timeout=0.01) == set()
+
+    new = tmp_path / "new.ipynb"
+    shutil.copy(notebook_asset.path, new)
+    shutil.copy(notebook_asset.path, tmp_path / "sub" / "nested.ipynb")
+    (tmp_path / "data.csv").write_text("a,b\n", encoding="utf-8")
+    assert watcher.poll(timeout=0.01) == {new}
+
+    stat = existing.stat()
+    os.utime(existing, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert watcher.poll(timeout=0.01) == {existing}
+    assert watcher.poll(timeout=0.01) == set()
+
+
+def test_polling_watcher_recursive(tmp_path, notebook_asset):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / ".ipynb_checkpoints").mkdir()
+
+    watcher = watch.PollingWatcher(tmp_path, recursive=True, interval=0.01)
+
+    nested = tmp_path / "sub" / "nested.ipynb"
+    shutil.copy(notebook_asset.path, nested)
+    shutil.copy(notebook_asset.path, tmp_path / ".ipynb_checkpoints" / "nested-checkpoint.ipynb")
+    assert watcher.poll(timeout=0.01) == {nested}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify requires Linux")
+def test_inotify_watcher(tmp_path, notebook_asset):
+    (tmp_path / "sub").mkdir()
+    watcher = watch.InotifyWatcher(tmp_path)
+    try:
+        assert watcher.poll(timeout=0.01) == set()
+
+        written = tmp_path / "written.ipynb"
+        shutil.copy(notebook_asset.path, written)
+        assert poll_until(watcher, {written}) == {written}
+
+        # Atomic save: write a hidden temporary file, then rename it over the notebook
+        renamed = tmp_path / "renamed.ipynb"
+        shutil.copy(notebook_asset.path, tmp_path / ".~renamed.ipynb")
+        os.replace(tmp_path / ".~renamed.ipynb", renamed)
+        assert poll_until(watcher, {renamed}) == {renamed}
+
+        # Not recursive
+        shutil.copy(notebook_asset.path, tmp_path / "sub" / "nested.ipynb")
+        assert poll_until(watcher, set(), timeout=0.2) == set()
+    finally:
+        watcher.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify requires Linux")
+def test_inotify_watcher_recursive(tmp_path, notebook_asset):
+    (tmp_path / "sub").mkdir()
+    watcher = watch.InotifyWatcher(tmp_path, recursive=True)
+    try:
+        nested = tmp_path / "sub" / "nested.ipynb"
+        shutil.copy(notebook_asset.path, nested)
+        assert poll_until(watcher, {nested}) == {nested}
+
+        # Directories created after watching starts are watched too
+        (tmp_path / "new").mkdir()
+        assert poll_until(watcher, set(), timeout=0.2) == set()
+        created = tmp_path / "new" / "created.ipynb"
+        shutil.copy(notebook_asset.path, created)
+        assert poll_until(watcher, {created}) == {created}
+    finally:
+        watcher.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify requires Linux")
+def test_inotify_watcher_overflow(tmp_path, notebook_asset, monkeypatch, caplog):
+    """Test that all notebooks are reported as changed when the event queue overflows, and that
+    directories whose creation events were lost are watched."""
+    existing = tmp_path / "existing.ipynb"
+    shutil.copy(notebook_asset.path, existing)
+    watcher = watch.InotifyWatcher(tmp_path, recursive=True)
+    try:
+        missed = tmp_path / "missed"
+        missed.mkdir()
+        nested = missed / "nested.ipynb"
+        shutil.copy(notebook_asset.path, nested)
+        (tmp_path / "data.csv").write_text("a,b\n", encoding="utf-8")
+
+        with monkeypatch.context() as m:
+            m.setattr(watcher, "_read_events", lambda: [(-1, watch.IN_Q_OVERFLOW, None)])
+            assert watcher.poll(timeout=1) == {existing, nested}
+        assert "overflowed" in caplog.text
+        assert missed in watcher._watches.values()
+
+        # Drain the events queued before the overflow was simulated
+        watcher.poll(timeout=0.2)
+        written = missed / "written.ipynb"
+        shutil.copy(notebook_asset.path, written)
+        assert poll_until(watcher, {written}) == {written}
+    finally:
+        watcher.close()
+
+
+def test_make_watcher_fallback(tmp_path, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise OSError("inotify is not available.")
+
+    monkeypatch.setattr(watch, "InotifyWatcher", unavailable)
+    assert isinstance(watch.make_watcher(tmp_path), watch.PollingWatcher)
+
+
+def test_make_watcher_polling(tmp_path):
+    watcher = watch.make_watcher(tmp_path, polling=True, poll_interval=0.5)
+    assert isinstance(watcher, watch.PollingWatcher)
+    assert watcher.interval == 0.5
+
+
+@pytest.mark.parametrize("polling", [False, True])
+def test_watch(tmp_path, notebook_asset, polling):
+    configured = tmp_path / "configured"
+    unconfigured = tmp_path / "unconfigured"
+    configured.mkdir()
+    unconfigured.mkdir()
+    configure(configured)
+
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=watch.watch,
+        args=(tmp_path,),
+        kwargs=dict(
+            recursive=True,
+            debounce=0.05,
+            polling=polling,
+            poll_interval=0.05,
+            stop_event=stop_event,
+        ),
+    )
+    thread.start()
+    try:
+        time.sleep(0.2)
+        shutil.copy(notebook_asset.path, configured / "the_notebook.ipynb")
+        shutil.copy(notebook_asset.path, unconfigured / "the_notebook.ipynb")
+        assert wait_for(lambda: (configured / "script" / "the_notebook.py").exists())
+    finally:
+        stop_event.set()
+        thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert not (unconfigured / "script").exists()
+
+
+def test_submit_export_unconfigured(tmp_path, notebook_asset):
+    notebook_path = tmp_path / "the_notebook.ipynb"
+    shutil.copy(notebook_asset.path, notebook_path)
+
+    submitted = []
+
+    class RecordingExporter:
+        def submit(self, *args, **kwargs):
+            submitted.append(args)
+
+    watch.submit_export(RecordingExporter(), notebook_path)
+    assert submitted == []
+
+    configure(tmp_path)
+    watch.submit_export(RecordingExporter(), notebook_path)
+    assert [args[0] for args in submitted] == [notebook_path]
@@ -0,0 +1,137 @@
+import os
+import shutil
+import signal
+import sys
+from unittest import mock
+
+import pytest
+
+from nbautoexport import export, metrics, worker
+from nbautoexport.background import (
+    disable_background_exports,
+    enable_background_exports,
+    get_background_exporter,
+)
+from nbautoexport.sentinel import NbAutoexportConfig, SAVE_PROGRESS_INDICATOR_FILE
+from nbautoexport.worker import ExportWorker, ExportWorkerError
+
+
+@pytest.fixture(scope="module")
+def export_worker():
+    export_worker = ExportWorker(warm_formats=["script"])
+    export_worker.start()
+    yield export_worker
+    export_worker.stop()
+
+
+@pytest.fixture()
+def export_metrics():
+    yield metrics.reset_export_metrics()
+    metrics.reset_export_metrics()
+
+
+@pytest.fixture()
+def notebooks_dir(tmp_path, notebook_asset):
+    shutil.copy(notebook_asset.path, tmp_path / "the_notebook.ipynb")
+    config = NbAutoexportConfig(export_formats=["script"])
+    (tmp_path / SAVE_PROGRESS_INDICATOR_FILE).write_text(config.json(), encoding="utf-8")
+    return tmp_path
+
+
+def test_worker_export(export_worker, notebooks_dir, export_metrics):
+    notebook_path = notebooks_dir / "the_notebook.ipynb"
+    config = NbAutoexportConfig(export_formats=["script", "html"])
+
+    assert export_worker.export_notebook(notebook_path, config=config, use_manifest=True)
+    assert (notebooks_dir / "script" / "the_notebook.py").exists()
+    assert (notebooks_dir / "html" / "the_notebook.html").exists()
+    assert not export_worker.export_notebook(notebook_path, config=config, use_manifest=True)
+
+    assert export_worker.pid != os.getpid()
+    # Metrics recorded in the worker process are merged into this process's
+    assert export_metrics.exports.get(format="html") == 1
+    assert export_metrics.notebooks_exported.get() == 1
+    assert export_metrics.notebooks_skipped.get() == 1
+
+
+def test_worker_export_error(export_worker, notebooks_dir, export_metrics):
+    pid = export_worker.pid
+    config = NbAutoexportConfig(export_formats=["script"])
+    with pytest.raises(ExportWorkerError, match="FileNotFoundError"):
+        export_worker.export_notebook(notebooks_dir / "missing.ipynb", config=config)
+    assert export_worker.pid == pid
+    assert export_metrics.notebook_failures.get() == 1
+
+
+def test_worker_restarts_after_crash(export_worker, notebooks_dir):
+    pid = export_worker.pid
+    restarts = export_worker.restarts
+    os.kill(pid, signal.SIGKILL if sys.platform != "win32" else signal.SIGTERM)
+    export_worker._process.wait()
+
+    config = NbAutoexportConfig(export_formats=["script"])
+    assert export_worker.export_notebook(notebooks_dir / "the_notebook.ipynb", config=config)
+    assert export_worker.pid != pid
+    assert export_worker.restarts == restarts + 1
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="requires named pipes")
+def test_worker_restarts_after_timeout(notebooks_dir, export_metrics):
+    export_worker = ExportWorker()
+    try:
+        config = NbAutoexportConfig(export_formats=["script"])
+        assert export_worker.export_notebook(notebooks_dir / "the_notebook.ipynb", config=config)
+        pid = export_worker.pid
+
+        # Reading a named pipe that nothing writes to blocks forever
+        hanging_path = notebooks_dir / "hanging.ipynb"
+        os.mkfifo(hanging_path)
+        export_worker.timeout = 0.5
+        with pytest.raises(ExportWorkerError, match="timed out"):
+            export_worker.export_notebook(hanging_path, config=config)
+        assert export_worker.pid != pid
+        assert export_worker.restarts == 1
+        assert export_metrics.notebook_failures.get() == 1
+    finally:
+        export_worker.stop()
+    assert export_worker.pid is None
+
+
+def test_post_save_worker(notebooks_dir, monkeypatch):
+    def failing_export_notebook(*args, **kwargs):
+        raise AssertionError("Exported in the Jupyter server process")
+
+    monkeypatch.setattr(export, "export_notebook", failing_export_notebook)
+    export_worker = worker.enable_worker_exports()
+    try:
+        assert worker.get_export_worker() is export_worker
+        # post_save doesn't wait for the worker
+        background_exporter = get_background_exporter()
+        assert background_exporter is not None
+        with mock.patch.object(
+            background_exporter, "submit", wraps=background_exporter.submit
+        ) as submit:
+            export.post_save(
+                model={"type": "notebook"},
+                os_path=str(notebooks_dir / "the_notebook.ipynb"),
+                contents_manager=None,
+            )
+        assert submit.call_args.args[1] == export_worker.export_notebook
+    finally:
+        worker.disable_worker_exports()
+    assert worker.get_export_worker() is None
+    assert get_background_exporter() is None
+    assert export_worker.pid is None
+    assert (notebooks_dir / "script" / "the_notebook.py").exists()
+
+
+def test_worker_exports_keep_background_exporter():
+    """Test that background exports enabled before the worker are left enabled after it."""
+    background_exporter = enable_background_exports(debounce=0.5)
+    try:
+        worker.enable_worker_exports()
+        assert get_background_exporter() is background_exporter
+        worker.disable_worker_exports()
+        assert get_background_exporter() is background_exporter
+    finally:
+        disable_background_exports()